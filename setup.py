@@ -14,15 +14,24 @@ setup(name="tap-jira",
           "dateparser"
       ],
       extras_require={
+          'async': [
+              'aiohttp'
+          ],
+          'http2': [
+              'httpx[http2]'
+          ],
           'dev': [
               'pylint',
               'nose2',
-              'ipdb'
+              'ipdb',
+              # For the HTTP/2 tests, along with h2
+              'httpx[http2]'
           ]
       },
       entry_points="""
           [console_scripts]
           tap-jira=tap_jira:main
+          tap-jira-shards=tap_jira.sharding:main
       """,
       packages=["tap_jira"],
       package_data = {
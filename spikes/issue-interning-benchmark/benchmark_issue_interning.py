@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Measures with tracemalloc how much memory a decoded page of issues holds
+with and without tap_jira.interning.intern_issues, along with the time
+interning takes."""
+import json
+import time
+import tracemalloc
+from tap_jira.interning import intern_issues
+
+PAGE_SIZE = 100
+USERS = 10
+
+
+def user(i):
+    base = "https://example.atlassian.net/secure/useravatar?ownerId=user-{}".format(i)
+    return {"self": "https://example.atlassian.net/rest/api/2/user?accountId=user-{}".format(i),
+            "accountId": "user-{}".format(i),
+            "displayName": "User {}".format(i),
+            "emailAddress": "user{}@example.com".format(i),
+            "active": True,
+            "timeZone": "Europe/London",
+            "avatarUrls": {size: base + "&size=" + size for size in ["48x48", "24x24", "16x16", "32x32"]}}
+
+
+def status(i):
+    return {"self": "https://example.atlassian.net/rest/api/2/status/{}".format(i),
+            "description": "", "iconUrl": "https://example.atlassian.net/images/icons/status.png",
+            "name": "Status {}".format(i), "id": str(i),
+            "statusCategory": {"self": "https://example.atlassian.net/rest/api/2/statuscategory/2",
+                               "id": 2, "key": "new", "colorName": "blue-gray", "name": "To Do"}}
+
+
+def issue(i):
+    return {
+        "id": str(i), "key": "PRJ-{}".format(i),
+        "fields": {
+            "assignee": user(i % USERS), "reporter": user((i + 1) % USERS), "creator": user((i + 2) % USERS),
+            "status": status(i % 3), "priority": {"name": "Medium", "id": "3"},
+            "issuetype": {"name": "Task", "id": "10002", "subtask": False},
+            "project": {"id": "10000", "key": "PRJ", "name": "Project", "avatarUrls": user(0)["avatarUrls"]},
+            "updated": "2022-05-23T09:16:11.356+0000",
+            "comment": {"comments": [{"id": "{}-{}".format(i, c), "author": user(c % USERS),
+                                      "updateAuthor": user(c % USERS), "body": "comment"} for c in range(5)]},
+        },
+        "changelog": {"histories": [{"id": "{}-{}".format(i, h), "author": user(h % USERS), "items": []}
+                                    for h in range(5)]},
+        "transitions": [{"id": str(t), "name": "Transition", "to": status(t)} for t in range(3)],
+    }
+
+
+def measure(raw, intern):
+    tracemalloc.start()
+    started = time.perf_counter()
+    page = json.loads(raw)
+    if intern:
+        intern_issues(page)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return page, current, peak, elapsed
+
+
+def main():
+    raw = json.dumps([issue(i) for i in range(PAGE_SIZE)])
+    for name, intern in [("decoded", False), ("decoded+interned", True)]:
+        _, current, peak, elapsed = measure(raw, intern)
+        print("{:>17}: {:8.1f} KiB retained, {:8.1f} KiB peak, {:6.2f} ms".format(
+            name, current / 1024, peak / 1024, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
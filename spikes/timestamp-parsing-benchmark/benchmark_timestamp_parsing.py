@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Compares parsing a page of worklog `updated` timestamps the old way (every
+timestamp through dateutil twice, once for the min/max check and once for
+the bookmark) against tap_jira.dates.timestamp_range."""
+import random
+import timeit
+from datetime import datetime, timedelta
+from singer import utils
+from tap_jira.dates import timestamp_range
+
+PAGE_SIZE = 1000
+NUMBER = 20
+
+
+def make_page():
+    start = datetime(2022, 5, 23, 9, 16, 11)
+    return [(start + timedelta(seconds=random.randint(0, 86400), milliseconds=random.randint(0, 999)))
+            .strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "+0000"
+            for _ in range(PAGE_SIZE)]
+
+
+def dateutil_bookmark(page):
+    updated = [utils.strptime_to_utc(w) for w in page]
+    min(updated), max(updated)
+    return max(utils.strptime_to_utc(w) for w in page)
+
+
+def fast_bookmark(page):
+    return timestamp_range(page)[1]
+
+
+def main():
+    page = make_page()
+    assert dateutil_bookmark(page) == fast_bookmark(page)
+    for name, func in [("dateutil", dateutil_bookmark), ("timestamp_range", fast_bookmark)]:
+        seconds = min(timeit.repeat(lambda: func(page), number=NUMBER, repeat=3)) / NUMBER
+        print("{:>16}: {:8.2f} ms per {} worklog page".format(name, seconds * 1000, PAGE_SIZE))
+
+
+if __name__ == "__main__":
+    main()
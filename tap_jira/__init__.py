@@ -1,13 +1,25 @@
 #!/usr/bin/env python3
+import copy
+import functools
 import os
 import json
+import threading
+from datetime import timedelta
 import singer
 from singer import utils
 from singer import metadata
 from singer.catalog import Catalog, CatalogEntry, Schema
 from . import streams as streams_
-from .context import Context
+from .context import Context, SyncContext, use_context
+from . import output
+from .scheduler import StreamScheduler, RequestBudget, DEFAULT_MAX_CONCURRENT_REQUESTS
+from .fingerprints import FingerprintStore, DEFAULT_FULL_REFRESH_HOURS
 from .http import Client
+from .http2 import use_http2
+from .aio import AsyncClient, DEFAULT_MAX_CONCURRENT_REQUESTS as DEFAULT_ASYNC_CONCURRENT_REQUESTS
+from . import sites as sites_
+from . import sharding
+from .concurrency import ContextThreadPoolExecutor
 
 LOGGER = singer.get_logger()
 REQUIRED_CONFIG_KEYS_CLOUD = ["start_date",
@@ -26,6 +38,9 @@ REQUIRED_CONFIG_KEYS_HOSTED = ["start_date",
 
 def get_args():
     unchecked_args = utils.parse_args([])
+    # The required keys of each site are checked in main_sites
+    if unchecked_args.config.get("sites"):
+        return unchecked_args
     if 'username' in unchecked_args.config.keys():
         return utils.parse_args(REQUIRED_CONFIG_KEYS_HOSTED)
 
@@ -36,7 +51,8 @@ def get_abs_path(path):
     return os.path.join(os.path.dirname(os.path.realpath(__file__)), path)
 
 
-def load_schema(tap_stream_id):
+@functools.lru_cache(maxsize=None)
+def _load_schema(tap_stream_id):
     path = "schemas/{}.json".format(tap_stream_id)
     schema = utils.load_json(get_abs_path(path))
     refs = schema.pop("definitions", {})
@@ -45,6 +61,11 @@ def load_schema(tap_stream_id):
     return schema
 
 
+def load_schema(tap_stream_id):
+    # Schemas are read and resolved once, even when several sites are synced
+    return copy.deepcopy(_load_schema(tap_stream_id))
+
+
 def discover():
     catalog = Catalog([])
     for stream in streams_.ALL_STREAMS:
@@ -55,7 +76,7 @@ def discover():
         catalog.streams.append(CatalogEntry(
             stream=stream.tap_stream_id,
             tap_stream_id=stream.tap_stream_id,
-            key_properties=stream.pk_fields,
+            key_properties=stream.key_properties(),
             schema=schema,
             metadata=mdata))
     return catalog
@@ -63,18 +84,15 @@ def discover():
 
 def generate_metadata(stream, schema):
     mdata = metadata.new()
+    pk_fields = stream.key_properties()
 
-    # Update pk for users stream to key for on prem jira instance
-    if stream.tap_stream_id == "users" and Context.client.is_on_prem_instance:
-        stream.pk_fields = ["key"]
-
-    mdata = metadata.write(mdata, (), 'table-key-properties', stream.pk_fields)
+    mdata = metadata.write(mdata, (), 'table-key-properties', pk_fields)
     mdata = metadata.write(mdata, (), 'forced-replication-method', stream.forced_replication_method)
     if stream.parent_tap_stream_id is not None:
         mdata = metadata.write(mdata, (), 'parent-tap-stream-id', stream.parent_tap_stream_id)
 
     for field_name in schema.properties.keys():
-        if field_name in stream.pk_fields:
+        if field_name in pk_fields:
             mdata = metadata.write(mdata, ('properties', field_name), 'inclusion', 'automatic')
         else:
             mdata = metadata.write(mdata, ('properties', field_name), 'inclusion', 'available')
@@ -84,13 +102,31 @@ def generate_metadata(stream, schema):
 
 def output_schema(stream):
     schema = load_schema(stream.tap_stream_id)
-    singer.write_schema(stream.tap_stream_id, schema, stream.pk_fields)
+    output.write_schema(stream.tap_stream_id, schema, stream.key_properties())
 
 
-def sync():
-    streams_.validate_dependencies()
+def sync_concurrently(max_workers):
+    """Syncs the selected streams on up to max_workers threads, sharing the
+    client's concurrent requests between them by weight. While streams are
+    synced concurrently `currently_syncing` holds the list of all of them."""
+    selected = [stream for stream in streams_.ALL_STREAMS
+                if Context.is_selected(stream.tap_stream_id)
+                and (Context.shard is None or Context.shard.syncs(stream))]
+    Context.client.request_budget = RequestBudget(
+        selected, Context.get_config_int("max_concurrent_requests", DEFAULT_MAX_CONCURRENT_REQUESTS))
 
+    def on_change(running):
+        with Context.state_lock:
+            Context.state["currently_syncing"] = running or None
+        output.write_state(Context.state)
 
+    try:
+        StreamScheduler(selected, max_workers, on_change).run()
+    finally:
+        Context.client.request_budget = None
+
+
+def sync_streams():
     # two loops through streams are necessary so that the schema is output
     # BEFORE syncing any streams. Otherwise, the first stream might generate
     # data for the second stream, but the second stream hasn't output its
@@ -98,47 +134,157 @@ def sync():
     for stream in streams_.ALL_STREAMS:
         output_schema(stream)
 
-    for stream in streams_.ALL_STREAMS:
-        if not Context.is_selected(stream.tap_stream_id):
-            continue
-
-        # indirect_stream indicates the data for the stream comes from some
-        # other stream, so we don't sync it directly.
-        if stream.indirect_stream:
-            continue
-        Context.state["currently_syncing"] = stream.tap_stream_id
-        singer.write_state(Context.state)
-        stream.sync()
+    stream_concurrency = Context.get_config_int("stream_concurrency", 1)
+    if stream_concurrency > 1:
+        sync_concurrently(stream_concurrency)
+    else:
+        for stream in streams_.ALL_STREAMS:
+            if not Context.is_selected(stream.tap_stream_id):
+                continue
+
+            # indirect_stream indicates the data for the stream comes from some
+            # other stream, so we don't sync it directly.
+            if stream.indirect_stream:
+                continue
+            # Only the first shard syncs the streams that aren't sharded
+            if Context.shard and not Context.shard.syncs(stream):
+                continue
+            Context.state["currently_syncing"] = stream.tap_stream_id
+            output.write_state(Context.state)
+            stream.sync()
     Context.state["currently_syncing"] = None
-    singer.write_state(Context.state)
+    output.write_state(Context.state)
+
+    # Only keep the fingerprints once every stream has been synced, so
+    # records of a failed run are written again next time
+    if Context.fingerprints:
+        Context.fingerprints.save()
+
+
+def sync():
+    streams_.validate_dependencies()
+
+    # Records and state are written from a single thread so that syncing
+    # doesn't wait on the target reading them
+    with output.writer(Context.get_config_int("max_queued_messages",
+                                              output.DEFAULT_MAX_QUEUED_MESSAGES)):
+        sync_streams()
+
+
+def setup_fingerprints():
+    if Context.config.get("fingerprint_store_path"):
+        full_refresh_hours = Context.get_config_int("fingerprint_full_refresh_hours",
+                                                    DEFAULT_FULL_REFRESH_HOURS)
+        Context.fingerprints = FingerprintStore(Context.config["fingerprint_store_path"],
+                                                timedelta(hours=full_refresh_hours))
+
+
+def setup_async_client():
+    if Context.get_config_bool("async_requests"):
+        Context.async_client = AsyncClient(
+            Context.client,
+            Context.get_config_int("async_max_concurrent_requests", DEFAULT_ASYNC_CONCURRENT_REQUESTS))
+
+
+def close_clients():
+    if Context.client and Context.client.login_timer:
+        Context.client.login_timer.cancel()
+    if Context.client and Context.client.hedger:
+        Context.client.hedger.close()
+    if Context.async_client:
+        Context.async_client.close()
+        Context.async_client = None
+
+
+def sync_site(sync_context):
+    with use_context(sync_context):
+        LOGGER.info("Syncing site %s", sync_context.stream_prefix.rstrip("_"))
+        try:
+            streams_.validate_dependencies()
+            setup_fingerprints()
+            setup_async_client()
+            sync_streams()
+        finally:
+            close_clients()
+
+
+def main_sites(args):
+    """Syncs every site of the config's `sites` in this process. Each site
+    has its own client, and so its own rate limiting, and its own part of
+    the state under `sites`, while the connection pools, schemas and output
+    are shared. Each site's records are written to streams prefixed with
+    its id."""
+    sites = sites_.get_sites(args.config)
+    for site in sites:
+        utils.check_config(site.config, REQUIRED_CONFIG_KEYS_HOSTED
+                           if "username" in site.config else REQUIRED_CONFIG_KEYS_CLOUD)
+    session = sites_.shared_session(len(sites), use_http2(args.config))
+    root_state = args.state or {}
+    site_states = root_state.setdefault("sites", {})
+    state_lock = threading.RLock()
+    contexts = [SyncContext(config=site.config,
+                            state=site_states.setdefault(site.site_id, {}),
+                            client=Client(site.config, session=session),
+                            state_lock=state_lock,
+                            root_state=root_state,
+                            stream_prefix=site.stream_prefix)
+                for site in sites]
+
+    with use_context(contexts[0]):
+        catalog = Catalog.from_dict(args.properties) if args.properties else discover()
+        if args.discover:
+            catalog.dump()
+            print()
+            for sync_context in contexts:
+                if sync_context.client.login_timer:
+                    sync_context.client.login_timer.cancel()
+            return
+        max_queued = Context.get_config_int("max_queued_messages", output.DEFAULT_MAX_QUEUED_MESSAGES)
+        site_concurrency = Context.get_config_int("site_concurrency", 1)
+
+    for sync_context in contexts:
+        sync_context.catalog = catalog
+    with output.writer(max_queued):
+        with ContextThreadPoolExecutor(max_workers=site_concurrency) as executor:
+            futures = [executor.submit(sync_site, sync_context) for sync_context in contexts]
+    # Every site is synced even if another fails
+    errors = []
+    for site, future in zip(sites, futures):
+        if future.exception() is not None:
+            LOGGER.error("Syncing site %s failed", site.site_id)
+            errors.append(future.exception())
+    if errors:
+        raise errors[0]
 
 
 @singer.utils.handle_top_exception(LOGGER)
 def main():
     args = get_args()
+    if args.config.get("sites"):
+        main_sites(args)
+        return
 
     jira_config = args.config
     # jira client instance
     jira_client = Client(jira_config)
 
-    # Setup Context
-    Context.client = jira_client
-    catalog = Catalog.from_dict(args.properties) \
-        if args.properties else discover()
-    Context.config = jira_config
-    Context.state = args.state
-    Context.catalog = catalog
-
-    try:
-        if args.discover:
-            discover().dump()
-            print()
-        else:
-            sync()
-    finally:
-        if Context.client and Context.client.login_timer:
-            Context.client.login_timer.cancel()
-
+    # Setup the context of this run
+    sync_context = SyncContext(config=jira_config, state=args.state, client=jira_client)
+    with use_context(sync_context):
+        Context.catalog = Catalog.from_dict(args.properties) \
+            if args.properties else discover()
+        setup_fingerprints()
+        Context.shard = sharding.get_shard(jira_config)
+
+        try:
+            if args.discover:
+                discover().dump()
+                print()
+            else:
+                setup_async_client()
+                sync()
+        finally:
+            close_clients()
 
 if __name__ == "__main__":
     main()
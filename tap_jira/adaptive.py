@@ -0,0 +1,143 @@
+import threading
+import time
+from contextlib import contextmanager
+from requests.exceptions import Timeout
+from singer import metrics
+import singer
+from .endpoints import endpoint_of
+
+LOGGER = singer.get_logger()
+
+DEFAULT_INITIAL_WINDOW = 4
+DEFAULT_MAX_WINDOW = 32
+
+# Responses telling us Jira is overloaded, along with timeouts
+OVERLOAD_STATUS_CODES = (429, 503)
+
+# The window keeps growing while an endpoint's smoothed latency stays within
+# this factor of the lowest it has been
+LATENCY_TOLERANCE = 1.5
+
+# Weight of the latest response in an endpoint's smoothed latency
+LATENCY_SMOOTHING = 0.1
+
+# How much an endpoint's lowest latency may rise per response, so it follows
+# the server when it gets slower for good
+BASELINE_DRIFT = 0.01
+
+DECREASE_FACTOR = 0.5
+
+
+def get_adaptive_concurrency(config):
+    """Returns an AdaptiveConcurrency if `adaptive_concurrency` is enabled."""
+    if str(config.get("adaptive_concurrency", False)).lower() != "true":
+        return None
+    return AdaptiveConcurrency(
+        int(config.get("adaptive_concurrency_initial") or DEFAULT_INITIAL_WINDOW),
+        int(config.get("adaptive_concurrency_max") or DEFAULT_MAX_WINDOW))
+
+
+class Latency():
+    def __init__(self, latency):
+        self.smoothed = latency
+        self.baseline = latency
+
+    def add(self, latency):
+        self.smoothed += (latency - self.smoothed) * LATENCY_SMOOTHING
+        self.baseline = min(self.baseline * (1 + BASELINE_DRIFT), self.smoothed)
+
+    def is_flat(self):
+        return self.smoothed <= self.baseline * LATENCY_TOLERANCE
+
+
+class AdaptiveConcurrency():
+    """Limits the requests in flight to a window that grows additively while
+    responses come back without their latency rising, and is cut in half
+    when Jira answers 429 or 503 or a request times out.
+
+    The window grows by about one for every window's worth of successful
+    responses. Only requests in flight while the window was full count, as
+    requests sent one at a time tell nothing about whether Jira could take
+    more at once. It is cut at most once per round of requests, as all
+    requests in flight when Jira gets overloaded are likely to fail: only a
+    request sent after the last cut can cut it again."""
+
+    def __init__(self, initial=DEFAULT_INITIAL_WINDOW, maximum=DEFAULT_MAX_WINDOW, minimum=1):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.window = float(min(max(initial, minimum), self.maximum))
+        self.in_flight = 0
+        self.latencies = {}
+        self.last_decrease = time.monotonic()
+        # When in_flight last reached the window
+        self.last_full = None
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def slot(self, endpoint):
+        """Waits for room in the window. The caller sets `status_code` on the
+        yielded dict once it has a response."""
+        with self.condition:
+            while self.in_flight >= int(self.window):
+                self.condition.wait()
+            started = self._take()
+        with self.holding(endpoint, started) as result:
+            yield result
+
+    def try_acquire(self):
+        """Takes room in the window without waiting for it, for callers that
+        can't block. Returns when it was taken, to be given back through
+        `holding`, or None if the window is full."""
+        with self.condition:
+            if self.in_flight >= int(self.window):
+                return None
+            return self._take()
+
+    def _take(self):
+        self.in_flight += 1
+        started = time.monotonic()
+        if self.in_flight >= int(self.window):
+            self.last_full = started
+        return started
+
+    @contextmanager
+    def holding(self, endpoint, started):
+        """Gives back the room taken at `started` once the block exits, like
+        `slot` does."""
+        result = {"status_code": None}
+        overloaded = succeeded = False
+        try:
+            yield result
+        except Timeout:
+            overloaded = True
+            raise
+        else:
+            overloaded = result["status_code"] in OVERLOAD_STATUS_CODES
+            succeeded = result["status_code"] is not None and result["status_code"] < 400
+        finally:
+            self._release(endpoint, started, overloaded, succeeded)
+
+    def _release(self, endpoint, started, overloaded=False, succeeded=False):
+        now = time.monotonic()
+        with self.condition:
+            self.in_flight -= 1
+            previous = int(self.window)
+            if overloaded:
+                if started >= self.last_decrease:
+                    self.window = max(self.minimum, self.window * DECREASE_FACTOR)
+                    self.last_decrease = now
+            elif succeeded:
+                # Requests for different issues or projects share their latencies
+                endpoint = endpoint_of(endpoint)
+                latency = self.latencies.get(endpoint)
+                if latency is None:
+                    self.latencies[endpoint] = latency = Latency(now - started)
+                else:
+                    latency.add(now - started)
+                window_was_full = self.last_full is not None and self.last_full >= started
+                if window_was_full and latency.is_flat():
+                    self.window = min(self.maximum, self.window + 1 / self.window)
+            self.condition.notify_all()
+            if int(self.window) != previous:
+                metrics.log(LOGGER, metrics.Point("gauge", "http_concurrency_window",
+                                                  int(self.window), {}))
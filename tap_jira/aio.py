@@ -0,0 +1,190 @@
+"""Sends requests from a single asyncio event loop, so that many requests
+fanned out at once, like the versions and components of every project, don't
+each need a thread.
+
+AsyncClient sends requests with aiohttp (`pip install tap-jira[async]`) and
+the auth, error handling and retries of the Client it wraps. It waits for
+the same throttle, request budget, rate limiter and adaptive window, so
+requests sent from the event loop and from threads are paced together, but
+waits with asyncio.sleep rather than blocking a thread. Stream syncs, which
+aren't coroutines, run coroutines on the client's event loop through
+AsyncClient.ordered_map."""
+import asyncio
+import contextvars
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from datetime import datetime
+import backoff
+import requests
+from requests.exceptions import HTTPError, Timeout
+from singer import metrics
+from .http import (Paginator, JiraBackoffError, TIME_BETWEEN_REQUESTS,
+                   check_status, should_retry_httperror)
+from .rate_limit import retry_after
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+DEFAULT_MAX_CONCURRENT_REQUESTS = 32
+
+# How often a request waiting for room in the request budget or adaptive
+# window, which are shared with threads, checks for it again
+POLL_INTERVAL = 0.01
+
+
+class AsyncClient():
+    def __init__(self, client, max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS):
+        if aiohttp is None:
+            raise Exception("The async_requests option needs aiohttp, "
+                            "install it with `pip install tap-jira[async]`")
+        self.client = client
+        self.max_concurrent_requests = max_concurrent_requests
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="tap-jira-async",
+                                       daemon=True)
+        self.thread.start()
+        # Created on the event loop, see _setup
+        self.semaphore = None
+        self.session = None
+        asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+
+    async def _setup(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.client.timeout),
+            connector=aiohttp.TCPConnector(limit=self.max_concurrent_requests))
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    @asynccontextmanager
+    async def paced(self, tap_stream_id):
+        """Like Client.paced: holds a slot of the stream's request budget
+        after waiting for TIME_BETWEEN_REQUESTS and a token of the rate
+        limiter."""
+        budget = self.client.request_budget
+        semaphore = budget.semaphore(tap_stream_id) if budget else None
+        if semaphore:
+            while not semaphore.acquire(blocking=False):
+                await asyncio.sleep(POLL_INTERVAL)
+        try:
+            if self.client.concurrency is None:
+                await asyncio.sleep(max(self.client.reserve_send_time(), 0))
+            if self.client.rate_limiter:
+                granted = False
+                while not granted:
+                    wait, granted = self.client.rate_limiter.reserve()
+                    await asyncio.sleep(max(wait, 0))
+            yield
+        finally:
+            if semaphore:
+                semaphore.release()
+
+    async def _window_slot(self, path):
+        """Waits for room in the client's adaptive window and returns the
+        context manager holding it, like AdaptiveConcurrency.slot."""
+        concurrency = self.client.concurrency
+        if concurrency is None:
+            return nullcontext({})
+        started = concurrency.try_acquire()
+        while started is None:
+            await asyncio.sleep(POLL_INTERVAL)
+            started = concurrency.try_acquire()
+        return concurrency.holding(path, started)
+
+    async def _send_aiohttp(self, prepared):
+        """Sends a prepared request with aiohttp, returning the response as a
+        requests.Response so it is checked like any other."""
+        try:
+            async with self.session.request(prepared.method, prepared.url,
+                                            headers=dict(prepared.headers),
+                                            data=prepared.body) as aio_response:
+                response = requests.Response()
+                response.status_code = aio_response.status
+                response.headers.update(aio_response.headers)
+                response._content = await aio_response.read() # pylint: disable=protected-access
+                response.url = str(aio_response.url)
+                response.request = prepared
+                return response
+        except asyncio.TimeoutError as ex:
+            raise Timeout(str(ex)) from ex
+        except aiohttp.ClientConnectionError as ex:
+            raise requests.exceptions.ConnectionError(str(ex)) from ex
+
+    @backoff.on_exception(backoff.expo,
+                          (requests.exceptions.ConnectionError, HTTPError, Timeout),
+                          jitter=None,
+                          max_tries=6,
+                          giveup=lambda e: not should_retry_httperror(e))
+    async def send(self, method, path, headers={}, **kwargs):
+        prepared = self.client.prepare(method, path, headers, **kwargs)
+        with await self._window_slot(path) as result:
+            response = await self._send_aiohttp(prepared)
+            result["status_code"] = response.status_code
+        return response
+
+    @backoff.on_exception(backoff.constant,
+                          JiraBackoffError,
+                          max_tries=10,
+                          interval=60)
+    async def request(self, tap_stream_id, *args, **kwargs):
+        async with self.semaphore, self.paced(tap_stream_id):
+            with metrics.http_request_timer(tap_stream_id) as timer:
+                response = await self.send(*args, **kwargs)
+                if self.client.concurrency is None:
+                    with self.client.throttle_lock:
+                        self.client.next_request_at = max(self.client.next_request_at,
+                                                          datetime.now() + TIME_BETWEEN_REQUESTS)
+                timer.tags[metrics.Tag.http_status_code] = response.status_code
+                timer.tags["http_method"] = response.request.method
+                timer.tags["tap_stream_id"] = tap_stream_id
+                timer.tags["endpoint"] = response.url
+        if self.client.rate_limiter and response.status_code == 429:
+            seconds = retry_after(response, self.client.rate_limiter.cooldown_seconds)
+            self.client.rate_limiter.cool_down(seconds)
+        check_status(response)
+        return response.json()
+
+    def ordered_map(self, func, items, window=DEFAULT_MAX_CONCURRENT_REQUESTS):
+        """Like concurrency.ordered_map for a coroutine function: yields
+        `await func(item)` for each item in order, running up to `window` of
+        them at once on the event loop. The coroutines see the context
+        variables of the calling thread, e.g. its SyncContext."""
+        context = contextvars.copy_context()
+
+        async def run(item):
+            for var, value in context.items():
+                var.set(value)
+            return await func(item)
+
+        futures = deque()
+        for item in items:
+            futures.append(asyncio.run_coroutine_threadsafe(run(item), self.loop))
+            if len(futures) >= window:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+class AsyncPaginator(Paginator):
+    async def apages(self, *args, **kwargs):
+        """Returns an async generator which yields pages of data, like
+        Paginator.pages.
+
+        :param args: Passed to AsyncClient.request
+        :param kwargs: Passed to AsyncClient.request
+        """
+        params_key, params = self.pop_params(kwargs)
+        self.start()
+        while self.has_more_pages():
+            self.set_page_params(params)
+            response = await self.client.request(*args, **{params_key: params}, **kwargs)
+            page = self.next_page(response, params)
+            if page:
+                yield page
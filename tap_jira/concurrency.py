@@ -0,0 +1,27 @@
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """A ThreadPoolExecutor that runs every call in a copy of the submitting
+    thread's context variables, so the calls see the same SyncContext."""
+
+    def submit(self, fn, /, *args, **kwargs): # pylint: disable=arguments-differ
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def ordered_map(func, items, max_workers):
+    """Like ThreadPoolExecutor.map, yields func(item) for each item in order
+    while running up to max_workers of them at once, but only submits a few
+    items ahead of the one being yielded so results don't pile up in memory
+    when the caller is slower than the workers."""
+    window = max_workers * 2
+    with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = deque()
+        for item in items:
+            futures.append(executor.submit(func, item))
+            if len(futures) >= window:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
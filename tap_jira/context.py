@@ -1,61 +1,146 @@
+import contextvars
+import copy
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from singer import utils, metadata
 from .http import check_status
 
 
-class Context():
-    config = None
-    state = None
-    catalog = None
-    client = None
-    stream_map = {}
+class SyncContext():
+    """Everything a single run of the tap works with. Bookmarks are changed
+    under `state_lock` as streams may be synced from several threads.
 
-    @classmethod
-    def get_catalog_entry(cls, stream_name):
-        if not cls.stream_map:
-            cls.stream_map = {s.tap_stream_id: s for s in cls.catalog.streams}
-        return cls.stream_map[stream_name]
+    When several sites are synced at once, each has its own context whose
+    `state` is the site's part of `root_state`, all sharing one
+    `state_lock`, and whose output streams are named with `stream_prefix`."""
 
-    @classmethod
-    def is_selected(cls, stream_name):
-        stream = cls.get_catalog_entry(stream_name)
+    def __init__(self, config=None, state=None, catalog=None, client=None,
+                 state_lock=None, root_state=None, stream_prefix=""):
+        self.config = config
+        self.state = state
+        self.catalog = catalog
+        self.client = client
+        self.stream_map = {}
+        self.fingerprints = None
+        # The slice of issues this process syncs, see sharding.Shard
+        self.shard = None
+        # Sends fanned out requests from an event loop, see aio.AsyncClient
+        self.async_client = None
+        # Held while the state is changed or copied
+        self.state_lock = state_lock or threading.RLock()
+        self.root_state = root_state
+        self.stream_prefix = stream_prefix
+
+    def copy_state(self):
+        """Returns a copy of the state to write, which holds every site's
+        state when several are synced at once."""
+        with self.state_lock:
+            return copy.deepcopy(self.state if self.root_state is None else self.root_state)
+
+    def get_catalog_entry(self, stream_name):
+        if not self.stream_map:
+            self.stream_map = {s.tap_stream_id: s for s in self.catalog.streams}
+        return self.stream_map[stream_name]
+
+    def is_selected(self, stream_name):
+        stream = self.get_catalog_entry(stream_name)
         stream_metadata = metadata.to_map(stream.metadata)
         return metadata.get(stream_metadata, (), 'selected')
 
-    @classmethod
-    def bookmarks(cls):
-        if "bookmarks" not in cls.state:
-            cls.state["bookmarks"] = {}
-        return cls.state["bookmarks"]
-
-    @classmethod
-    def bookmark(cls, paths):
-        bookmark = cls.bookmarks()
-        for path in paths:
-            if path not in bookmark:
-                bookmark[path] = {}
-            bookmark = bookmark[path]
-        return bookmark
-
-    @classmethod
-    def set_bookmark(cls, path, val):
+    def bookmarks(self):
+        with self.state_lock:
+            if "bookmarks" not in self.state:
+                self.state["bookmarks"] = {}
+            return self.state["bookmarks"]
+
+    def bookmark(self, paths):
+        with self.state_lock:
+            bookmark = self.bookmarks()
+            for path in paths:
+                if path not in bookmark:
+                    bookmark[path] = {}
+                bookmark = bookmark[path]
+            return bookmark
+
+    def set_bookmark(self, path, val):
         if isinstance(val, datetime):
             val = utils.strftime(val)
-        cls.bookmark(path[:-1])[path[-1]] = val
+        with self.state_lock:
+            self.bookmark(path[:-1])[path[-1]] = val
 
-    @classmethod
-    def update_start_date_bookmark(cls, path):
-        val = cls.bookmark(path)
+    def update_start_date_bookmark(self, path):
+        val = self.bookmark(path)
         if not val:
-            val = cls.config["start_date"]
+            val = self.config["start_date"]
             val = utils.strptime_to_utc(val)
-            cls.set_bookmark(path, val)
+            self.set_bookmark(path, val)
         if isinstance(val, str):
             val = utils.strptime_to_utc(val)
         return val
 
-    @classmethod
-    def retrieve_timezone(cls):
-        response = cls.client.send("GET", "/rest/api/2/myself")
+    def get_config_int(self, key, default):
+        # Treat 0, "0", "" or a missing key the same way as request_timeout
+        # does and fall back to the default
+        value = self.config.get(key)
+        if value and int(value):
+            return int(value)
+        return default
+
+    def get_config_bool(self, key):
+        # Config values may come through as strings, e.g. "true"
+        return str(self.config.get(key, False)).lower() == "true"
+
+    def get_request_concurrency(self, key, default):
+        """Returns how many threads a stream sends requests from at once.
+        With adaptive concurrency its window holds back every request beyond
+        it, so there is a thread for as many requests as it may allow."""
+        concurrency = self.client.concurrency if self.client else None
+        if concurrency:
+            return concurrency.maximum
+        return self.get_config_int(key, default)
+
+    def retrieve_timezone(self):
+        response = self.client.send("GET", "/rest/api/2/myself")
         check_status(response)
         return response.json()["timeZone"]
+
+
+# The context of the run the current thread (or task) belongs to. Threads
+# started through concurrency.ContextThreadPoolExecutor inherit it.
+_current_context = contextvars.ContextVar("tap_jira_sync_context")
+
+
+def current_context():
+    try:
+        return _current_context.get()
+    except LookupError:
+        # Rather than sharing one context between runs that forgot theirs
+        raise Exception("No SyncContext is in use, run the tap within use_context") from None
+
+
+@contextmanager
+def use_context(sync_context):
+    """Makes `Context` refer to sync_context within the block."""
+    token = _current_context.set(sync_context)
+    try:
+        yield sync_context
+    finally:
+        _current_context.reset(token)
+
+
+class _CurrentContext():
+    """Stands for the SyncContext of the current run, so streams can keep
+    referring to `Context` while several runs share the process."""
+
+    def __getattr__(self, name):
+        return getattr(current_context(), name)
+
+    def __setattr__(self, name, value):
+        setattr(current_context(), name, value)
+
+    def __delattr__(self, name):
+        delattr(current_context(), name)
+
+
+Context = _CurrentContext()
@@ -0,0 +1,214 @@
+import calendar
+import datetime
+import re
+import unicodedata
+import pytz
+from singer import utils
+from dateutil.parser._parser import ParserError
+
+# Values accepted for the `date_out_of_range_policy` config. `skip` drops
+# the whole record (the historical behaviour), `null` only clears the
+# offending fields and still emits the record.
+DATE_OUT_OF_RANGE_POLICIES = ("skip", "null")
+DEFAULT_DATE_OUT_OF_RANGE_POLICY = "skip"
+
+# Marker used in date-time paths for "every item of this array".
+ANY_ITEM = "[]"
+
+# The shape of nearly every date-time Jira returns, e.g.
+# 2022-05-23T09:16:11.356+0000. Anything that doesn't match this is handed to
+# the same parser the Transformer uses.
+ISO_DATE_TIME_RE = re.compile(
+    r"^(\d{4,})-(\d{1,2})-(\d{1,2})"
+    r"(?:[T ](\d{1,2}):(\d{1,2})(?::(\d{1,2}))?(?:\.\d+)?)?"
+    r"(?:[Zz]|[+-](?:[01]\d|2[0-3]):?[0-5]\d)?$")
+
+
+def get_date_out_of_range_policy(config):
+    policy = config.get("date_out_of_range_policy") or DEFAULT_DATE_OUT_OF_RANGE_POLICY
+    if policy not in DATE_OUT_OF_RANGE_POLICIES:
+        raise Exception("Invalid date_out_of_range_policy `{}`, expected one of {}".format(
+            policy, ", ".join(DATE_OUT_OF_RANGE_POLICIES)))
+    return policy
+
+
+def _schema_types(schema):
+    types = schema.get("type", [])
+    return types if isinstance(types, list) else [types]
+
+
+def get_date_time_paths(schema, path=()):
+    """Returns the paths of every `date-time` field in the schema as tuples
+    of property names. ANY_ITEM stands for every item of an array and a
+    (pattern, properties) tuple for every key matched by patternProperties
+    that isn't already one of the object's properties."""
+    paths = []
+    for sub_schema in schema.get("anyOf", []):
+        paths.extend(get_date_time_paths(sub_schema, path))
+
+    if schema.get("format") == "date-time":
+        paths.append(path)
+
+    types = _schema_types(schema)
+    if "object" in types:
+        for key, sub_schema in schema.get("properties", {}).items():
+            paths.extend(get_date_time_paths(sub_schema, path + (key,)))
+        properties = frozenset(schema.get("properties", {}))
+        for pattern, sub_schema in schema.get("patternProperties", {}).items():
+            paths.extend(get_date_time_paths(sub_schema, path + ((pattern, properties),)))
+    if "array" in types and "items" in schema:
+        paths.extend(get_date_time_paths(schema["items"], path + (ANY_ITEM,)))
+    return paths
+
+
+def _is_valid_iso_date_time(value):
+    match = ISO_DATE_TIME_RE.match(value)
+    if not match:
+        return False
+    year, month, day, hour, minute, second = (int(x) if x else 0 for x in match.groups())
+    return (1 <= year <= 9999
+            and 1 <= month <= 12
+            and 1 <= day <= calendar.monthrange(year, month)[1]
+            and hour < 24 and minute < 60 and second < 60)
+
+
+def is_out_of_range_date(value):
+    """Returns True if the value is a date-time string that singer's
+    Transformer would reject because one of its parts is out of range."""
+    if not isinstance(value, str) or value == "" or _is_valid_iso_date_time(value):
+        return False
+
+    try:
+        # Parsing date to catch 'out of range' error
+        utils.strptime_to_utc(value)
+    except ParserError as err:
+        # Check the error message if the 'year' or 'day' is out of range
+        # For Example: year 51502 is out of range: 51502-06-08T14:46:42.000000
+        # or if 'month' or ['hours','minutes','seconds'] is not in range
+        # example: month must be in 1..12: 5150-33-08T14:46:42.000000
+        return "out of range" in str(err) or "must be in" in str(err)
+    return False
+
+
+def _walk(obj, path):
+    """Yields (container, key) for every value found at `path` inside obj."""
+    step, rest = path[0], path[1:]
+    if step == ANY_ITEM:
+        if isinstance(obj, list):
+            items = enumerate(obj)
+        else:
+            return
+    elif isinstance(step, tuple):
+        if isinstance(obj, dict):
+            pattern, properties = step
+            items = [(key, value) for key, value in obj.items()
+                     if key not in properties and re.match(pattern, key)]
+        else:
+            return
+    elif isinstance(obj, dict) and step in obj:
+        items = [(step, obj[step])]
+    else:
+        return
+
+    for key, value in items:
+        if rest:
+            yield from _walk(value, rest)
+        else:
+            yield obj, key
+
+
+def find_out_of_range_dates(record, date_time_paths):
+    """Returns a list of (container, key) for every date-time value in the
+    record that is out of range, so the caller can drop the record or clear
+    each of those fields in place."""
+    out_of_range = []
+    for path in date_time_paths:
+        if not path:
+            continue
+        for container, key in _walk(record, path):
+            if is_out_of_range_date(container[key]):
+                out_of_range.append((container, key))
+    return out_of_range
+
+
+def parse_timestamp(value):
+    """Parses an ISO-8601 timestamp such as Jira's 2022-05-23T09:16:11.356+0000
+    into an aware UTC datetime. This gives the same result as
+    singer.utils.strptime_to_utc, but tries the fixed-format
+    datetime.fromisoformat first which is much faster than dateutil."""
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return utils.strptime_to_utc(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=pytz.UTC)
+    return parsed.astimezone(pytz.UTC)
+
+
+def timestamp_range(values):
+    """Parses every timestamp and returns (min, max, count of max) in a
+    single pass."""
+    min_value = max_value = None
+    max_count = 0
+    for value in values:
+        value = parse_timestamp(value)
+        if max_value is None or value > max_value:
+            max_value = value
+            max_count = 1
+        elif value == max_value:
+            max_count += 1
+        if min_value is None or value < min_value:
+            min_value = value
+    return min_value, max_value, max_count
+
+
+# Abbreviated month names Jira uses in userReleaseDate/userStartDate for each
+# of the languages a user can pick, keyed by the lower-cased name without any
+# trailing ".". Japanese, Chinese and Korean use the month number followed by
+# 月/월 and are handled by USER_DATE_NUMERIC_MONTH_RE. Both the CLDR forms and
+# the older Java ones (e.g. märz, февр) are listed.
+USER_DATE_MONTHS = {name: month for month, names in enumerate([
+        # en, de, fr, es, it, pt, nl, da/no/sv, pl, cs, ru, tr, fi, hu, zh
+        ["jan", "jän", "janv", "ene", "gen", "sty", "led", "янв", "oca", "tammi", "一月"],
+        ["feb", "févr", "fév", "fev", "lut", "úno", "фев", "февр", "şub", "helmi", "febr", "二月"],
+        ["mar", "mär", "märz", "mrz", "mars", "mrt", "bře", "мар", "maalis", "márc", "三月"],
+        ["apr", "avr", "abr", "kwi", "dub", "апр", "nis", "huhti", "ápr", "四月"],
+        ["may", "mai", "mag", "mei", "maj", "kvě", "мая", "май", "touko", "máj", "五月"],
+        ["jun", "juin", "giu", "cze", "čvn", "июн", "haz", "kesä", "jún", "六月"],
+        ["jul", "juil", "lug", "lip", "čvc", "июл", "tem", "heinä", "júl", "七月"],
+        ["aug", "août", "ago", "sie", "srp", "авг", "ağu", "elo", "八月"],
+        ["sep", "sept", "set", "wrz", "zář", "сен", "сент", "eyl", "syys", "szept", "九月"],
+        ["oct", "okt", "ott", "out", "paź", "říj", "окт", "eki", "loka", "十月"],
+        ["nov", "lis", "ноя", "нояб", "kas", "marras", "十一月"],
+        ["dec", "dez", "des", "déc", "dic", "gru", "pro", "дек", "ara", "joulu", "十二月"],
+], start=1) for name in names}
+
+USER_DATE_RE = re.compile(r"^\s*(\d{1,2})/([^/]+)/(\d{2}|\d{4})\s*$")
+USER_DATE_NUMERIC_MONTH_RE = re.compile(r"^(\d{1,2})\s*[月월]$")
+
+
+def parse_user_date(user_date):
+    """Parses a `dd/Mon/yy` or `dd/Mon/yyyy` user date into a date, or returns
+    None if the month isn't one we know so the caller can fall back to a
+    general purpose parser. Two digit years follow the same rule as
+    strptime's %y (69-99 are 1900s, 00-68 are 2000s)."""
+    match = USER_DATE_RE.match(user_date)
+    if not match:
+        return None
+    day, month_name, year = match.groups()
+
+    month_name = unicodedata.normalize("NFC", month_name.strip().lower()).rstrip(".")
+    month = USER_DATE_MONTHS.get(month_name)
+    if month is None:
+        numeric_month = USER_DATE_NUMERIC_MONTH_RE.match(month_name)
+        if not numeric_month:
+            return None
+        month = int(numeric_month.group(1))
+
+    year = int(year)
+    if len(match.group(3)) == 2:
+        year += 1900 if year >= 69 else 2000
+    try:
+        return datetime.date(year, month, int(day))
+    except ValueError:
+        return None
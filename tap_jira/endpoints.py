@@ -0,0 +1,8 @@
+import re
+
+
+def endpoint_of(path):
+    """Returns the endpoint a request path is sent to, with the ids of issues,
+    projects, etc. replaced so their requests are counted together."""
+    # The number after /api/ is the API version, not an id
+    return re.sub(r"(?<!/api)/\d+(?=/|$)", "/{id}", path)
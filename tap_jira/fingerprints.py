@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import timedelta
+from singer import utils
+import singer
+
+LOGGER = singer.get_logger()
+
+# Bump this whenever the way records are hashed or the file layout changes,
+# stores written with another version are discarded.
+FINGERPRINT_STORE_VERSION = 1
+
+# Re-emit every record of a stream at least this often even if unchanged
+DEFAULT_FULL_REFRESH_HOURS = 24
+
+
+def fingerprint(record):
+    """Returns a compact hash of the record's content."""
+    content = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class FingerprintStore():
+    """Keeps a hash of every record written for FULL_TABLE streams, keyed by
+    primary key, in a local file so later runs can skip records that haven't
+    changed. Every stream is still written in full once per
+    full_refresh_interval.
+
+    Fingerprints seen during a run only replace the stored ones when `save`
+    is called, which should only happen once the sync has succeeded."""
+
+    def __init__(self, path, full_refresh_interval=timedelta(hours=DEFAULT_FULL_REFRESH_HOURS)):
+        self.path = path
+        self.full_refresh_interval = full_refresh_interval
+        self.lock = threading.Lock()
+        self.started_at = utils.now()
+        self.fingerprints = {}
+        self.refreshed_at = {}
+        self.seen = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as store_file:
+            store = json.load(store_file)
+        if store.get("version") != FINGERPRINT_STORE_VERSION:
+            LOGGER.info("Discarding fingerprint store %s written with version %s",
+                        self.path, store.get("version"))
+            return
+        self.fingerprints = store["fingerprints"]
+        self.refreshed_at = {stream: utils.strptime_to_utc(refreshed_at)
+                             for stream, refreshed_at in store["refreshed_at"].items()}
+
+    def is_full_refresh(self, tap_stream_id):
+        refreshed_at = self.refreshed_at.get(tap_stream_id)
+        return refreshed_at is None or self.started_at - refreshed_at >= self.full_refresh_interval
+
+    def is_unchanged(self, tap_stream_id, record, pk_fields):
+        """Records the record's fingerprint and returns True if the same
+        record was written by a previous run and can be skipped."""
+        key = json.dumps([record.get(pk) for pk in pk_fields], default=str)
+        value = fingerprint(record)
+        with self.lock:
+            self.seen.setdefault(tap_stream_id, {})[key] = value
+            return (not self.is_full_refresh(tap_stream_id)
+                    and self.fingerprints.get(tap_stream_id, {}).get(key) == value)
+
+    def save(self):
+        with self.lock:
+            for tap_stream_id, seen in self.seen.items():
+                if self.is_full_refresh(tap_stream_id):
+                    self.refreshed_at[tap_stream_id] = self.started_at
+                self.fingerprints[tap_stream_id] = seen
+            store = {"version": FINGERPRINT_STORE_VERSION,
+                     "refreshed_at": {stream: utils.strftime(refreshed_at)
+                                      for stream, refreshed_at in self.refreshed_at.items()},
+                     "fingerprints": self.fingerprints}
+        # Write to a temporary file first so an interrupted save can't leave
+        # a truncated store behind
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as store_file:
+            json.dump(store, store_file)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, wait
+import singer
+from .concurrency import ContextThreadPoolExecutor
+from .endpoints import endpoint_of
+
+LOGGER = singer.get_logger()
+
+DEFAULT_HEDGE_PERCENTILE = 95
+
+# Share of requests that may be sent twice
+DEFAULT_HEDGE_BUDGET = 0.05
+
+# Hedges that may be sent at once after a quiet period
+MAX_HEDGE_TOKENS = 10
+
+# Latencies kept per endpoint, and how many are needed before hedging
+LATENCY_SAMPLES = 100
+MIN_LATENCY_SAMPLES = 20
+
+MAX_WORKERS = 32
+
+
+def get_hedger(config):
+    """Returns a Hedger if `hedge_requests` is enabled."""
+    if str(config.get("hedge_requests", False)).lower() != "true":
+        return None
+    return Hedger(float(config.get("hedge_percentile") or DEFAULT_HEDGE_PERCENTILE),
+                  float(config.get("hedge_budget") or DEFAULT_HEDGE_BUDGET))
+
+
+class Hedger():
+    """Sends a second copy of a request that takes longer than `percentile`
+    of the recent requests to its endpoint and returns whichever response
+    comes first. Every request earns `budget` of a hedge, so at most that
+    share of requests is sent twice.
+
+    Only idempotent requests may be hedged. The slower response is closed
+    when it arrives. Requests are timed from when they are sent, not from
+    when they were queued for one of the hedger's threads."""
+
+    def __init__(self, percentile=DEFAULT_HEDGE_PERCENTILE, budget=DEFAULT_HEDGE_BUDGET):
+        self.percentile = percentile
+        self.budget = budget
+        self.tokens = 0.0
+        self.latencies = {}
+        self.lock = threading.Lock()
+        self.executor = ContextThreadPoolExecutor(max_workers=MAX_WORKERS,
+                                                  thread_name_prefix="tap-jira-hedge")
+
+    def close(self):
+        # Slower copies still being sent finish in the background
+        self.executor.shutdown(wait=False)
+
+    def threshold(self, endpoint):
+        """Returns the latency after which a request to the endpoint is
+        hedged, or None until enough of them have been timed."""
+        with self.lock:
+            latencies = sorted(self.latencies.get(endpoint, ()))
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        index = min(int(len(latencies) * self.percentile / 100), len(latencies) - 1)
+        return latencies[index]
+
+    def _take_token(self):
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def _timed(self, endpoint, send, started_event=None):
+        started = time.monotonic()
+        if started_event:
+            started_event.set()
+        response = send()
+        with self.lock:
+            self.latencies.setdefault(endpoint, deque(maxlen=LATENCY_SAMPLES)).append(
+                time.monotonic() - started)
+        return response
+
+    def _hedge(self, endpoint, send, pace, cancelled):
+        with pace():
+            # Not worth sending once the first response arrived while waiting
+            if cancelled.is_set():
+                return None
+            return self._timed(endpoint, send)
+
+    def send(self, path, send, pace=nullcontext):
+        """Returns the response of `send()`, calling it a second time if the
+        first call is slow to return. The second call is made within
+        `pace()`, which waits for the client's throttle and rate limiter."""
+        endpoint = endpoint_of(path)
+        with self.lock:
+            self.tokens = min(MAX_HEDGE_TOKENS, self.tokens + self.budget)
+        threshold = self.threshold(endpoint)
+        if threshold is None:
+            return self._timed(endpoint, send)
+
+        started = threading.Event()
+        primary = self.executor.submit(self._timed, endpoint, send, started)
+        started.wait()
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._take_token():
+            return primary.result()
+
+        LOGGER.info("Request to %s took over %.2fs, sending it again", endpoint, threshold)
+        cancelled = threading.Event()
+        hedge = self.executor.submit(self._hedge, endpoint, send, pace, cancelled)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result() is not None:
+                    cancelled.set()
+                    for slower in pending:
+                        slower.add_done_callback(_close_response)
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+
+def _close_response(future):
+    # Responses of Http2Session and aiohttp are read in full and have no raw
+    # connection to give back
+    if (future.exception() is None and future.result() is not None
+            and future.result().raw is not None):
+        future.result().close()
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 import time
+from contextlib import contextmanager, nullcontext
 import threading
 import re
 from requests.exceptions import (HTTPError, Timeout)
@@ -8,6 +9,11 @@ import requests
 from singer import metrics
 import singer
 import backoff
+from .http_cache import HttpCache, get_ttls
+from .rate_limit import get_rate_limiter, retry_after
+from .adaptive import get_adaptive_concurrency
+from .hedging import get_hedger
+from .http2 import Http2Session, use_http2
 
 # Jira OAuth tokens last for 3600 seconds. We set it to 3500 to try to
 # come in under the limit.
@@ -157,13 +163,31 @@ def get_request_timeout(config):
     return request_timeout
 
 class Client():
-    def __init__(self, config):
+    def __init__(self, config, session=None):
         self.is_cloud = 'oauth_client_id' in config.keys()
-        self.session = requests.Session()
+        # Clients of several sites may share a session and its connections
+        if session is None:
+            session = Http2Session() if use_http2(config) else requests.Session()
+        self.session = session
         self.next_request_at = datetime.now()
+        # Requests may be sent from several threads at once, this keeps them
+        # TIME_BETWEEN_REQUESTS apart
+        self.throttle_lock = threading.Lock()
+        # Set when streams are synced concurrently, see scheduler.RequestBudget
+        self.request_budget = None
         self.user_agent = config.get("user_agent")
         self.login_timer = None
         self.timeout = get_request_timeout(config)
+        self.cache = None
+        if config.get("http_cache_path"):
+            self.cache = HttpCache(config["http_cache_path"], get_ttls(config))
+        self.cache_identity = config.get("username") or config.get("oauth_client_id")
+        # Shared with the other tap processes on this host, see rate_limit
+        self.rate_limiter = get_rate_limiter(config)
+        # Replaces the TIME_BETWEEN_REQUESTS throttle when enabled, see adaptive
+        self.concurrency = get_adaptive_concurrency(config)
+        # Sends slow GETs twice, see hedging
+        self.hedger = get_hedger(config)
 
         # Assign False for cloud Jira instance
         self.is_on_prem_instance = False
@@ -211,12 +235,7 @@ class Client():
 
         return headers
 
-    @backoff.on_exception(backoff.expo,
-                          (requests.exceptions.ConnectionError, HTTPError, Timeout),
-                          jitter=None,
-                          max_tries=6,
-                          giveup=lambda e: not should_retry_httperror(e))
-    def send(self, method, path, headers={}, **kwargs):
+    def prepare(self, method, path, headers={}, **kwargs):
         if self.is_cloud:
             # OAuth Path
             request = requests.Request(method,
@@ -230,25 +249,101 @@ class Client():
                                        auth=self.auth,
                                        headers=self._headers(headers),
                                        **kwargs)
-        return self.session.send(request.prepare(), timeout=self.timeout)
+        return request.prepare()
+
+    @backoff.on_exception(backoff.expo,
+                          (requests.exceptions.ConnectionError, HTTPError, Timeout),
+                          jitter=None,
+                          max_tries=6,
+                          giveup=lambda e: not should_retry_httperror(e))
+    def send(self, method, path, headers={}, **kwargs):
+        prepared = self.prepare(method, path, headers, **kwargs)
+        if self.concurrency is None:
+            return self.session.send(prepared, timeout=self.timeout)
+        with self.concurrency.slot(path) as result:
+            response = self.session.send(prepared, timeout=self.timeout)
+            result["status_code"] = response.status_code
+        return response
 
     @backoff.on_exception(backoff.constant,
                           JiraBackoffError,
                           max_tries=10,
                           interval=60)
     def request(self, tap_stream_id, *args, **kwargs):
-        wait = (self.next_request_at - datetime.now()).total_seconds()
-        if wait > 0:
-            time.sleep(wait)
-        with metrics.http_request_timer(tap_stream_id) as timer:
-            response = self.send(*args, **kwargs)
-            self.next_request_at = datetime.now() + TIME_BETWEEN_REQUESTS
-            timer.tags[metrics.Tag.http_status_code] = response.status_code
-            timer.tags["http_method"] = response.request.method
-            timer.tags["tap_stream_id"] = tap_stream_id
-            timer.tags["endpoint"] = response.url
+        ttl = self.cache.ttl(*args, **kwargs) if self.cache else None
+        entry = None
+        if ttl is not None:
+            cache_key = self._cache_key(*args, **kwargs)
+            entry = self.cache.get(cache_key)
+            if entry and self.cache.is_fresh(entry, ttl):
+                return entry["body"]
+            if entry:
+                kwargs["headers"] = {**kwargs.get("headers", {}), **self.cache.validators(entry)}
+
+        with self.paced(tap_stream_id):
+            with metrics.http_request_timer(tap_stream_id) as timer:
+                hedged_path = self._hedged_path(*args, **kwargs)
+                if hedged_path:
+                    # The copy of a slow request waits for the throttle and rate limiter like any other
+                    response = self.hedger.send(hedged_path, lambda: self.send(*args, **kwargs),
+                                                lambda: self.paced(tap_stream_id, budgeted=False))
+                else:
+                    response = self.send(*args, **kwargs)
+                if self.concurrency is None:
+                    with self.throttle_lock:
+                        self.next_request_at = max(self.next_request_at,
+                                                   datetime.now() + TIME_BETWEEN_REQUESTS)
+                else:
+                    timer.tags["concurrency_window"] = int(self.concurrency.window)
+                timer.tags[metrics.Tag.http_status_code] = response.status_code
+                timer.tags["http_method"] = response.request.method
+                timer.tags["tap_stream_id"] = tap_stream_id
+                timer.tags["endpoint"] = response.url
+        if self.rate_limiter and response.status_code == 429:
+            self.rate_limiter.cool_down(retry_after(response, self.rate_limiter.cooldown_seconds))
+        if entry and response.status_code == 304:
+            self.cache.refresh(cache_key, entry)
+            return entry["body"]
         check_status(response)
-        return response.json()
+        body = response.json()
+        if ttl is not None:
+            self.cache.put(cache_key, body, response.headers)
+        return body
+
+    @contextmanager
+    def paced(self, tap_stream_id, budgeted=True):
+        """Holds a slot of the stream's request budget while a request is
+        sent, after waiting for TIME_BETWEEN_REQUESTS and a token of the
+        shared rate limiter. Hedged copies aren't `budgeted`, as waiting for
+        the slot held by the slow original would make them pointless."""
+        budget = self.request_budget if budgeted else None
+        with budget.slot(tap_stream_id) if budget else nullcontext():
+            if self.concurrency is None:
+                wait = self.reserve_send_time()
+                if wait > 0:
+                    time.sleep(wait)
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            yield
+
+    def reserve_send_time(self):
+        """Reserves the next time a request may be sent, TIME_BETWEEN_REQUESTS
+        after the last reserved one, so concurrent callers queue behind it.
+        Returns the seconds to wait until then."""
+        with self.throttle_lock:
+            now = datetime.now()
+            send_at = max(now, self.next_request_at)
+            self.next_request_at = send_at + TIME_BETWEEN_REQUESTS
+        return (send_at - now).total_seconds()
+
+    def _cache_key(self, method, path, params=None, **_kwargs): # pylint: disable=unused-argument
+        return self.cache.key(self.url(path), params, self.cache_identity)
+
+    def _hedged_path(self, method=None, path=None, **_kwargs):
+        # Only GETs are idempotent enough to be sent twice
+        if self.hedger and method and method.upper() == "GET":
+            return path
+        return None
 
     # backoff for Timeout error is already included in "Exception"
     # as it's a parent class of "Timeout" error
@@ -300,65 +395,84 @@ class Paginator():
         of the next page is (useful for bookmarking).
 
         :param args: Passed to Client.request
-        :param kwargs: Passed to Client.request
+        :param kwargs: Passed to Client.request, see pop_params
         """
-        params = kwargs.pop("params", {}).copy()
-        while self.next_page_num is not None:
-            params["startAt"] = self.next_page_num
-            if self.order_by:
-                params["orderBy"] = self.order_by
-            response = self.client.request(*args, params=params, **kwargs)
-            if self.items_key:
-                page = response[self.items_key]
-            else:
-                page = response
-
-            # Accounts for responses that don't nest their results in a
-            # key by falling back to the params `maxResults` setting.
-            if 'maxResults' in response:
-                max_results = response['maxResults']
-            else:
-                max_results = params['maxResults']
-
-            if len(page) < max_results:
-                self.next_page_num = None
-            else:
-                self.next_page_num += max_results
-
+        params_key, params = self.pop_params(kwargs)
+        self.start()
+        while self.has_more_pages():
+            self.set_page_params(params)
+            response = self.client.request(*args, **{params_key: params}, **kwargs)
+            page = self.next_page(response, params)
             if page:
                 yield page
 
+    @staticmethod
+    def pop_params(kwargs):
+        """Takes the params the page params are added to out of the request
+        kwargs: the JSON body of requests that have one, else the query."""
+        params_key = "json" if "json" in kwargs else "params"
+        return params_key, kwargs.pop(params_key, {}).copy()
+
+    def start(self):
+        pass
+
+    def has_more_pages(self):
+        return self.next_page_num is not None
+
+    def set_page_params(self, params):
+        params["startAt"] = self.next_page_num
+        if self.order_by:
+            params["orderBy"] = self.order_by
+
+    def next_page(self, response, params):
+        """Returns the page of the response and moves next_page_num past it."""
+        if self.items_key:
+            page = response[self.items_key]
+        else:
+            page = response
+
+        # Accounts for responses that don't nest their results in a
+        # key by falling back to the params `maxResults` setting.
+        if 'maxResults' in response:
+            max_results = response['maxResults']
+        else:
+            max_results = params['maxResults']
+
+        if len(page) < max_results:
+            self.next_page_num = None
+        else:
+            self.next_page_num += max_results
+        return page
+
 class IssuesPaginator(Paginator):
+    """Pages through the issue search, which returns a `nextPageToken`
+    instead of taking a `startAt`."""
 
-    def pages(self, *args, **kwargs):
-        """Returns a generator which yields pages of data. When a given page is
-        yielded, the next_page_num property can be used to know what the index
-        of the next page is (useful for bookmarking).
+    def __init__(self, client, page_num=0, order_by=None, items_key="values"):
+        super().__init__(client, page_num, order_by, items_key)
+        self.is_last = False
 
-        :param args: Passed to Client.request
-        :param kwargs: Passed to Client.request
-        """
-        params = kwargs.pop("params", {}).copy()
-        has_more_pages = True
-
-        while has_more_pages:
-            if self.next_page_num:
-                if isinstance(self.next_page_num, str):
-                    params["nextPageToken"] = self.next_page_num
-            if self.order_by:
-                params["orderBy"] = self.order_by
-            response = self.client.request(*args, params=params, **kwargs)
-            if self.items_key:
-                page = response[self.items_key]
-            else:
-                page = response
-
-            # Accounts for responses that don't nest their results in a
-            # key by falling back to the params `maxResults` setting.
-            if 'isLast' in response:
-                has_more_pages = bool(not response["isLast"])
-
-            self.next_page_num = response.get("nextPageToken") or None
+    def start(self):
+        self.is_last = False
 
-            if page:
-                yield page
+    def has_more_pages(self):
+        return not self.is_last
+
+    def set_page_params(self, params):
+        if self.next_page_num:
+            if isinstance(self.next_page_num, str):
+                params["nextPageToken"] = self.next_page_num
+        if self.order_by:
+            params["orderBy"] = self.order_by
+
+    def next_page(self, response, params):
+        if self.items_key:
+            page = response[self.items_key]
+        else:
+            page = response
+
+        if 'isLast' in response:
+            self.is_last = bool(response["isLast"])
+
+        self.next_page_num = response.get("nextPageToken") or None
+        return page
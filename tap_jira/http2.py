@@ -0,0 +1,65 @@
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Connections kept open to each host. Over HTTP/2 every one of them carries
+# many requests at once.
+DEFAULT_MAX_CONNECTIONS = 10
+
+
+def use_http2(config):
+    return str(config.get("http2", False)).lower() == "true"
+
+
+class Http2Session():
+    """Stands in for the requests.Session of a Client, sending the requests
+    it prepares over HTTP/2 with httpx. Concurrent requests to a host, e.g.
+    api.atlassian.com, are multiplexed over one TLS connection rather than
+    each needing a connection of its own.
+
+    Responses are returned as requests.Response, and httpx errors raised as
+    the requests exceptions Client retries on, so the rest of the client
+    can't tell the difference."""
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, keep_cookies=True, verify=True):
+        if httpx is None:
+            raise Exception("The http2 option needs httpx, install it with `pip install tap-jira[http2]`")
+        cookies = None
+        if not keep_cookies:
+            # A jar that accepts no cookies, like sites.shared_session's
+            cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        self.client = httpx.Client(http2=True, verify=verify, cookies=cookies,
+                                   limits=httpx.Limits(max_connections=max_connections))
+
+    def send(self, prepared, timeout=None):
+        try:
+            http2_response = self.client.request(prepared.method, prepared.url,
+                                                 headers=dict(prepared.headers),
+                                                 content=prepared.body,
+                                                 timeout=timeout,
+                                                 # As requests.Session.send does
+                                                 follow_redirects=True)
+        except httpx.TimeoutException as ex:
+            raise requests.exceptions.Timeout(str(ex), request=prepared) from ex
+        except httpx.TransportError as ex:
+            raise requests.exceptions.ConnectionError(str(ex), request=prepared) from ex
+
+        response = requests.Response()
+        response.status_code = http2_response.status_code
+        response.reason = http2_response.reason_phrase
+        response.headers = CaseInsensitiveDict(http2_response.headers)
+        response._content = http2_response.content # pylint: disable=protected-access
+        response.url = str(http2_response.url)
+        response.request = prepared
+        return response
+
+    def post(self, url, data=None, timeout=None):
+        return self.send(requests.Request("POST", url, data=data).prepare(), timeout=timeout)
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import singer
+
+LOGGER = singer.get_logger()
+
+# Bump this whenever the layout of the cache entries changes, entries written
+# with another version are treated as missing.
+HTTP_CACHE_VERSION = 1
+
+# Reference data that rarely changes. Responses from these endpoints are
+# reused for this many seconds before being revalidated with the server.
+DEFAULT_TTLS = {
+    "/rest/api/2/resolution": 24 * 60 * 60,
+    "/rest/api/2/role": 24 * 60 * 60,
+    "/rest/api/2/projectCategory": 24 * 60 * 60,
+    "/rest/api/2/project/type": 24 * 60 * 60,
+}
+
+# Requests made to verify the credentials, which must reach the server
+CREDENTIAL_CHECK_PATHS = ("/rest/api/2/serverInfo",)
+
+
+def get_ttls(config):
+    """Returns the TTL in seconds of every cacheable path, with the defaults
+    overridden by the `http_cache_ttls` config which may be a dict or a JSON
+    string."""
+    ttls = dict(DEFAULT_TTLS)
+    overrides = config.get("http_cache_ttls") or {}
+    if isinstance(overrides, str):
+        overrides = json.loads(overrides)
+    ttls.update({path: float(ttl) for path, ttl in overrides.items()})
+    return ttls
+
+
+class HttpCache():
+    """Keeps the JSON bodies of GET responses from reference endpoints in a
+    local directory, one file per request.
+
+    A cached body is returned without any call while it is younger than its
+    endpoint's TTL. After that the request is sent with the ETag and
+    Last-Modified validators the server returned, if any, so an unchanged
+    resource only costs a 304."""
+
+    def __init__(self, directory, ttls):
+        self.directory = directory
+        self.ttls = ttls
+        os.makedirs(directory, exist_ok=True)
+
+    def ttl(self, method=None, path=None, **_kwargs):
+        """Takes the arguments of Client.send and returns the TTL of the
+        request or None if it isn't cacheable."""
+        if not method or method.upper() != "GET" or path in CREDENTIAL_CHECK_PATHS:
+            return None
+        return self.ttls.get(path)
+
+    @staticmethod
+    def key(url, params, identity):
+        # The identity keeps responses of different users of the same site
+        # apart, as what they may see differs.
+        content = json.dumps([url, sorted((params or {}).items()), identity], default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != HTTP_CACHE_VERSION:
+            return None
+        return entry
+
+    @staticmethod
+    def is_fresh(entry, ttl):
+        return time.time() - entry["fetched_at"] < ttl
+
+    @staticmethod
+    def validators(entry):
+        """Returns the conditional request headers for the entry."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, key, body, headers):
+        self._write(key, {"version": HTTP_CACHE_VERSION,
+                          "fetched_at": time.time(),
+                          "etag": headers.get("ETag"),
+                          "last_modified": headers.get("Last-Modified"),
+                          "body": body})
+
+    def refresh(self, key, entry):
+        """Marks an entry the server confirmed as unchanged as fresh again."""
+        entry["fetched_at"] = time.time()
+        self._write(key, entry)
+
+    def _write(self, key, entry):
+        # Write to a temporary file first so concurrent or interrupted writes
+        # can't leave a truncated entry behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as entry_file:
+                json.dump(entry, entry_file)
+            os.replace(tmp_path, self._path(key))
+        except OSError as ex:
+            LOGGER.warning("Could not write HTTP cache entry %s: %s", key, ex)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
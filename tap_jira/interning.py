@@ -0,0 +1,64 @@
+class Interner():
+    """Canonicalizes identical nested objects and strings so that a page of
+    decoded JSON holds a single shared instance of each.
+
+    Issues embed full copies of the same users, statuses, priorities, issue
+    types and projects (with their avatarUrls and self links), so sharing
+    them cuts the memory a page of issues needs considerably.
+
+    Only objects nobody mutates afterwards may be shared, so callers decide
+    which containers to hand to `intern_children` rather than interning
+    whole records."""
+
+    def __init__(self):
+        self.objects = {}
+        self.strings = {}
+
+    def _key(self, value):
+        # Children are interned before their parent, so identical children
+        # are already the same instance and can be compared by id.
+        if isinstance(value, (dict, list)):
+            return id(value)
+        return (type(value), value)
+
+    def intern(self, value):
+        if isinstance(value, str):
+            return self.strings.setdefault(value, value)
+        if isinstance(value, dict):
+            self.intern_children(value)
+            key = (dict, tuple((k, self._key(v)) for k, v in value.items()))
+        elif isinstance(value, list):
+            self.intern_children(value)
+            key = (list, tuple(self._key(v) for v in value))
+        else:
+            return value
+        return self.objects.setdefault(key, value)
+
+    def intern_children(self, value):
+        """Interns everything inside the dict or list in place without sharing
+        the container itself."""
+        if isinstance(value, dict):
+            for k, v in value.items():
+                value[k] = self.intern(v)
+        elif isinstance(value, list):
+            for i, v in enumerate(value):
+                value[i] = self.intern(v)
+
+
+def intern_issues(page):
+    """Shares identical nested objects across a page of issues. Transitions,
+    comments and changelog histories get an `issueId` written into them
+    later, so only their contents are shared, never the objects themselves."""
+    interner = Interner()
+    for issue in page:
+        for key, value in issue.get("fields", {}).items():
+            if key == "comment" and isinstance(value, dict):
+                for comment in value.get("comments", []):
+                    interner.intern_children(comment)
+            else:
+                issue["fields"][key] = interner.intern(value)
+        for history in (issue.get("changelog") or {}).get("histories", []):
+            interner.intern_children(history)
+        for transition in issue.get("transitions") or []:
+            interner.intern_children(transition)
+    return page
@@ -0,0 +1,118 @@
+import copy
+import queue
+import threading
+from contextlib import contextmanager
+import singer
+from .context import Context
+
+# Number of messages producers can get ahead of the writer before they block,
+# which keeps memory bounded when the target reads slowly.
+DEFAULT_MAX_QUEUED_MESSAGES = 1000
+
+# How often a producer blocked on a full queue checks whether the writer died
+PUT_TIMEOUT = 1
+
+# Streams may be synced from several threads at once, without a writer thread
+# messages are written one at a time so their lines never interleave.
+OUTPUT_LOCK = threading.Lock()
+
+_CLOSE = object()
+
+
+class OutputWriter():
+    """Writes the messages of every producer thread from a single thread, in
+    the order they were queued.
+
+    Each stream is only written from one thread so its records keep their
+    order. A state message is queued after the records its bookmarks cover,
+    since bookmarks are only moved once those records have been written, so
+    it is always written after them. Producers block while `max_queued`
+    messages are waiting.
+
+    Records are written after write_record returns, so they must not be
+    changed afterwards."""
+
+    def __init__(self, max_queued=DEFAULT_MAX_QUEUED_MESSAGES):
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="tap-jira-output", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            message = self.queue.get()
+            if message is _CLOSE:
+                return
+            if self.error is not None:
+                continue    # drain the queue so blocked producers can notice
+            write, args, kwargs = message
+            try:
+                write(*args, **kwargs)
+            except Exception as ex: # pylint: disable=broad-except
+                self.error = ex
+
+    def put(self, write, *args, **kwargs):
+        while True:
+            if self.error is not None:
+                raise self.error
+            try:
+                self.queue.put((write, args, kwargs), timeout=PUT_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+
+    def close(self):
+        """Waits for every queued message to be written."""
+        self.queue.put(_CLOSE)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+_writer = None
+
+
+@contextmanager
+def writer(max_queued=DEFAULT_MAX_QUEUED_MESSAGES):
+    """Routes write_record and write_state through an OutputWriter until the
+    block exits, when all queued messages are written."""
+    global _writer # pylint: disable=global-statement
+    output_writer = OutputWriter(max_queued)
+    output_writer.start()
+    _writer = output_writer
+    try:
+        yield output_writer
+    finally:
+        _writer = None
+        output_writer.close()
+
+
+def _write(write, *args, **kwargs):
+    if _writer is not None:
+        _writer.put(write, *args, **kwargs)
+        return
+    with OUTPUT_LOCK:
+        write(*args, **kwargs)
+
+
+def write_schema(tap_stream_id, schema, key_properties):
+    _write(singer.write_schema, Context.stream_prefix + tap_stream_id, schema, key_properties)
+
+
+def write_record(tap_stream_id, record, time_extracted=None):
+    _write(singer.write_record, Context.stream_prefix + tap_stream_id, record,
+           time_extracted=time_extracted)
+
+
+def write_state(state):
+    # Copy the state while no bookmark is being changed, and queue it before
+    # any other thread can, so a state is never followed by an older one. A
+    # site's state is written as part of the state of every site synced with it.
+    with Context.state_lock:
+        if state is Context.state:
+            state = Context.copy_state()
+        else:
+            state = copy.deepcopy(state)
+        _write(singer.write_state, state)
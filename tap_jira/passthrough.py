@@ -0,0 +1,107 @@
+from singer import metadata
+
+# Formats singer's Transformer converts values for. Any other format (e.g.
+# `uri`) is left alone.
+TRANSFORMED_FORMATS = ("date-time", "singer.decimal")
+
+# The Python type a value needs to already have for the Transformer to
+# return it unchanged for each JSON schema type.
+IDENTITY_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+}
+
+
+def _schema_types(schema):
+    types = schema["type"]
+    types = list(types) if isinstance(types, list) else [types]
+    # The Transformer always tries "null" last
+    if "null" in types:
+        types.remove("null")
+        types.append("null")
+    return types
+
+
+def is_passthrough_schema(schema):
+    """Returns True if nothing in the schema makes the Transformer change a
+    value that already has the right type, i.e. no formats it converts and
+    no anyOf or patternProperties."""
+    if "anyOf" in schema or "patternProperties" in schema:
+        return False
+    if schema.get("format") in TRANSFORMED_FORMATS:
+        return False
+    if "items" in schema and not is_passthrough_schema(schema["items"]):
+        return False
+    return all(is_passthrough_schema(s) for s in schema.get("properties", {}).values())
+
+
+def is_passthrough_metadata(mdata):
+    """Returns True if the metadata doesn't make the Transformer drop any
+    field."""
+    for breadcrumb in mdata:
+        if breadcrumb == ():
+            continue
+        if (metadata.get(mdata, breadcrumb, 'selected') is False
+                or metadata.get(mdata, breadcrumb, 'inclusion') == 'unsupported'):
+            return False
+    return True
+
+
+def _could_transform(value, typ):
+    # Whether the Transformer would succeed in converting the value to
+    # `typ`, which stops it from trying any of the types after it.
+    if typ == "null":
+        return value is None or value == ""
+    if typ in ("integer", "number"):
+        try:
+            (int if typ == "integer" else float)(value.replace(",", "") if isinstance(value, str) else value)
+        except Exception: # pylint: disable=broad-except
+            return False
+        return True
+    if typ == "string":
+        return value is not None
+    return typ == "boolean"
+
+
+def _is_identity_object(value, schema):
+    properties = schema.get("properties")
+    return not properties or all(key in properties and is_identity(val, properties[key])
+                                 for key, val in value.items())
+
+
+def _is_identity_array(value, schema):
+    return all(is_identity(item, schema["items"]) for item in value)
+
+
+def _has_type(python_type):
+    # An exact check as e.g. a bool is an int but is turned into 1 or 0
+    return lambda value: type(value) is python_type # pylint: disable=unidiomatic-typecheck
+
+
+# For each JSON schema type, whether a value is of that type and, if it is,
+# whether the Transformer gives it back unchanged.
+IDENTITY_CHECKS = {
+    "null": (lambda value: value is None, lambda value, schema: True),
+    "object": (lambda value: isinstance(value, dict), _is_identity_object),
+    "array": (lambda value: isinstance(value, list), _is_identity_array),
+    **{typ: (_has_type(python_type), lambda value, schema: True)
+       for typ, python_type in IDENTITY_TYPES.items()},
+}
+
+
+def is_identity(value, schema):
+    """Returns True only if transforming the value against the schema would
+    give back an equal value of the same types, so it can be written as is.
+    Expects a schema for which is_passthrough_schema is True."""
+    if "type" not in schema:
+        return True
+
+    for typ in _schema_types(schema):
+        has_type, check = IDENTITY_CHECKS.get(typ, (lambda value: False, None))
+        if has_type(value):
+            return check(value, schema)
+        if _could_transform(value, typ):
+            return False
+    return False
@@ -0,0 +1,120 @@
+import fcntl
+import json
+import os
+import time
+import singer
+
+LOGGER = singer.get_logger()
+
+DEFAULT_REQUESTS_PER_SECOND = 10
+DEFAULT_BURST = 10
+
+# How long every process waits after a 429 without a Retry-After header,
+# the same as the interval Client.request backs off for
+DEFAULT_COOLDOWN_SECONDS = 60
+
+
+def get_rate_limiter(config):
+    """Returns a SharedRateLimiter if `rate_limit_path` is configured."""
+    if not config.get("rate_limit_path"):
+        return None
+    return SharedRateLimiter(
+        config["rate_limit_path"],
+        float(config.get("rate_limit_requests_per_second") or DEFAULT_REQUESTS_PER_SECOND),
+        float(config.get("rate_limit_burst") or DEFAULT_BURST),
+        float(config.get("rate_limit_cooldown_seconds") or DEFAULT_COOLDOWN_SECONDS))
+
+
+def retry_after(response, default):
+    """Returns the seconds to wait according to the response's Retry-After
+    header, or `default` if it has none in seconds."""
+    try:
+        return max(float(response.headers.get("Retry-After")), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+class SharedRateLimiter():
+    """A token bucket kept in a local file so that every tap process on the
+    host sending requests to the same Jira site draws from one budget.
+
+    The file holds the tokens left, when they were counted and until when
+    all processes cool down after one of them got a 429. It is only read and
+    written while holding an exclusive lock on it, and times are wall clock
+    times since they are compared between processes."""
+
+    def __init__(self, path, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                 burst=DEFAULT_BURST, cooldown_seconds=DEFAULT_COOLDOWN_SECONDS):
+        self.path = path
+        self.requests_per_second = requests_per_second
+        self.burst = max(burst, 1)
+        self.cooldown_seconds = cooldown_seconds
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def _update(self, update):
+        """Calls `update` with the refilled bucket and the time while holding
+        the file lock, writes the bucket back and returns what `update`
+        returned."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "r+", encoding="utf-8") as bucket_file:
+                now = time.time()
+                try:
+                    bucket = json.load(bucket_file)
+                except ValueError:
+                    bucket = {}
+                tokens = bucket.get("tokens", self.burst)
+                # Tokens only refill once a cool down is over
+                updated_at = max(bucket.get("updated_at", now), now)
+                elapsed = max(now - bucket.get("updated_at", now), 0)
+                bucket["tokens"] = min(self.burst, tokens + elapsed * self.requests_per_second)
+                bucket["updated_at"] = updated_at
+                bucket.setdefault("cooldown_until", 0)
+
+                result = update(bucket, now)
+
+                bucket_file.seek(0)
+                bucket_file.truncate()
+                json.dump(bucket, bucket_file)
+            return result
+        finally:
+            os.close(fd)
+
+    def reserve(self):
+        """Takes a token for a request without waiting for it. Returns the
+        seconds to wait before sending and whether the token was granted,
+        which it isn't while every process cools down: the caller then asks
+        again after waiting. A request is given a token even if there is
+        none left, to be repaid before the next, so requests are sent in
+        the order they asked for one."""
+        def take(bucket, now):
+            if bucket["cooldown_until"] > now:
+                return bucket["cooldown_until"] - now, False
+            bucket["tokens"] -= 1
+            return max(-bucket["tokens"] / self.requests_per_second, 0), True
+
+        return self._update(take)
+
+    def acquire(self):
+        """Blocks until this process may send a request."""
+        while True:
+            wait, granted = self.reserve()
+            if wait > 0:
+                time.sleep(wait)
+            if granted:
+                return
+
+    def cool_down(self, seconds=None):
+        """Makes every process wait `seconds`, after which the bucket starts
+        empty so they don't all send a burst at once."""
+        seconds = self.cooldown_seconds if seconds is None else seconds
+        LOGGER.info("Rate limited, pausing requests of every process for %s seconds", seconds)
+
+        def extend(bucket, now):
+            bucket["cooldown_until"] = max(bucket["cooldown_until"], now + seconds)
+            bucket["tokens"] = 0
+            bucket["updated_at"] = bucket["cooldown_until"]
+
+        self._update(extend)
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+import singer
+from .concurrency import ContextThreadPoolExecutor
+
+LOGGER = singer.get_logger()
+
+# Number of requests sent at once by all streams together
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+
+
+def build_stream_graph(streams):
+    """Returns {tap_stream_id: set of tap_stream_ids it has to wait for} for
+    the streams synced directly. Streams whose data comes from another
+    stream (`indirect_stream`) are synced by their parent and so are left
+    out; any other stream with a `parent_tap_stream_id` waits for its
+    parent to finish."""
+    direct = {stream.tap_stream_id for stream in streams if not stream.indirect_stream}
+    graph = {}
+    for stream in streams:
+        if stream.indirect_stream:
+            continue
+        parent = stream.parent_tap_stream_id
+        graph[stream.tap_stream_id] = {parent} if parent in direct else set()
+    return graph
+
+
+def root_stream_ids(streams):
+    """Maps every stream to the directly synced stream its requests count
+    against, e.g. issue_comments to issues."""
+    by_id = {stream.tap_stream_id: stream for stream in streams}
+    roots = {}
+    for stream in streams:
+        root = stream
+        while root.indirect_stream and root.parent_tap_stream_id in by_id:
+            root = by_id[root.parent_tap_stream_id]
+        roots[stream.tap_stream_id] = root.tap_stream_id
+    return roots
+
+
+class RequestBudget():
+    """Shares a number of concurrent request slots between streams in
+    proportion to their `request_weight`, so a stream with many requests to
+    make, like issues, can't starve the others. Every stream gets at least
+    one slot."""
+
+    def __init__(self, streams, max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS):
+        self.roots = root_stream_ids(streams)
+        direct = [stream for stream in streams if not stream.indirect_stream]
+        total_weight = sum(stream.request_weight for stream in direct)
+        self.slots = {
+            stream.tap_stream_id: threading.BoundedSemaphore(
+                max(1, max_concurrent_requests * stream.request_weight // total_weight))
+            for stream in direct}
+
+    def semaphore(self, tap_stream_id):
+        # Requests not made on behalf of a stream (e.g. checking the
+        # credentials) aren't limited
+        return self.slots.get(self.roots.get(tap_stream_id, tap_stream_id))
+
+    @contextmanager
+    def slot(self, tap_stream_id):
+        semaphore = self.semaphore(tap_stream_id)
+        if semaphore is None:
+            yield
+            return
+        with semaphore:
+            yield
+
+
+class StreamScheduler():
+    """Syncs streams on up to `max_workers` threads, starting each as soon
+    as the streams it depends on have finished.
+
+    `on_change` is called with the sorted ids of the streams being synced
+    whenever a stream starts or finishes. If a stream fails no other stream
+    is started, the running ones are waited for and the first error is
+    raised."""
+
+    def __init__(self, streams, max_workers, on_change=None):
+        self.streams = {stream.tap_stream_id: stream for stream in streams}
+        self.graph = build_stream_graph(streams)
+        self.max_workers = max_workers
+        self.on_change = on_change or (lambda running: None)
+
+    def run(self):
+        done = set()
+        pending = dict(self.graph)
+        running = {}
+        error = None
+        with ContextThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while running or (pending and error is None):
+                if error is None:
+                    ready = [tap_stream_id for tap_stream_id, deps in pending.items()
+                             if deps <= done]
+                    for tap_stream_id in ready:
+                        del pending[tap_stream_id]
+                        running[executor.submit(self.streams[tap_stream_id].sync)] = tap_stream_id
+                    if ready:
+                        self.on_change(sorted(running.values()))
+                if not running:
+                    raise Exception("Streams {} depend on streams that are never synced".format(
+                        ", ".join(sorted(pending))))
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    tap_stream_id = running.pop(future)
+                    if future.exception() is not None:
+                        LOGGER.error("Syncing stream %s failed", tap_stream_id)
+                        error = error or future.exception()
+                    done.add(tap_stream_id)
+                self.on_change(sorted(running.values()))
+        if error is not None:
+            raise error
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Splits the issues of a Jira site between several tap processes.
+
+Each worker is the tap run with `shard_index`, `shard_count` and `shard_by`
+in its config. It syncs the issues (with their comments, changelogs,
+transitions and embedded worklogs) of its slice only, keeping its own
+bookmarks, while the first shard also syncs every other stream. The
+slice is either the projects whose key hashes to the shard (`project`) or
+an issue id range (`id_range`, with `shard_id_start` and `shard_id_end`).
+
+The `tap-jira-shards` command runs the coordinator, which splits a config
+and state into one of each per shard, merges the states of the shards
+back into one and checks that together they covered every issue, or runs
+all the workers itself, merging their output."""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import zlib
+from contextlib import ExitStack
+import singer
+
+LOGGER = singer.get_logger()
+
+SHARD_BY = ("project", "id_range")
+
+# Only these streams are split between shards, the first shard syncs the rest
+SHARDED_STREAMS = ("issues",)
+
+
+class ShardCoverageError(Exception):
+    pass
+
+
+def shard_of(project_key, shard_count):
+    # crc32 rather than hash() as the latter differs between processes
+    return zlib.crc32(project_key.encode("utf-8")) % shard_count
+
+
+def projects_digest(project_keys):
+    return hashlib.sha1(json.dumps(sorted(project_keys)).encode("utf-8")).hexdigest()
+
+
+class Shard():
+    def __init__(self, index, count, by="project", id_start=None, id_end=None):
+        if by not in SHARD_BY:
+            raise Exception("Invalid shard_by `{}`, expected one of {}".format(by, ", ".join(SHARD_BY)))
+        if not 0 <= index < count:
+            raise Exception("shard_index must be between 0 and shard_count - 1")
+        self.index = index
+        self.count = count
+        self.by = by
+        self.id_start = id_start
+        self.id_end = id_end
+
+    def syncs(self, stream):
+        return self.index == 0 or stream.tap_stream_id in SHARDED_STREAMS
+
+    def jql(self, project_keys=None):
+        """Returns the JQL clause selecting the issues of this shard, or None
+        if the shard has none."""
+        if self.by == "id_range":
+            clauses = []
+            if self.id_start is not None:
+                clauses.append("id >= {}".format(int(self.id_start)))
+            if self.id_end is not None:
+                clauses.append("id < {}".format(int(self.id_end)))
+            return " AND ".join(clauses) or "id > 0"
+        owned = self.owned_projects(project_keys)
+        if not owned:
+            return None
+        return "project in ({})".format(", ".join(json.dumps(key) for key in owned))
+
+    def owned_projects(self, project_keys):
+        return sorted(key for key in project_keys if shard_of(key, self.count) == self.index)
+
+    def describe(self, project_keys=None):
+        """Returns what is written to the state under `shard` so the
+        coordinator can check the coverage of all shards."""
+        description = {"index": self.index, "count": self.count, "by": self.by}
+        if self.by == "id_range":
+            description["id_range"] = [self.id_start, self.id_end]
+        else:
+            description["projects"] = self.owned_projects(project_keys)
+            description["project_count"] = len(project_keys)
+            description["projects_digest"] = projects_digest(project_keys)
+        return description
+
+
+def get_shard(config):
+    if config.get("shard_count") in (None, "", 0, "0", 1, "1"):
+        return None
+    return Shard(int(config.get("shard_index", 0)),
+                 int(config["shard_count"]),
+                 config.get("shard_by") or "project",
+                 config.get("shard_id_start"),
+                 config.get("shard_id_end"))
+
+
+def validate_coverage(shard_states):
+    """Raises ShardCoverageError unless the shards are all of one layout
+    and, between them, covered every issue exactly once."""
+    descriptions = [state.get("shard") for state in shard_states.values()]
+    if any(description is None for description in descriptions):
+        raise ShardCoverageError("Shards {} haven't synced issues yet".format(
+            sorted(index for index, state in shard_states.items() if state.get("shard") is None)))
+    counts = {description["count"] for description in descriptions}
+    bys = {description["by"] for description in descriptions}
+    if len(counts) != 1 or len(bys) != 1:
+        raise ShardCoverageError("Shards were run with different shard_count or shard_by")
+    count, by = counts.pop(), bys.pop()
+    missing = sorted(set(range(count)) - {description["index"] for description in descriptions})
+    if missing:
+        raise ShardCoverageError("Missing the state of shards {}".format(missing))
+
+    if by == "id_range":
+        ranges = sorted((d["id_range"] for d in descriptions),
+                        key=lambda r: float("-inf") if r[0] is None else r[0])
+        if ranges[0][0] is not None or ranges[-1][1] is not None:
+            raise ShardCoverageError("The id ranges must start and end unbounded")
+        for previous, following in zip(ranges, ranges[1:]):
+            if previous[1] != following[0]:
+                raise ShardCoverageError("The id ranges {} and {} don't meet".format(previous, following))
+    else:
+        if len({d["projects_digest"] for d in descriptions}) != 1:
+            raise ShardCoverageError("Shards saw different projects, rerun them")
+        owned = [key for d in descriptions for key in d["projects"]]
+        if len(owned) != len(set(owned)) or len(owned) != descriptions[0]["project_count"]:
+            raise ShardCoverageError("Every project must be synced by exactly one shard")
+
+
+def merge_states(shard_states, validate=True):
+    """Returns the state of all shards, keyed by shard index."""
+    if validate:
+        validate_coverage(shard_states)
+    return {"shards": {str(index): state for index, state in sorted(shard_states.items())}}
+
+
+def split(config, state, shard_count, shard_by="project", boundaries=None):
+    """Returns (config, state) for every shard. `boundaries` are the issue
+    ids at which the id ranges of consecutive shards meet."""
+    if shard_by == "id_range":
+        boundaries = sorted(boundaries or [])
+        if len(boundaries) != shard_count - 1:
+            raise Exception("{} shards need {} id boundaries".format(shard_count, shard_count - 1))
+        ranges = list(zip([None] + boundaries, boundaries + [None]))
+    shard_states = (state or {}).get("shards", {})
+    shards = []
+    for index in range(shard_count):
+        shard_config = dict(config, shard_index=index, shard_count=shard_count, shard_by=shard_by)
+        if shard_by == "id_range":
+            shard_config["shard_id_start"], shard_config["shard_id_end"] = ranges[index]
+        shard_state = copy.deepcopy(shard_states.get(str(index), {}))
+        described = shard_state.get("shard")
+        if described and (described["count"] != shard_count or described["by"] != shard_by):
+            raise Exception("The state was written by {count} shards by {by}, "
+                            "it can't be resumed with another layout".format(**described))
+        shards.append((shard_config, shard_state))
+    return shards
+
+
+def _write_json(path, value):
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(value, json_file)
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+def run_workers(config, state, shard_count, shard_by="project", boundaries=None, catalog_path=None,
+                out=sys.stdout):
+    """Runs a tap process per shard, writing their records to `out` and,
+    whenever a shard writes its state, the state of all shards. Returns
+    the merged state once every worker exited."""
+    shard_states = {}
+    lock = threading.Lock()
+
+    def forward(index, process):
+        for line in process.stdout:
+            message = json.loads(line)
+            with lock:
+                if message.get("type") == "STATE":
+                    shard_states[index] = message["value"]
+                    line = json.dumps({"type": "STATE",
+                                       "value": merge_states(shard_states, validate=False)}) + "\n"
+                out.write(line)
+                out.flush()
+
+    with tempfile.TemporaryDirectory() as tmp_dir, ExitStack() as stack:
+        processes = []
+        for index, (shard_config, shard_state) in enumerate(
+                split(config, state, shard_count, shard_by, boundaries)):
+            shard_states[index] = shard_state
+            config_path = os.path.join(tmp_dir, "shard-{}.config.json".format(index))
+            state_path = os.path.join(tmp_dir, "shard-{}.state.json".format(index))
+            _write_json(config_path, shard_config)
+            _write_json(state_path, shard_state)
+            command = [sys.executable, "-c", "from tap_jira import main; main()",
+                       "--config", config_path, "--state", state_path]
+            if catalog_path:
+                command += ["--catalog", catalog_path]
+            processes.append(stack.enter_context(
+                subprocess.Popen(command, stdout=subprocess.PIPE, text=True)))
+
+        threads = [threading.Thread(target=forward, args=(index, process))
+                   for index, process in enumerate(processes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        failed = [index for index, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        raise Exception("Shards {} failed".format(failed))
+    return merge_states(shard_states)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="tap-jira-shards", description=__doc__.split("\n\n", maxsplit=1)[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split_parser = commands.add_parser("split", help="write a config and state per shard")
+    merge_parser = commands.add_parser("merge", help="merge and check the states of all shards")
+    run_parser = commands.add_parser("run", help="run a worker per shard and merge their output")
+    for command_parser in (split_parser, run_parser):
+        command_parser.add_argument("--config", required=True)
+        command_parser.add_argument("--state")
+        command_parser.add_argument("--shards", type=int, required=True)
+        command_parser.add_argument("--by", choices=SHARD_BY, default="project")
+        command_parser.add_argument("--boundaries", type=lambda value: [int(v) for v in value.split(",")],
+                                    help="comma separated issue ids between the id ranges")
+    split_parser.add_argument("--dir", required=True)
+    run_parser.add_argument("--catalog")
+    merge_parser.add_argument("states", nargs="+")
+    merge_parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        shard_states = {}
+        for path in args.states:
+            state = _read_json(path)
+            shard_states[state.get("shard", {}).get("index", path)] = state
+        merged = merge_states(shard_states)
+        if args.output:
+            _write_json(args.output, merged)
+        else:
+            json.dump(merged, sys.stdout)
+            print()
+        return
+
+    config = _read_json(args.config)
+    state = _read_json(args.state) if args.state else {}
+    if args.command == "split":
+        os.makedirs(args.dir, exist_ok=True)
+        for index, (shard_config, shard_state) in enumerate(
+                split(config, state, args.shards, args.by, args.boundaries)):
+            _write_json(os.path.join(args.dir, "shard-{}.config.json".format(index)), shard_config)
+            _write_json(os.path.join(args.dir, "shard-{}.state.json".format(index)), shard_state)
+    else:
+        run_workers(config, state, args.shards, args.by, args.boundaries, args.catalog)
+
+
+if __name__ == "__main__":
+    main()
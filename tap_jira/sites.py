@@ -0,0 +1,66 @@
+import re
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
+from .http2 import Http2Session
+
+# Config keys naming a local file that can't be shared between sites. When
+# they're only given once for all sites, each site gets its own file.
+PER_SITE_PATH_KEYS = ("fingerprint_store_path", "rate_limit_path")
+
+# Connections kept open to each host per site synced at once
+CONNECTIONS_PER_SITE = 4
+
+
+class Site():
+    """One Jira site of a multi-site config. `config` is the site's entry of
+    `sites` on top of the keys shared by every site."""
+
+    def __init__(self, config):
+        self.config = config
+        self.site_id = get_site_id(config)
+        # Records and schemas of each site are written to streams of their
+        # own, e.g. `acme_issues`
+        self.stream_prefix = re.sub(r"[^A-Za-z0-9_]", "_", self.site_id) + "_"
+
+
+def get_site_id(config):
+    if config.get("site_id"):
+        return config["site_id"]
+    if config.get("cloud_id"):
+        return config["cloud_id"]
+    return re.sub("^http[s]?://", "", config["base_url"]).split("/")[0]
+
+
+def get_sites(config):
+    """Returns a Site for every entry of the config's `sites`."""
+    shared = {key: value for key, value in config.items() if key != "sites"}
+    sites = []
+    for site_config in config["sites"]:
+        site = Site({**shared, **site_config})
+        for key in PER_SITE_PATH_KEYS:
+            if key in shared and key not in site_config:
+                site.config[key] = "{}.{}".format(shared[key], site.stream_prefix.rstrip("_"))
+        sites.append(site)
+
+    site_ids = [site.site_id for site in sites]
+    duplicates = sorted({site_id for site_id in site_ids if site_ids.count(site_id) > 1})
+    if duplicates:
+        raise Exception("Sites must be unique, found {} more than once".format(", ".join(duplicates)))
+    return sites
+
+
+def shared_session(site_count, http2=False):
+    """Returns a session whose connection pools, e.g. to api.atlassian.com,
+    are shared by the clients of all sites. It keeps no cookies, as cookies
+    set for one cloud site would otherwise be sent with requests for the
+    others."""
+    if http2:
+        # Each connection carries many requests, so fewer are needed
+        return Http2Session(keep_cookies=False)
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_maxsize=max(site_count * CONNECTIONS_PER_SITE, 10))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,4 +1,6 @@
+import functools
 import json
+from datetime import datetime
 import pytz
 import singer
 import dateparser
@@ -7,10 +9,34 @@ from singer import metrics, utils, metadata, Transformer
 from singer.transform import SchemaMismatch
 from dateutil.parser._parser import ParserError
 from .http import Paginator,JiraNotFoundError,IssuesPaginator
+from .aio import AsyncPaginator
 from .context import Context
+from . import output
+from .concurrency import ordered_map, ContextThreadPoolExecutor
+from .interning import intern_issues
+from .transitions import TransitionCache, workflow_state, DEFAULT_TRANSITION_CACHE_TTL
+from .passthrough import is_passthrough_schema, is_passthrough_metadata, is_identity
+from .dates import (get_date_time_paths, find_out_of_range_dates,
+                    get_date_out_of_range_policy, parse_user_date,
+                    parse_timestamp, timestamp_range)
 
 DEFAULT_PAGE_SIZE = 50
 
+# /worklog/list accepts at most 1000 ids, smaller batches let a page of ids
+# be fetched over several concurrent requests.
+WORKLOG_BATCH_SIZE = 250
+WORKLOG_CONCURRENCY = 4
+# Number of projects whose versions and components are fetched at once
+PROJECT_CONCURRENCY = 4
+# /worklog/updated and /worklog/deleted return at most this many ids
+WORKLOG_PAGE_LIMIT = 1000
+# Longer JQL is sent in the body of a POST, as servers and proxies reject
+# URLs much over 2000 characters
+MAX_GET_JQL_LENGTH = 1500
+# Number of issues whose transitions are fetched at once when the
+# transition cache is enabled
+TRANSITION_CONCURRENCY = 4
+
 def handle_date_time_schema_mis_match(exception, record, pk_fields): # pylint: disable=inconsistent-return-statements
     """
     Handling exception for date-time value out of range.
@@ -46,7 +72,13 @@ def handle_date_time_schema_mis_match(exception, record, pk_fields): # pylint: d
         # Raise a schema mismatch error, other than date out of range values
         raise exception
 
-def raise_if_bookmark_cannot_advance(worklogs):
+class BookmarkCannotAdvanceException(Exception):
+    def __init__(self, message, updated):
+        super().__init__(message)
+        self.updated = updated
+
+
+def raise_if_bookmark_cannot_advance(worklogs, max_updated, max_count):
     # Worklogs can only be queried with a `since` timestamp and
     # provides no way to page through the results. The `since`
     # timestamp has <=, not <, semantics. It also caps the response at
@@ -75,44 +107,205 @@ def raise_if_bookmark_cannot_advance(worklogs):
     # at T2 which this code will think is fine, but second trip
     # through you'll see 1000 worklogs at T2 which will fail
     # validation (because we can't tell whether there would be more
-    # that should've been returned).
+    # that should've been returned). Worklogs.sync then falls back to
+    # fetching the worklogs at T2 issue by issue.
+    #
+    # `max_updated` and `max_count` come from dates.timestamp_range, so the
+    # caller parses every timestamp only once.
     LOGGER.debug('Worklog page count: `%s`', len(worklogs))
-    worklog_updatedes = [utils.strptime_to_utc(w['updated'])
-                         for w in worklogs]
-    min_updated = min(worklog_updatedes)
-    max_updated = max(worklog_updatedes)
-    LOGGER.debug('Worklog min updated: `%s`', min_updated)
     LOGGER.debug('Worklog max updated: `%s`', max_updated)
-    if len(worklogs) == 1000 and min_updated == max_updated:
-        raise Exception(("Worklogs bookmark can't safely advance."
-                         "Every `updated` field is `{}`")
-                        .format(worklog_updatedes[0]))
-
-
-def sync_sub_streams(page):
+    if len(worklogs) == WORKLOG_PAGE_LIMIT and max_count == len(worklogs):
+        raise BookmarkCannotAdvanceException(("Worklogs bookmark can't safely advance."
+                                              "Every `updated` field is `{}`")
+                                             .format(max_updated), max_updated)
+
+
+def is_stuck_ids_page(ids_page):
+    """Returns True if a page from /worklog/updated or /worklog/deleted is
+    full and every id on it has the same `updatedTime`."""
+    values = ids_page["values"]
+    return (len(values) == WORKLOG_PAGE_LIMIT
+            and len({v.get("updatedTime") for v in values}) == 1)
+
+
+# The field each child stream of issues is filtered by when
+# `incremental_child_streams` is enabled
+CHILD_REPLICATION_KEYS = {"issue_comments": "updated", "changelogs": "created"}
+
+
+class ChildStreamFilter():
+    """Leaves out the comments and changelogs of updated issues that were
+    already written by an earlier run, by comparing their own timestamps
+    with a bookmark per stream. With `transitions_on_status_change`, the
+    transitions of an issue are only written when it is new or its status
+    changed since the last run.
+
+    Streams without a bookmark yet aren't filtered. The bookmarks are only
+    moved by `write_bookmarks` so a run that fails part way is redone."""
+
+    def __init__(self, transitions_on_status_change=False):
+        self.transitions_on_status_change = transitions_on_status_change
+        # Transitions have no timestamp of their own, their bookmark is the
+        # last `updated` of the issues they were checked for
+        self.bookmark_keys = dict(CHILD_REPLICATION_KEYS, issue_transitions="updated")
+        self.since = {}
+        for tap_stream_id, key in self.bookmark_keys.items():
+            since = Context.bookmark([tap_stream_id]).get(key)
+            self.since[tap_stream_id] = parse_timestamp(since) if since else None
+        self.max_seen = {}
+
+    def _seen(self, tap_stream_id, value):
+        if value is None:
+            return None
+        value = parse_timestamp(value)
+        max_seen = self.max_seen.get(tap_stream_id)
+        if max_seen is None or value > max_seen:
+            self.max_seen[tap_stream_id] = value
+        return value
+
+    def _is_new(self, tap_stream_id, value):
+        since = self.since[tap_stream_id]
+        return since is None or value is None or value >= since
+
+    def filter_records(self, tap_stream_id, records):
+        key = CHILD_REPLICATION_KEYS[tap_stream_id]
+        return [record for record in records
+                if self._is_new(tap_stream_id, self._seen(tap_stream_id, record.get(key)))]
+
+    def filter_transitions(self, page):
+        """Returns the issues of the page whose transitions should be
+        written. Has to be called before the changelogs are popped."""
+        if not self.transitions_on_status_change:
+            return page
+        tap_stream_id = ISSUE_TRANSITIONS.tap_stream_id
+        since = self.since[tap_stream_id]
+        issues = []
+        for issue in page:
+            self._seen(tap_stream_id, issue["fields"].get("updated"))
+            if since is None or self._is_new(tap_stream_id, parse_timestamp(issue["fields"]["created"])):
+                issues.append(issue)
+                continue
+            for history in (issue.get("changelog") or {}).get("histories", []):
+                if (parse_timestamp(history["created"]) >= since
+                        and any(item.get("field") == "status" for item in history.get("items", []))):
+                    issues.append(issue)
+                    break
+        return issues
+
+    def write_bookmarks(self):
+        for tap_stream_id, max_seen in self.max_seen.items():
+            Context.set_bookmark([tap_stream_id, self.bookmark_keys[tap_stream_id]], max_seen)
+
+
+def sync_sub_streams(page, child_filter=None):
+    """Writes the comments, changelogs and transitions embedded in a page of
+    issues and returns the issues whose transitions should be written, for
+    when they weren't expanded."""
+    transition_issues = child_filter.filter_transitions(page) if child_filter else page
+    transition_issue_ids = {issue["id"] for issue in transition_issues}
     for issue in page:
         comments = issue["fields"].pop("comment")["comments"]
+        if child_filter:
+            comments = child_filter.filter_records(ISSUE_COMMENTS.tap_stream_id, comments)
         if comments and Context.is_selected(ISSUE_COMMENTS.tap_stream_id):
             for comment in comments:
                 comment["issueId"] = issue["id"]
             ISSUE_COMMENTS.write_page(comments)
         changelogs = issue.pop("changelog")["histories"]
+        if child_filter:
+            changelogs = child_filter.filter_records(CHANGELOGS.tap_stream_id, changelogs)
         if changelogs and Context.is_selected(CHANGELOGS.tap_stream_id):
             for changelog in changelogs:
                 changelog["issueId"] = issue["id"]
             CHANGELOGS.write_page(changelogs)
-        transitions = issue.pop("transitions")
-        if transitions and Context.is_selected(ISSUE_TRANSITIONS.tap_stream_id):
+        # Missing when transitions aren't expanded, see sync_cached_transitions
+        transitions = issue.pop("transitions", None)
+        if (transitions and issue["id"] in transition_issue_ids
+                and Context.is_selected(ISSUE_TRANSITIONS.tap_stream_id)):
             for transition in transitions:
                 transition["issueId"] = issue["id"]
             ISSUE_TRANSITIONS.write_page(transitions)
+    return transition_issues
+
+
+def fetch_issue_transitions(issue_id):
+    path = "/rest/api/2/issue/{}/transitions".format(issue_id)
+    return Context.client.request(ISSUE_TRANSITIONS.tap_stream_id, "GET", path)["transitions"]
+
+
+def sync_cached_transitions(page, transition_cache):
+    """Writes the transitions of a page of issues fetched without
+    `expand=transitions`. Transitions are only fetched for one issue per
+    (project, issue type, status) and reused for the others, except for
+    issues the cache can't share transitions with."""
+    max_workers = Context.get_request_concurrency("transition_concurrency", TRANSITION_CONCURRENCY)
+    # Every state is looked up once so entries expiring meanwhile don't matter
+    states = {}
+    shared = {}
+    representatives = {}
+    to_fetch = []
+    for issue in page:
+        key = states[issue["id"]] = workflow_state(issue)
+        if key is not None and key not in shared and key not in representatives:
+            cached = transition_cache.get(key)
+            if cached is None:
+                representatives[key] = issue["id"]
+            else:
+                shared[key] = cached
+        if key is None or representatives.get(key) == issue["id"]:
+            to_fetch.append(issue["id"])
+
+    fetched = dict(zip(to_fetch, ordered_map(fetch_issue_transitions, to_fetch, max_workers)))
+    for key, issue_id in representatives.items():
+        transition_cache.put(key, fetched[issue_id])
+        shared[key] = fetched[issue_id]
+
+    fallback = [issue_id for issue_id, key in states.items()
+                if issue_id not in fetched and not transition_cache.is_reusable(shared[key])]
+    fetched.update(zip(fallback, ordered_map(fetch_issue_transitions, fallback, max_workers)))
+
+    transitions = []
+    for issue in page:
+        issue_transitions = fetched.get(issue["id"])
+        if issue_transitions is None:
+            issue_transitions = shared[states[issue["id"]]]
+        # Only the top level is copied, nothing below it is modified when
+        # the records are written
+        transitions.extend(dict(transition, issueId=issue["id"]) for transition in issue_transitions)
+    if transitions:
+        ISSUE_TRANSITIONS.write_page(transitions)
+
+
+def worklogs_from_issues():
+    """Returns True if worklogs should be taken from the `worklog` field of
+    each issue instead of being synced through /worklog/updated."""
+    return (Context.get_config_bool("worklogs_from_issues")
+            and Context.is_selected(ISSUES.tap_stream_id)
+            and Context.is_selected(WORKLOGS.tap_stream_id))
+
+
+def sync_embedded_worklogs(page):
+    """Writes the worklogs embedded in a page of issues. The search only
+    embeds the first 20 or so worklogs of an issue, so issues with more than
+    that have theirs fetched separately."""
+    worklogs = []
+    truncated_issue_ids = []
+    for issue in page:
+        worklog = issue["fields"].pop("worklog", None) or {}
+        embedded = worklog.get("worklogs", [])
+        if worklog.get("total", 0) <= len(embedded):
+            worklogs.extend(embedded)
+        else:
+            truncated_issue_ids.append(issue["id"])
 
+    if truncated_issue_ids:
+        max_workers = Context.get_request_concurrency("worklog_concurrency", WORKLOG_CONCURRENCY)
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+            for issue_worklogs in executor.map(WORKLOGS._fetch_issue_worklogs, truncated_issue_ids): # pylint: disable=protected-access
+                worklogs.extend(issue_worklogs)
 
-def advance_bookmark(worklogs):
-    raise_if_bookmark_cannot_advance(worklogs)
-    new_last_updated = max(utils.strptime_to_utc(w["updated"])
-                           for w in worklogs)
-    return new_last_updated
+    if worklogs:
+        WORKLOGS.write_page(worklogs)
 
 
 LOGGER = singer.get_logger()
@@ -128,7 +321,11 @@ class Stream():
     :var indirect_stream: If True, this indicates the stream cannot be synced
     directly, but instead has its data generated via a separate stream.
     :var forced_replication_method: Replication method of the stream
-    :var parent_tap_stream_id: The parent class of the stream (optional)"""
+    :var parent_tap_stream_id: The parent class of the stream (optional)
+    :var request_weight: Share of the concurrent requests the stream gets
+    when streams are synced concurrently"""
+
+    request_weight = 1
 
     def __init__(self, tap_stream_id, pk_fields, forced_replication_method, parent_tap_stream_id=None, indirect_stream=False, path=None):
         self.tap_stream_id = tap_stream_id
@@ -142,6 +339,10 @@ class Stream():
     def __repr__(self):
         return "<Stream(" + self.tap_stream_id + ")>"
 
+    def key_properties(self):
+        """Returns the primary key fields for the Jira instance being synced."""
+        return self.pk_fields
+
     def sync(self):
         page = Context.client.request(self.tap_stream_id, "GET", self.path)
         self.write_page(page)
@@ -150,17 +351,44 @@ class Stream():
         rec_count = 0
         stream = Context.get_catalog_entry(self.tap_stream_id)
         stream_metadata = metadata.to_map(stream.metadata)
+        schema = stream.schema.to_dict()
+        date_time_paths = get_date_time_paths(schema)
+        date_out_of_range_policy = get_date_out_of_range_policy(Context.config)
+        # Records of streams like resolutions and roles already have the
+        # types the schema asks for, so the Transformer would give them back
+        # unchanged and can be skipped.
+        passthrough = is_passthrough_schema(schema) and is_passthrough_metadata(stream_metadata)
+        # Unchanged records of FULL_TABLE streams can be left out when a
+        # fingerprint store is configured
+        fingerprints = Context.fingerprints if self.forced_replication_method == "FULL_TABLE" else None
+        pk_fields = self.key_properties()
         extraction_time = singer.utils.now()
         for rec in page:
-            with Transformer() as transformer:
-                try:
-                    rec = transformer.transform(rec, stream.schema.to_dict(), stream_metadata)
-                except SchemaMismatch as ex:
-                    # Checking if schema-mismatch is occurring for datetime value
-                    # TDL-19174: Transformation issue for "date out of range"
-                    if handle_date_time_schema_mis_match(ex, rec, self.pk_fields):
-                        continue    # skipping record for this error
-            singer.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
+            # Find out of range dates up front rather than letting the
+            # Transformer raise and picking apart the SchemaMismatch message.
+            out_of_range_dates = find_out_of_range_dates(rec, date_time_paths)
+            if out_of_range_dates:
+                pks = dict((pk, rec.get(pk)) for pk in pk_fields)
+                dates = [container[key] for container, key in out_of_range_dates]
+                if date_out_of_range_policy == "skip":
+                    LOGGER.warning("Skipping record of: %s due to Date out of range, DATE: %s", pks, dates)
+                    continue
+                LOGGER.warning("Setting date to null for record of: %s due to Date out of range, DATE: %s", pks, dates)
+                for container, key in out_of_range_dates:
+                    container[key] = None
+            if not (passthrough and is_identity(rec, schema)):
+                with Transformer() as transformer:
+                    try:
+                        rec = transformer.transform(rec, schema, stream_metadata)
+                    except SchemaMismatch as ex:
+                        # Checking if schema-mismatch is occurring for datetime value
+                        # TDL-19174: Transformation issue for "date out of range"
+                        if handle_date_time_schema_mis_match(ex, rec, pk_fields):
+                            continue    # skipping record for this error
+            if (fingerprints is not None
+                    and fingerprints.is_unchanged(self.tap_stream_id, rec, pk_fields)):
+                continue    # written unchanged by a previous run
+            output.write_record(self.tap_stream_id, rec, time_extracted=extraction_time)
             rec_count += 1 # increment counter only after the record is written
 
         with metrics.record_counter(self.tap_stream_id) as counter:
@@ -171,7 +399,8 @@ def update_user_date(page):
     """
     Transform date value to 'yyyy-mm-dd' format.
     API returns userReleaseDate and userStartDate always in the dd/mm/yyyy format where the month name is in Abbreviation form.
-    Dateparser library handles locale value and converts Abbreviation month to number.
+    The month is looked up in the abbreviations of every language Jira supports, see
+    transform_user_date, and dateparser is only used for dates the table doesn't cover.
     For example, if userReleaseDate is 12/abr/2022 then we are converting it to 2022-04-12.
     """
     if page.get('userReleaseDate'):
@@ -181,12 +410,62 @@ def update_user_date(page):
 
     return page
 
+def project_children_requests(project):
+    """Returns (stream, path, order_by) for the selected children of a project."""
+    children = []
+    if Context.is_selected(VERSIONS.tap_stream_id):
+        children.append((VERSIONS, "/rest/api/2/project/{}/version".format(project["id"]), "sequence"))
+    if Context.is_selected(COMPONENTS.tap_stream_id):
+        children.append((COMPONENTS, "/rest/api/2/project/{}/component".format(project["id"]), None))
+    return children
+
+
+def transform_project_child(stream, page):
+    if stream is VERSIONS:
+        # Transform userReleaseDate and userStartDate values to 'yyyy-mm-dd' format.
+        for each_page in page:
+            each_page = update_user_date(each_page)
+    return stream, page
+
+
+def fetch_project_children(project):
+    """Fetches the versions and components of a project, returning a list of
+    (stream, page) in the order they should be written."""
+    pages = []
+    for stream, path, order_by in project_children_requests(project):
+        pager = Paginator(Context.client, order_by=order_by)
+        for page in pager.pages(stream.tap_stream_id, "GET", path):
+            pages.append(transform_project_child(stream, page))
+    return pages
+
+
+async def fetch_project_children_async(project):
+    """Like fetch_project_children, with Context.async_client."""
+    pages = []
+    for stream, path, order_by in project_children_requests(project):
+        pager = AsyncPaginator(Context.async_client, order_by=order_by)
+        async for page in pager.apages(stream.tap_stream_id, "GET", path):
+            pages.append(transform_project_child(stream, page))
+    return pages
+
+
+PROJECTS_START_AT_OFFSET = ["projects", "offset", "start_at"]
+PROJECTS_LAST_PROJECT_OFFSET = ["projects", "offset", "last_project_id"]
+
+
 class Projects(Stream):
-    def sync_on_prem(self):
-        """ Sync function for the on prem instances"""
-        projects = Context.client.request(
-            self.tap_stream_id, "GET", "/rest/api/2/project",
-            params={"expand": "description,lead,url,projectKeys"})
+    request_weight = 2
+
+    def sync_projects(self, projects):
+        """Writes a page of projects and then, project by project, their
+        versions and components, which are fetched for several projects at
+        once. The last project whose versions and components were written is
+        checkpointed so a restarted sync carries on after it."""
+        last_project_id = Context.bookmark(PROJECTS_LAST_PROJECT_OFFSET) or None
+        project_ids = [project["id"] for project in projects]
+        if last_project_id in project_ids:
+            projects = projects[project_ids.index(last_project_id) + 1:]
+
         for project in projects:
             # The Jira documentation suggests that a "versions" key may appear
             # in the project, but from my testing that hasn't been the case
@@ -195,25 +474,29 @@ class Projects(Stream):
             # appears.
             project.pop("versions", None)
         self.write_page(projects)
-        if Context.is_selected(VERSIONS.tap_stream_id):
-            for project in projects:
-                path = "/rest/api/2/project/{}/version".format(project["id"])
-                pager = Paginator(Context.client, order_by="sequence")
-                for page in pager.pages(VERSIONS.tap_stream_id, "GET", path):
-                    # Transform userReleaseDate and userStartDate values to 'yyyy-mm-dd' format.
-                    for each_page in page:
-                        each_page = update_user_date(each_page)
-                    VERSIONS.write_page(page)
-        if Context.is_selected(COMPONENTS.tap_stream_id):
-            for project in projects:
-                path = "/rest/api/2/project/{}/component".format(project["id"])
-                pager = Paginator(Context.client)
-                for page in pager.pages(COMPONENTS.tap_stream_id, "GET", path):
-                    COMPONENTS.write_page(page)
+        if not (Context.is_selected(VERSIONS.tap_stream_id) or Context.is_selected(COMPONENTS.tap_stream_id)):
+            return
+        if Context.async_client:
+            children = Context.async_client.ordered_map(fetch_project_children_async, projects)
+        else:
+            max_workers = Context.get_request_concurrency("project_concurrency", PROJECT_CONCURRENCY)
+            children = ordered_map(fetch_project_children, projects, max_workers)
+        for project, pages in zip(projects, children):
+            for stream, page in pages:
+                stream.write_page(page)
+            Context.set_bookmark(PROJECTS_LAST_PROJECT_OFFSET, project["id"])
+            output.write_state(Context.state)
+
+    def sync_on_prem(self):
+        """ Sync function for the on prem instances"""
+        projects = Context.client.request(
+            self.tap_stream_id, "GET", "/rest/api/2/project",
+            params={"expand": "description,lead,url,projectKeys"})
+        self.sync_projects(projects)
 
     def sync_cloud(self):
         """ Sync function for the cloud instances"""
-        offset = 0
+        offset = Context.bookmark(PROJECTS_START_AT_OFFSET) or 0
         while True:
             params = {
                 "expand": "description,lead,url,projectKeys",
@@ -223,35 +506,15 @@ class Projects(Stream):
             projects = Context.client.request(
                 self.tap_stream_id, "GET", "/rest/api/2/project/search",
                 params=params)
-            for project in projects.get('values'):
-                # The Jira documentation suggests that a "versions" key may appear
-                # in the project, but from my testing that hasn't been the case
-                # (even when projects do have versions). Since we are already
-                # syncing versions separately, pop this key just in case it
-                # appears.
-                project.pop("versions", None)
-            self.write_page(projects.get('values'))
-            if Context.is_selected(VERSIONS.tap_stream_id):
-                for project in projects.get('values'):
-                    path = "/rest/api/2/project/{}/version".format(project["id"])
-                    pager = Paginator(Context.client, order_by="sequence")
-                    for page in pager.pages(VERSIONS.tap_stream_id, "GET", path):
-                        # Transform userReleaseDate and userStartDate values to 'yyyy-mm-dd' format.
-                        for each_page in page:
-                            each_page = update_user_date(each_page)
-
-                        VERSIONS.write_page(page)
-            if Context.is_selected(COMPONENTS.tap_stream_id):
-                for project in projects.get('values'):
-                    path = "/rest/api/2/project/{}/component".format(project["id"])
-                    pager = Paginator(Context.client)
-                    for page in pager.pages(COMPONENTS.tap_stream_id, "GET", path):
-                        COMPONENTS.write_page(page)
+            self.sync_projects(projects.get('values'))
 
             # `isLast` corresponds to whether it is the last page or not.
             if projects.get("isLast"):
                 break
             offset = offset + DEFAULT_PAGE_SIZE # next offset to start from
+            Context.set_bookmark(PROJECTS_START_AT_OFFSET, offset)
+            Context.set_bookmark(PROJECTS_LAST_PROJECT_OFFSET, None)
+            output.write_state(Context.state)
 
     def sync(self):
         # The documentation https://developer.atlassian.com/cloud/jira/platform/rest/v3/api-group-projects/#api-rest-api-3-project-get
@@ -263,6 +526,10 @@ class Projects(Stream):
             self.sync_on_prem()
         else:
             self.sync_cloud()
+        # Only clear the checkpoint once every project has been synced
+        Context.set_bookmark(PROJECTS_START_AT_OFFSET, None)
+        Context.set_bookmark(PROJECTS_LAST_PROJECT_OFFSET, None)
+        output.write_state(Context.state)
 
 class ProjectTypes(Stream):
     def sync(self):
@@ -274,6 +541,12 @@ class ProjectTypes(Stream):
 
 
 class Users(Stream):
+    def key_properties(self):
+        # Users of on prem Jira instances have no accountId
+        if Context.client.is_on_prem_instance:
+            return ["key"]
+        return self.pk_fields
+
     def sync(self):
         max_results = 2
 
@@ -286,34 +559,105 @@ class Users(Stream):
                       "jira-users",
                       "users"]
 
+        groups = [group.strip() for group in groups]
+
+        # Resume from the group and page an interrupted sync got to
+        group_offset = [self.tap_stream_id, "offset", "group"]
+        page_num_offset = [self.tap_stream_id, "offset", "page_num"]
+        page_num = 0
+        if Context.bookmark(group_offset) in groups:
+            groups = groups[groups.index(Context.bookmark(group_offset)):]
+            page_num = Context.bookmark(page_num_offset) or 0
+
         for group in groups:
-            group = group.strip()
+            # The page of the previous group mustn't be paired with this one
+            # in a state written before this group's first page
+            with Context.state_lock:
+                Context.set_bookmark(group_offset, group)
+                Context.set_bookmark(page_num_offset, page_num or None)
             try:
                 params = {"groupname": group,
                           "maxResults": max_results,
                           "includeInactiveUsers": True}
-                pager = Paginator(Context.client, items_key='values')
+                pager = Paginator(Context.client, items_key='values', page_num=page_num)
                 for page in pager.pages(self.tap_stream_id, "GET",
                                         "/rest/api/2/group/member",
                                         params=params):
                     self.write_page(page)
+                    Context.set_bookmark(page_num_offset, pager.next_page_num)
+                    output.write_state(Context.state)
             except JiraNotFoundError:
                 LOGGER.info("Could not find group \"%s\", skipping", group)
+            page_num = 0
+
+        Context.set_bookmark(group_offset, None)
+        Context.set_bookmark(page_num_offset, None)
+        output.write_state(Context.state)
+
+
+def fetch_project_keys():
+    """Returns the keys of every project, for sharding issues by project."""
+    if Context.client.is_on_prem_instance:
+        projects = Context.client.request(PROJECTS.tap_stream_id, "GET", "/rest/api/2/project")
+        return [project["key"] for project in projects]
+    pager = Paginator(Context.client)
+    return [project["key"] for page in pager.pages(PROJECTS.tap_stream_id, "GET", "/rest/api/2/project/search",
+                                                   params={"maxResults": DEFAULT_PAGE_SIZE})
+            for project in page]
+
+
+def search_request(endpoint, params):
+    """Returns the method and the kwargs of Client.request searching
+    `endpoint` for issues with `params`. The params are POSTed as JSON when
+    the JQL is too long for a URL, e.g. when it lists a shard's projects."""
+    if len(params["jql"]) <= MAX_GET_JQL_LENGTH:
+        return "GET", {"params": params}
+    body = dict(params, fields=params["fields"].split(","))
+    if endpoint == "/rest/api/2/search":
+        body["expand"] = params["expand"].split(",")
+    else:
+        # The enhanced search takes no validateQuery in its body
+        body.pop("validateQuery", None)
+    return "POST", {"json": body}
 
 
 class Issues(Stream):
+    request_weight = 4
 
     def sync(self):
         updated_bookmark = [self.tap_stream_id, "updated"]
         page_num_offset = [self.tap_stream_id, "offset", "page_num"]
 
+        shard_jql = None
+        if Context.shard:
+            project_keys = fetch_project_keys() if Context.shard.by == "project" else None
+            with Context.state_lock:
+                Context.state["shard"] = Context.shard.describe(project_keys)
+            shard_jql = Context.shard.jql(project_keys)
+            if shard_jql is None:
+                LOGGER.info("No projects hash to shard %s, skipping issues", Context.shard.index)
+                return
+
         last_updated = Context.update_start_date_bookmark(updated_bookmark)
         timezone = Context.retrieve_timezone()
         start_date = last_updated.astimezone(pytz.timezone(timezone)).strftime("%Y-%m-%d %H:%M")
 
         jql = "updated >= '{}' order by updated asc".format(start_date)
+        if shard_jql:
+            jql = "({}) AND {}".format(shard_jql, jql)
+        transition_cache = None
+        if (Context.get_config_bool("transition_cache")
+                and Context.is_selected(ISSUE_TRANSITIONS.tap_stream_id)):
+            transition_cache = TransitionCache(
+                Context.get_config_int("transition_cache_ttl", DEFAULT_TRANSITION_CACHE_TTL),
+                Context.get_config_bool("transition_cache_strict"))
+        child_filter = None
+        if Context.get_config_bool("incremental_child_streams"):
+            child_filter = ChildStreamFilter(Context.get_config_bool("transitions_on_status_change"))
         params = {"fields": "*all",
-                  "expand": "changelog,transitions",
+                  # Having Jira evaluate the transitions of every issue is
+                  # slow, the cache fetches them for a few issues instead
+                  "expand": "changelog" if transition_cache else "changelog,transitions",
                   "validateQuery": "strict",
                   "jql": jql}
         page_num = Context.bookmark(page_num_offset) or 0
@@ -323,11 +667,13 @@ class Issues(Stream):
             # Use a minimal validation request to reduce unnecessary data transfer
             validation_params = dict(params)
             validation_params["maxResults"] = 1
-            Context.client.request(tap_stream_id=self.tap_stream_id, method="GET", path=endpoint, params=validation_params)
+            method, kwargs = search_request(endpoint, validation_params)
+            Context.client.request(tap_stream_id=self.tap_stream_id, method=method, path=endpoint, **kwargs)
             pager = IssuesPaginator(Context.client, items_key="issues", page_num=page_num)
+            method, kwargs = search_request(endpoint, params)
             issues_pages = pager.pages(self.tap_stream_id,
-                                "GET", endpoint,
-                                params=params)
+                                method, endpoint,
+                                **kwargs)
         except JiraNotFoundError as ex:
             if "HTTP-error-code: 404" in str(ex) or "resource you have specified cannot be found" in str(ex).lower():
                 LOGGER.warning(
@@ -335,14 +681,21 @@ class Issues(Stream):
                 "Falling back to /rest/api/2/search."
                 )
                 pager = Paginator(Context.client, items_key="issues", page_num=page_num)
+                method, kwargs = search_request("/rest/api/2/search", params)
                 issues_pages = pager.pages(self.tap_stream_id,
-                                    "GET", "/rest/api/2/search",
-                                    params=params)
+                                    method, "/rest/api/2/search",
+                                    **kwargs)
             else:
                 raise
         for page in issues_pages:
+            # share the user, status, project etc. objects every issue embeds
+            intern_issues(page)
             # sync comments and changelogs for each issue
-            sync_sub_streams(page)
+            transition_issues = sync_sub_streams(page, child_filter)
+            if transition_cache:
+                sync_cached_transitions(transition_issues, transition_cache)
+            if worklogs_from_issues():
+                sync_embedded_worklogs(page)
             for issue in page:
                 issue['fields'].pop('worklog', None)
                 # The JSON schema for the search endpoint indicates an "operations"
@@ -356,60 +709,166 @@ class Issues(Stream):
                 issue['fields'].pop('operations', None)
 
             # Grab last_updated before transform in write_page
-            last_updated = utils.strptime_to_utc(page[-1]["fields"]["updated"])
+            last_updated = parse_timestamp(page[-1]["fields"]["updated"])
 
             self.write_page(page)
 
             Context.set_bookmark(page_num_offset, pager.next_page_num)
-            singer.write_state(Context.state)
+            output.write_state(Context.state)
         Context.set_bookmark(page_num_offset, None)
         Context.set_bookmark(updated_bookmark, last_updated)
-        singer.write_state(Context.state)
+        if child_filter:
+            child_filter.write_bookmarks()
+        output.write_state(Context.state)
 
 
 class Worklogs(Stream):
-    def _fetch_ids(self, last_updated):
+    request_weight = 2
+
+    ids_path = "/rest/api/2/worklog/updated"
+
+    def _fetch_ids(self, since_ts):
         # since_ts uses millisecond precision
-        since_ts = int(last_updated.timestamp()) * 1000
         return Context.client.request(
             self.tap_stream_id,
             "GET",
-            "/rest/api/2/worklog/updated",
+            self.ids_path,
             params={"since": since_ts},
         )
 
-    def _fetch_worklogs(self, ids):
-        if not ids:
-            return []
+    def _fetch_worklogs_batch(self, ids):
         return Context.client.request(
             self.tap_stream_id, "POST", "/rest/api/2/worklog/list",
             headers={"Content-Type": "application/json"},
             data=json.dumps({"ids": ids}),
         )
 
+    def _fetch_worklogs(self, ids, executor):
+        if not ids:
+            return []
+        # /worklog/list returns at most WORKLOG_PAGE_LIMIT worklogs
+        batch_size = min(Context.get_config_int("worklog_batch_size", WORKLOG_BATCH_SIZE),
+                         WORKLOG_PAGE_LIMIT)
+        batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+        worklogs = []
+        # map keeps the batches in order
+        for batch in executor.map(self._fetch_worklogs_batch, batches):
+            worklogs.extend(batch)
+        return worklogs
+
+    def _fetch_records(self, ids_page, executor):
+        ids = [x["worklogId"] for x in ids_page["values"]]
+        return self._fetch_worklogs(ids, executor)
+
+    def _search_issue_ids(self, updated):
+        # Adding or editing a worklog updates its issue, so every issue with
+        # a worklog updated at `updated` shows up in this search.
+        timezone = Context.retrieve_timezone()
+        start_date = updated.astimezone(pytz.timezone(timezone)).strftime("%Y-%m-%d %H:%M")
+        params = {"jql": "updated >= '{}' order by updated asc".format(start_date),
+                  "fields": "id",
+                  "maxResults": DEFAULT_PAGE_SIZE}
+        try:
+            pager = IssuesPaginator(Context.client, items_key="issues")
+            pages = list(pager.pages(self.tap_stream_id, "GET", "/rest/api/2/search/jql", params=params))
+        except JiraNotFoundError:
+            pager = Paginator(Context.client, items_key="issues")
+            pages = list(pager.pages(self.tap_stream_id, "GET", "/rest/api/2/search", params=params))
+        return [issue["id"] for page in pages for issue in page]
+
+    def _fetch_issue_worklogs(self, issue_id):
+        path = "/rest/api/2/issue/{}/worklog".format(issue_id)
+        pager = Paginator(Context.client, items_key="worklogs")
+        return [worklog
+                for page in pager.pages(self.tap_stream_id, "GET", path, params={"maxResults": WORKLOG_PAGE_LIMIT})
+                for worklog in page]
+
+    def _sync_stuck_page(self, ex, executor):
+        """Writes every worklog updated at exactly `ex.updated` when there are
+        too many of them to page through with `since`, by going through the
+        worklogs of each issue updated since then."""
+        LOGGER.warning("%s. Fetching the worklogs of every issue updated since then instead.", ex)
+        issue_ids = self._search_issue_ids(ex.updated)
+        for issue_worklogs in executor.map(self._fetch_issue_worklogs, issue_ids):
+            worklogs = [w for w in issue_worklogs if parse_timestamp(w["updated"]) == ex.updated]
+            if worklogs:
+                self.write_page(worklogs)
+
     def sync(self):
+        if self.tap_stream_id == WORKLOGS.tap_stream_id and worklogs_from_issues():
+            LOGGER.info("Worklogs were synced along with issues, skipping")
+            return
         updated_bookmark = [self.tap_stream_id, "updated"]
         last_updated = Context.update_start_date_bookmark(updated_bookmark)
-        while True:
-            ids_page = self._fetch_ids(last_updated)
-            if not ids_page["values"]:
-                break
-            ids = [x["worklogId"] for x in ids_page["values"]]
-            worklogs = self._fetch_worklogs(ids)
-
-            # Grab last_updated before transform in write_page
-            new_last_updated = advance_bookmark(worklogs)
-
-            self.write_page(worklogs)
+        # One extra worker for fetching the next page of ids
+        max_workers = Context.get_request_concurrency("worklog_concurrency", WORKLOG_CONCURRENCY) + 1
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
+            ids_page_future = executor.submit(self._fetch_ids, int(last_updated.timestamp()) * 1000)
+            while True:
+                ids_page = ids_page_future.result()
+                if not ids_page["values"]:
+                    break
+                # lastPage is a boolean value based on
+                # https://developer.atlassian.com/cloud/jira/platform/rest/v3/?utm_source=%2Fcloud%2Fjira%2Fplatform%2Frest%2F&utm_medium=302#api-api-3-worklog-updated-get
+                last_page = ids_page.get("lastPage")
+                # `until` is the time of the last worklog on the page and
+                # `since` has <= semantics, so the next page can be
+                # requested while this page's worklogs are being fetched.
+                # That is unless the whole page shares one timestamp, as
+                # the next page would be this one again.
+                prefetch = (not last_page
+                            and ids_page.get("until") is not None
+                            and not is_stuck_ids_page(ids_page))
+                if prefetch:
+                    ids_page_future = executor.submit(self._fetch_ids, ids_page["until"])
+
+                worklogs = self._fetch_records(ids_page, executor)
+                if not worklogs:
+                    # Every worklog on the page was deleted before it could
+                    # be fetched, there is nothing to write or bookmark
+                    if last_page or ids_page.get("until") is None:
+                        break
+                    if not prefetch:
+                        ids_page_future = executor.submit(self._fetch_ids, ids_page["until"])
+                    continue
 
-            last_updated = new_last_updated
-            Context.set_bookmark(updated_bookmark, last_updated)
-            singer.write_state(Context.state)
-            # lastPage is a boolean value based on
-            # https://developer.atlassian.com/cloud/jira/platform/rest/v3/?utm_source=%2Fcloud%2Fjira%2Fplatform%2Frest%2F&utm_medium=302#api-api-3-worklog-updated-get
-            last_page = ids_page.get("lastPage")
-            if last_page:
-                break
+                try:
+                    # Grab last_updated before transform in write_page
+                    _, new_last_updated, max_count = timestamp_range(w["updated"] for w in worklogs)
+                    raise_if_bookmark_cannot_advance(worklogs, new_last_updated, max_count)
+                    next_since = int(new_last_updated.timestamp()) * 1000
+                    self.write_page(worklogs)
+                except BookmarkCannotAdvanceException as ex:
+                    self._sync_stuck_page(ex, executor)
+                    # Carry on just past the timestamp we are stuck on
+                    new_last_updated = ex.updated
+                    next_since = int(new_last_updated.timestamp() * 1000) + 1
+
+                last_updated = new_last_updated
+                Context.set_bookmark(updated_bookmark, last_updated)
+                output.write_state(Context.state)
+                if last_page:
+                    break
+                if not prefetch:
+                    ids_page_future = executor.submit(self._fetch_ids, next_since)
+
+class DeletedWorklogs(Worklogs):
+    """Emits a tombstone for every worklog deleted since the bookmark. The
+    ids come back from /worklog/deleted the same way /worklog/updated
+    returns them for Worklogs, but there is nothing left to fetch for them,
+    so the record is just the id, the time it was deleted and its
+    properties."""
+    ids_path = "/rest/api/2/worklog/deleted"
+
+    def _sync_stuck_page(self, ex, executor):
+        # There is no other endpoint listing deleted worklogs to fall back on
+        raise ex
+
+    def _fetch_records(self, ids_page, executor):
+        return [{"id": str(value["worklogId"]),
+                 "updated": utils.strftime(datetime.fromtimestamp(value["updatedTime"] / 1000, tz=pytz.UTC)),
+                 "properties": value.get("properties", [])}
+                for value in ids_page["values"]]
 
 PROJECTS = Projects("projects", ["id"], forced_replication_method="FULL_TABLE")
 VERSIONS = Stream("versions", ["id"], parent_tap_stream_id="projects", indirect_stream=True, forced_replication_method="FULL_TABLE")
@@ -420,6 +879,7 @@ ISSUE_TRANSITIONS = Stream("issue_transitions", ["id","issueId"], # Composite pr
                            parent_tap_stream_id="issues", indirect_stream=True,
                            forced_replication_method="INCREMENTAL")
 CHANGELOGS = Stream("changelogs", ["id"], parent_tap_stream_id="issues", indirect_stream=True, forced_replication_method="INCREMENTAL")
+WORKLOGS = Worklogs("worklogs", ["id"], forced_replication_method="INCREMENTAL")
 
 ALL_STREAMS = [
     PROJECTS,
@@ -434,7 +894,8 @@ ALL_STREAMS = [
     ISSUE_COMMENTS,
     CHANGELOGS,
     ISSUE_TRANSITIONS,
-    Worklogs("worklogs", ["id"], forced_replication_method="INCREMENTAL"),
+    WORKLOGS,
+    DeletedWorklogs("deleted_worklogs", ["id"], forced_replication_method="INCREMENTAL"),
 ]
 
 ALL_STREAM_IDS = [s.tap_stream_id for s in ALL_STREAMS]
@@ -464,15 +925,20 @@ def validate_dependencies():
     if errs:
         raise DependencyException(" ".join(errs))
 
+@functools.lru_cache(maxsize=4096)
 def transform_user_date(user_date):
     """
     Transform date value to 'yyyy-mm-dd' format.
     API returns userReleaseDate and userStartDate always in the dd/mm/yyyy format where the month name is in Abbreviation form.
-    Dateparser library handles locale value and converts Abbreviation month to number.
     For example, if userReleaseDate is 12/abr/2022 then we are converting it to 2022-04-12.
     Then, at the end singer-python will transform any DateTime to %Y-%m-%dT00:00:00Z format.
 
-    All the locales are supported except following below locales,
-    Chinese, Italia, Japanese, Korean, Polska, Brasil.
+    The month is looked up in a table of the abbreviations for every language Jira supports
+    (including Chinese, Japanese and Korean, e.g. 12/10月/22), as dateparser is slow and detects the
+    language on every call. Dateparser is only used for dates the table doesn't cover. Versions share
+    a handful of dates so the results are memoized.
     """
-    return dateparser.parse(user_date).strftime('%Y-%m-%d')
+    parsed_date = parse_user_date(user_date)
+    if parsed_date is None:
+        parsed_date = dateparser.parse(user_date)
+    return parsed_date.strftime('%Y-%m-%d')
@@ -0,0 +1,42 @@
+import time
+
+# How long the transitions fetched for one (project, issue type, status) are
+# reused for other issues in the same state
+DEFAULT_TRANSITION_CACHE_TTL = 60 * 60
+
+
+def workflow_state(issue):
+    """Returns the (project, issue type, status) key that mostly determines
+    an issue's transitions, or None if any of them is missing."""
+    fields = issue.get("fields") or {}
+    ids = tuple((fields.get(field) or {}).get("id") for field in ("project", "issuetype", "status"))
+    return ids if all(ids) else None
+
+
+class TransitionCache():
+    """Transitions fetched for one issue, reused for every other issue of the
+    same project and issue type in the same status for `ttl` seconds.
+
+    Transitions may have conditions (e.g. only the assignee may resolve an
+    issue) that make them differ between issues in the same state. In
+    `strict` mode the cached transitions are only reused when Jira reports
+    none of them as conditional, otherwise the issue's own are fetched."""
+
+    def __init__(self, ttl=DEFAULT_TRANSITION_CACHE_TTL, strict=False):
+        self.ttl = ttl
+        self.strict = strict
+        self.entries = {}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, key, transitions):
+        self.entries[key] = (time.monotonic(), transitions)
+
+    def is_reusable(self, transitions):
+        # Jira Server doesn't report isConditional at all, so strict mode
+        # never reuses its transitions
+        return not self.strict or all(t.get("isConditional") is False for t in transitions)
@@ -76,7 +76,7 @@ class BaseTapTest(BaseCase):
     @staticmethod
     def forced_incremental_streams():
         # "key" refers to the path in state and "path" refers to the path in the record
-        return {"issues": {"bookmark_path": "updated", "record_path": ("fields", "updated")}, "worklogs": "updated"}
+        return {"issues": {"bookmark_path": "updated", "record_path": ("fields", "updated")}, "worklogs": "updated", "deleted_worklogs": "updated"}
 
     def expected_metadata(self):
         """The expected streams and metadata about the streams"""
@@ -164,6 +164,11 @@ class BaseTapTest(BaseCase):
                 self.API_LIMIT: 0, # TODO: Backlog ticket to create data required to test this documentation says 1000, see https://developer.atlassian.com/cloud/jira/platform/rest/v2/api-group-issue-worklogs/#api-rest-api-2-worklog-updated-get
                 # https://stitchdata.atlassian.net/browse/SRCE-5193
             },
+            "deleted_worklogs": {
+                self.PRIMARY_KEYS: {"id"},
+                self.REPLICATION_METHOD: self.INCREMENTAL,
+                self.API_LIMIT: 0,
+            },
         }
 
     def environment_variables(self):
@@ -0,0 +1,150 @@
+import threading
+import unittest
+from unittest import mock
+import requests
+from tap_jira.adaptive import AdaptiveConcurrency
+from tap_jira.context import SyncContext
+from tap_jira.http import Client
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("tap_jira.adaptive.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, controller, latency, status_code=200, endpoint="/rest/api/3/search/jql"):
+        with controller.slot(endpoint) as result:
+            self.clock.now += latency
+            result["status_code"] = status_code
+
+    def full_round(self, controller, latency, endpoints=("/rest/api/3/search/jql",)):
+        """Sends as many requests at once as the window allows, cycling through endpoints."""
+        slots = [controller.slot(endpoints[i % len(endpoints)]) for i in range(int(controller.window))]
+        results = [slot.__enter__() for slot in slots]
+        self.clock.now += latency
+        for slot, result in zip(slots, results):
+            result["status_code"] = 200
+            slot.__exit__(None, None, None)
+
+    def test_window_grows_while_latency_is_flat(self):
+        """
+        Verify that the window grows additively while latency holds and stops growing once it rises.
+        """
+        controller = AdaptiveConcurrency(initial=4, maximum=32)
+        # About one more request per window's worth of responses
+        for _ in range(3):
+            self.full_round(controller, 0.5)
+        self.assertEqual(int(controller.window), 6)
+
+        window = controller.window
+        for _ in range(5):
+            self.full_round(controller, 5)
+        self.assertEqual(controller.window, window)
+
+    def test_window_does_not_grow_below_its_size(self):
+        """
+        Verify that requests sent one at a time don't grow a window they never fill.
+        """
+        controller = AdaptiveConcurrency(initial=4, maximum=32)
+        for _ in range(100):
+            self.request(controller, 0.5)
+        self.assertEqual(controller.window, 4)
+
+    def test_latency_of_per_issue_paths_is_shared(self):
+        """
+        Verify that the window stops growing when latency rises across requests for different issues.
+        """
+        per_issue = AdaptiveConcurrency(initial=4, maximum=32)
+        single = AdaptiveConcurrency(initial=4, maximum=32)
+        for issue_id in range(30):
+            latency = 0.5 * (1 + issue_id / 2)
+            self.full_round(per_issue, latency, ["/rest/api/2/issue/{}/worklog".format(10000 + issue_id * 10 + i)
+                                                 for i in range(10)])
+            self.full_round(single, latency, ["/rest/api/2/issue/10000/worklog"])
+        self.assertEqual(per_issue.window, single.window)
+        self.assertLess(per_issue.window, 8)
+        self.assertEqual(list(per_issue.latencies), ["/rest/api/2/issue/{id}/worklog"])
+
+    def test_window_is_cut_once_per_round(self):
+        """
+        Verify that 429s of requests sent before the last cut don't cut the window again.
+        """
+        controller = AdaptiveConcurrency(initial=8, maximum=32)
+        slots = [controller.slot("/rest/api/3/search/jql") for _ in range(3)]
+        results = [slot.__enter__() for slot in slots]
+        self.clock.now += 1
+        for slot, result in zip(slots, results):
+            result["status_code"] = 429
+            slot.__exit__(None, None, None)
+        self.assertEqual(controller.window, 4)
+
+        self.clock.now += 1
+        with self.assertRaises(requests.exceptions.Timeout):
+            with controller.slot("/rest/api/3/search/jql"):
+                self.clock.now += 1
+                raise requests.exceptions.Timeout()
+        self.assertEqual(controller.window, 2)
+
+    def test_requests_wait_for_room_in_the_window(self):
+        controller = AdaptiveConcurrency(initial=1, maximum=1)
+        entered = threading.Event()
+        slot = controller.slot("/rest/api/2/project")
+        slot.__enter__()
+
+        def second():
+            with controller.slot("/rest/api/2/project"):
+                entered.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        self.assertFalse(entered.wait(timeout=0.2))
+        slot.__exit__(None, None, None)
+        thread.join(timeout=5)
+        self.assertTrue(entered.is_set())
+
+
+class TestClientAdaptiveConcurrency(unittest.TestCase):
+    @mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+    @mock.patch("tap_jira.http.time.sleep")
+    def test_throttle_is_replaced(self, mock_sleep, _mock_auth):
+        """
+        Verify that requests aren't spaced by TIME_BETWEEN_REQUESTS and go through the window.
+        """
+        client = Client({"username": "user", "password": "password", "base_url": "https://jira",
+                         "adaptive_concurrency": "true"})
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{}'
+        response.url = ""
+        response.request = requests.Request(method="GET")
+        client.session.send = mock.Mock(return_value=response)
+
+        for _ in range(3):
+            client.request("projects", "GET", "/rest/api/2/project")
+
+        self.assertEqual(mock_sleep.call_count, 0)
+        self.assertEqual(client.concurrency.in_flight, 0)
+        self.assertEqual(list(client.concurrency.latencies), ["/rest/api/2/project"])
+
+    @mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+    def test_workers_are_sized_for_the_window(self, _mock_auth):
+        """
+        Verify that streams fanning out requests have a thread for every request the window may allow.
+        """
+        config = {"username": "user", "password": "password", "base_url": "https://jira",
+                  "worklog_concurrency": 2}
+        self.assertEqual(SyncContext(config=config, client=Client(config))
+                         .get_request_concurrency("worklog_concurrency", 4), 2)
+        config = dict(config, adaptive_concurrency="true", adaptive_concurrency_max=16)
+        self.assertEqual(SyncContext(config=config, client=Client(config))
+                         .get_request_concurrency("worklog_concurrency", 4), 16)
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import threading
+import unittest
+from datetime import datetime
+from unittest import mock
+import requests
+from tap_jira import aio
+from tap_jira.aio import AsyncClient, AsyncPaginator
+from tap_jira.context import SyncContext, use_context
+from tap_jira.http import Client, JiraNotFoundError, check_status
+from tap_jira import streams
+
+
+class FakeClientConnectionError(Exception):
+    pass
+
+
+class FakeAiohttpResponse():
+    def __init__(self, status, headers, body, url="https://jira/rest/api/2/project/1"):
+        self.status = status
+        self.headers = headers
+        self.url = url
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeRaisingRequest():
+    def __init__(self, error):
+        self.error = error
+
+    async def __aenter__(self):
+        raise self.error
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def aiohttp_response(status_code, content=None):
+    return FakeAiohttpResponse(status_code, {"Content-Type": "application/json"},
+                               json.dumps(content or {}).encode())
+
+
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        for patcher in (mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized"),
+                        # Stands for aiohttp, which isn't a dependency of the tests
+                        mock.patch.object(aio, "aiohttp", mock.Mock(ClientConnectionError=FakeClientConnectionError))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = Client({"username": "user", "password": "password", "base_url": "https://jira"})
+        self.async_client = AsyncClient(self.client, max_concurrent_requests=4)
+        self.addCleanup(self.async_client.close)
+        # The session _setup would have created with aiohttp installed
+        self.async_client.session = mock.Mock(close=mock.AsyncMock())
+
+    def run_on_loop(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.async_client.loop).result()
+
+    def requested_urls(self):
+        return [call.args[1] for call in self.async_client.session.request.call_args_list]
+
+    def test_aiohttp_is_needed(self):
+        with mock.patch.object(aio, "aiohttp", None), self.assertRaises(Exception) as e:
+            AsyncClient(self.client)
+        self.assertIn("tap-jira[async]", str(e.exception))
+
+    def test_errors_are_mapped_like_the_client(self):
+        """
+        Verify that the async client raises the exceptions of ERROR_CODE_EXCEPTION_MAPPING.
+        """
+        self.async_client.session.request.return_value = aiohttp_response(404)
+        with self.assertRaises(JiraNotFoundError):
+            self.run_on_loop(self.async_client.request("projects", "GET", "/rest/api/2/project/1"))
+
+        self.assertEqual(self.requested_urls()[0], "https://jira/rest/api/2/project/1")
+        self.assertIn("Authorization", self.async_client.session.request.call_args.kwargs["headers"])
+
+    def test_requests_are_paced_with_the_client(self):
+        """
+        Verify that requests from the event loop take the client's budget slot, reserve its throttle
+        and wait for the rate limiter.
+        """
+        semaphore = threading.BoundedSemaphore(1)
+        self.client.request_budget = mock.Mock()
+        self.client.request_budget.semaphore.return_value = semaphore
+        self.client.rate_limiter = mock.Mock(**{"reserve.side_effect": [(0.01, False), (0, True)]})
+        self.async_client.session.request.return_value = aiohttp_response(200)
+        before = datetime.now()
+
+        self.run_on_loop(self.async_client.request("versions", "GET", "/rest/api/2/project/1/version"))
+
+        self.client.request_budget.semaphore.assert_called_once_with("versions")
+        # The slot was given back
+        self.assertTrue(semaphore.acquire(blocking=False))
+        self.assertGreater(self.client.next_request_at, before)
+        self.assertEqual(self.client.rate_limiter.reserve.call_count, 2)
+
+    def test_waiting_for_a_slot_does_not_block_the_event_loop(self):
+        """
+        Verify that a request waiting for a budget slot held by a thread doesn't hold up other requests.
+        """
+        semaphores = {"versions": threading.BoundedSemaphore(1), "components": threading.BoundedSemaphore(1)}
+        self.client.request_budget = mock.Mock(semaphore=semaphores.get)
+        self.async_client.session.request.side_effect = lambda *args, **kwargs: aiohttp_response(200)
+        semaphores["versions"].acquire()
+
+        waiting = asyncio.run_coroutine_threadsafe(
+            self.async_client.request("versions", "GET", "/rest/api/2/project/1/version"), self.async_client.loop)
+        self.run_on_loop(self.async_client.request("components", "GET", "/rest/api/2/project/1/component"))
+        self.assertFalse(waiting.done())
+        self.assertEqual(self.requested_urls(), ["https://jira/rest/api/2/project/1/component"])
+
+        semaphores["versions"].release()
+        waiting.result(timeout=5)
+        self.assertEqual(len(self.requested_urls()), 2)
+
+    def test_async_paginator(self):
+        self.async_client.session.request.side_effect = [
+            aiohttp_response(200, {"values": [{"id": 1}, {"id": 2}], "maxResults": 2}),
+            aiohttp_response(200, {"values": [{"id": 3}], "maxResults": 2})]
+
+        async def collect():
+            pager = AsyncPaginator(self.async_client)
+            return [page async for page in pager.apages("versions", "GET", "/rest/api/2/project/1/version")]
+
+        self.assertEqual(self.run_on_loop(collect()), [[{"id": 1}, {"id": 2}], [{"id": 3}]])
+        start_ats = [url.rsplit("startAt=", 1)[1] for url in self.requested_urls()]
+        self.assertEqual(start_ats, ["0", "2"])
+
+    def test_project_children_are_fetched_on_the_event_loop(self):
+        """
+        Verify that fanned out coroutines keep the order of the projects and see the caller's context.
+        """
+        def request(method, url, headers=None, data=None):
+            project_id = url.split("/project/")[1].split("/")[0]
+            return aiohttp_response(200, {"values": [{"id": project_id}], "maxResults": 50})
+        self.async_client.session.request.side_effect = request
+
+        sync_context = SyncContext(config={}, state={}, client=self.client)
+        sync_context.async_client = self.async_client
+        with use_context(sync_context), \
+                mock.patch.object(SyncContext, "is_selected",
+                                  lambda self, tap_stream_id: tap_stream_id == "components"):
+            projects = [{"id": str(i)} for i in range(10)]
+            children = list(self.async_client.ordered_map(streams.fetch_project_children_async,
+                                                          projects, window=3))
+
+        self.assertEqual(children, [[(streams.COMPONENTS, [{"id": str(i)}])] for i in range(10)])
+
+
+class TestAiohttpTransport(unittest.TestCase):
+    def setUp(self):
+        for patcher in (mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized"),
+                        # Stands for aiohttp, which isn't a dependency of the tests
+                        mock.patch.object(aio, "aiohttp", mock.Mock(ClientConnectionError=FakeClientConnectionError))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = Client({"username": "user", "password": "password", "base_url": "https://jira"})
+        self.async_client = AsyncClient(self.client, max_concurrent_requests=4)
+        self.addCleanup(self.async_client.close)
+        # The session _setup would have created with aiohttp installed
+        self.async_client.session = mock.Mock(close=mock.AsyncMock())
+        self.prepared = self.client.prepare("GET", "/rest/api/2/project/1")
+
+    def send(self):
+        return asyncio.run_coroutine_threadsafe(self.async_client._send_aiohttp(self.prepared),
+                                                self.async_client.loop).result()
+
+    def test_response_is_mapped(self):
+        """
+        Verify that an aiohttp response is returned as a requests.Response with its status, headers and body.
+        """
+        self.async_client.session.request.return_value = FakeAiohttpResponse(
+            404, {"Retry-After": "5", "Content-Type": "application/json"}, b'{"errorMessages": ["gone"]}')
+
+        response = self.send()
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.headers["retry-after"], "5")
+        self.assertEqual(response.json(), {"errorMessages": ["gone"]})
+        self.assertEqual(response.url, "https://jira/rest/api/2/project/1")
+        self.assertIs(response.request, self.prepared)
+        method, url = self.async_client.session.request.call_args.args
+        self.assertEqual((method, url), ("GET", "https://jira/rest/api/2/project/1"))
+        self.assertIn("Authorization", self.async_client.session.request.call_args.kwargs["headers"])
+        with self.assertRaises(JiraNotFoundError):
+            check_status(response)
+
+    def test_errors_are_mapped_to_requests_exceptions(self):
+        """
+        Verify that aiohttp timeouts and connection errors raise the requests exceptions the client retries.
+        """
+        self.async_client.session.request.return_value = FakeRaisingRequest(asyncio.TimeoutError())
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.send()
+
+        self.async_client.session.request.return_value = FakeRaisingRequest(FakeClientConnectionError("reset"))
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.send()
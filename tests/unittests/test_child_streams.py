@@ -0,0 +1,81 @@
+import unittest
+from unittest import mock
+from tap_jira.streams import ChildStreamFilter, sync_sub_streams
+from tap_jira.context import Context, SyncContext, use_context
+
+
+def make_issue(issue_id, created, histories):
+    return {
+        "id": issue_id,
+        "fields": {
+            "created": created,
+            "updated": "2022-05-20T00:00:00.000+0000",
+            "comment": {"comments": [
+                {"id": "c1", "updated": "2022-05-01T00:00:00.000+0000"},
+                {"id": "c2", "updated": "2022-05-10T00:00:00.000+0000"},
+            ]},
+        },
+        "changelog": {"histories": histories},
+        "transitions": [{"id": "31", "name": "Done"}],
+    }
+
+
+def history(history_id, created, field):
+    return {"id": history_id, "created": created, "items": [{"field": field}]}
+
+
+
+@mock.patch("tap_jira.streams.Context.is_selected", return_value=True)
+@mock.patch("tap_jira.streams.Stream.write_page")
+class TestChildStreamFilter(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+        Context.config = {}
+        Context.state = {"bookmarks": {
+            "issue_comments": {"updated": "2022-05-05T00:00:00.000000Z"},
+            "changelogs": {"created": "2022-05-05T00:00:00.000000Z"},
+            "issue_transitions": {"updated": "2022-05-05T00:00:00.000000Z"},
+        }}
+
+    def get_page(self):
+        return [
+            make_issue("1", "2022-04-01T00:00:00.000+0000",
+                       [history("h1", "2022-05-01T00:00:00.000+0000", "status"),
+                        history("h2", "2022-05-10T00:00:00.000+0000", "assignee")]),
+            make_issue("2", "2022-04-01T00:00:00.000+0000",
+                       [history("h3", "2022-05-10T00:00:00.000+0000", "status")]),
+            make_issue("3", "2022-05-15T00:00:00.000+0000", []),
+        ]
+
+    def test_children_are_filtered_by_their_own_timestamps(self, mock_write_page, mock_is_selected):
+        """
+        Verify that only comments and changelogs at or after their stream's bookmark are written
+        and the bookmarks move to the latest value seen.
+        """
+        child_filter = ChildStreamFilter()
+        sync_sub_streams(self.get_page(), child_filter)
+
+        records = [r["id"] for c in mock_write_page.mock_calls for r in c.args[0]]
+        self.assertEqual(records, ["c2", "h2", "31", "c2", "h3", "31", "c2", "31"])
+
+        child_filter.write_bookmarks()
+        self.assertEqual(Context.state["bookmarks"]["issue_comments"]["updated"], "2022-05-10T00:00:00.000000Z")
+        self.assertEqual(Context.state["bookmarks"]["changelogs"]["created"], "2022-05-10T00:00:00.000000Z")
+
+    def test_transitions_only_on_status_change(self, mock_write_page, mock_is_selected):
+        """
+        Verify that transitions are only written for new issues and issues whose status changed.
+        """
+        transition_issues = sync_sub_streams(self.get_page(), ChildStreamFilter(transitions_on_status_change=True))
+
+        self.assertEqual([issue["id"] for issue in transition_issues], ["2", "3"])
+        transitions = [c.args[0] for c in mock_write_page.mock_calls if c.args[0][0]["id"] == "31"]
+        self.assertEqual([t[0]["issueId"] for t in transitions], ["2", "3"])
+
+    def test_streams_without_bookmark_are_not_filtered(self, mock_write_page, mock_is_selected):
+        """
+        Verify that every child record is written when there is no bookmark yet.
+        """
+        Context.state = {}
+        sync_sub_streams(self.get_page(), ChildStreamFilter(transitions_on_status_change=True))
+        self.assertEqual(len(mock_write_page.mock_calls), 8)
@@ -0,0 +1,50 @@
+import threading
+import unittest
+from tap_jira.concurrency import ContextThreadPoolExecutor
+from tap_jira.context import Context, SyncContext, use_context, current_context
+
+
+class TestSyncContext(unittest.TestCase):
+    def test_runs_in_different_threads_are_isolated(self):
+        """
+        Verify that each thread sees the bookmarks of the context it uses.
+        """
+        contexts = [SyncContext(config={"start_date": "2022-01-01T00:00:00Z"}, state={}) for _ in range(2)]
+        barrier = threading.Barrier(2)
+
+        def run(sync_context, value):
+            with use_context(sync_context):
+                barrier.wait(timeout=5)
+                Context.set_bookmark(["issues", "updated"], value)
+
+        threads = [threading.Thread(target=run, args=(sync_context, value))
+                   for sync_context, value in zip(contexts, ("a", "b"))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([c.state["bookmarks"]["issues"]["updated"] for c in contexts], ["a", "b"])
+        # The threads' contexts are gone once they finish
+        with self.assertRaises(Exception):
+            current_context()
+
+    def test_executor_threads_inherit_the_context(self):
+        """
+        Verify that calls submitted to a ContextThreadPoolExecutor see the submitter's context
+        and concurrent bookmark updates are all kept.
+        """
+        sync_context = SyncContext(state={})
+        with use_context(sync_context):
+            with ContextThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda i: Context.set_bookmark(["worklogs", str(i)], i), range(100)))
+
+        self.assertEqual(len(sync_context.state["bookmarks"]["worklogs"]), 100)
+
+    def test_context_is_required(self):
+        """
+        Verify that Context can't be used outside use_context rather than sharing a default context.
+        """
+        with self.assertRaises(Exception) as e:
+            Context.state = {}
+        self.assertIn("use_context", str(e.exception))
@@ -1,8 +1,39 @@
 import unittest
 from unittest import mock
 from tap_jira.streams import Stream
+from tap_jira.dates import ANY_ITEM, get_date_time_paths, find_out_of_range_dates
+from tap_jira.context import SyncContext, use_context
+
+NESTED_SCHEMA = {
+    "type": ["object", "null"],
+    "properties": {
+        "id": {"type": ["string", "null"]},
+        "created": {"format": "date-time", "type": ["null", "string"]},
+        "fields": {
+            "type": ["object", "null"],
+            "properties": {
+                "updated": {"format": "date-time", "type": ["null", "string"]},
+            },
+            "patternProperties": {
+                ".+": {"format": "date-time", "type": ["null", "string"]},
+            },
+        },
+        "comments": {
+            "type": ["array", "null"],
+            "items": {
+                "type": ["object", "null"],
+                "properties": {
+                    "created": {"format": "date-time", "type": ["null", "string"]},
+                },
+            },
+        },
+    },
+}
 
 class TestOutOfRangeDate(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+
     @mock.patch("tap_jira.streams.singer.utils.now", return_value="2022-05-23T09:16:11.356670Z")
     @mock.patch("tap_jira.streams.singer.write_record")
     @mock.patch("tap_jira.streams.Context")
@@ -28,6 +59,7 @@ class TestOutOfRangeDate(unittest.TestCase):
             },
             "type": ["object", "null"],
         }
+        mock_Context.config = {}
         mock_stream = mock_Context.get_catalog_entry.return_value
         mock_stream.schema.to_dict.return_value = mock_schema
         mock_metadata.to_map.return_value = {}  # mock_metadata
@@ -53,3 +85,60 @@ class TestOutOfRangeDate(unittest.TestCase):
 
         # Verify that the records are written with proper args
         self.assertEqual(mock_write_record.mock_calls, expected_calls)
+
+
+    @mock.patch("tap_jira.streams.singer.utils.now", return_value="2022-05-23T09:16:11.356670Z")
+    @mock.patch("tap_jira.streams.singer.write_record")
+    @mock.patch("tap_jira.streams.Context")
+    @mock.patch("tap_jira.streams.metadata")
+    def test_out_of_range_date_null_policy(self, mock_metadata, mock_Context, mock_write_record, mock_now):
+        """
+        Verify that with the `null` policy every out of range date is cleared and the record is kept.
+        """
+        mock_records = [
+            {"id": "1",
+             "created": "2017000-09-05T19:51:03.159Z",
+             "fields": {"updated": "2001-13-05T19:51:03.159000", "customfield_1": "2001-09-05T19:51:03.159000Z"},
+             "comments": [{"created": "2001-09-05T19:51:03.159000Z"}, {"created": "2009-09-10T26:51:03.159000Z"}]},
+        ]
+        mock_Context.config = {"date_out_of_range_policy": "null"}
+        mock_stream = mock_Context.get_catalog_entry.return_value
+        mock_stream.schema.to_dict.return_value = NESTED_SCHEMA
+        mock_metadata.to_map.return_value = {}
+
+        stream_obj = Stream("stream_id", ["id"], "INCREMENTAL")
+        stream_obj.write_page(mock_records)
+
+        mock_write_record.assert_called_once_with(
+            "stream_id",
+            {"id": "1",
+             "created": None,
+             "fields": {"updated": None, "customfield_1": "2001-09-05T19:51:03.159000Z"},
+             "comments": [{"created": "2001-09-05T19:51:03.159000Z"}, {"created": None}]},
+            time_extracted="2022-05-23T09:16:11.356670Z",
+        )
+
+
+class TestDateTimePaths(unittest.TestCase):
+    def test_date_time_paths(self):
+        """
+        Verify that date-time fields are found inside objects, arrays and patternProperties.
+        """
+        self.assertEqual(get_date_time_paths(NESTED_SCHEMA), [
+            ("created",),
+            ("fields", "updated"),
+            ("fields", (".+", frozenset(["updated"]))),
+            ("comments", ANY_ITEM, "created"),
+        ])
+
+    def test_find_out_of_range_dates(self):
+        """
+        Verify that every out of range date in a record is reported in a single pass.
+        """
+        record = {"id": "1",
+                  "created": "2001-02-29T19:51:03.159+0000",
+                  "fields": {"updated": "2001-02-28T19:51:03.159+0000", "customfield_1": "2006-01-29T01:62:01.99999"},
+                  "comments": [{"created": None}, {"created": "2001-09-05"}]}
+        out_of_range = find_out_of_range_dates(record, get_date_time_paths(NESTED_SCHEMA))
+        self.assertEqual([container[key] for container, key in out_of_range],
+                         ["2001-02-29T19:51:03.159+0000", "2006-01-29T01:62:01.99999"])
@@ -3,7 +3,7 @@ from unittest import mock
 import requests
 from tap_jira import http
 from tap_jira import streams
-from tap_jira.context import Context
+from tap_jira.context import Context, SyncContext, use_context
 
 # mock responce
 class Mockresponse:
@@ -30,6 +30,8 @@ class Mockresponse:
         return self.text
 
 class TestJiraErrorHandling(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
 
     def mock_send_400(*args, **kwargs):
         return Mockresponse("",400,raise_error=True)
@@ -377,6 +379,10 @@ class TestJiraErrorHandling(unittest.TestCase):
             self.assertEqual(str(e), expected_error_message)
 
 class TestUserGroupSync(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+        Context.state = {}
+
     def mock_raise_404(*args, **kwargs):
         raise http.JiraNotFoundError
 
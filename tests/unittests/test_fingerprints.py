@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest import mock
+from tap_jira.fingerprints import FingerprintStore, FINGERPRINT_STORE_VERSION
+from tap_jira.streams import Stream
+from tap_jira.context import SyncContext, use_context
+
+RECORDS = [{"id": "1", "name": "Done"}, {"id": "2", "name": "Won't Do"}]
+
+
+class TestFingerprintStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "fingerprints.json")
+
+    def run_sync(self, records, full_refresh_interval=timedelta(hours=24)):
+        store = FingerprintStore(self.path, full_refresh_interval)
+        unchanged = [store.is_unchanged("resolutions", rec, ["id"]) for rec in records]
+        store.save()
+        return unchanged
+
+    def test_unchanged_records_are_skipped_after_first_run(self):
+        """
+        Verify that every record is written on the first run and only changed records afterwards.
+        """
+        self.assertEqual(self.run_sync(RECORDS), [False, False])
+        changed = [RECORDS[0], {"id": "2", "name": "Won't Fix"}]
+        self.assertEqual(self.run_sync(changed), [True, False])
+        self.assertEqual(self.run_sync(changed), [True, True])
+
+    def test_full_refresh_interval(self):
+        """
+        Verify that every record is written again once the full refresh interval has passed.
+        """
+        self.run_sync(RECORDS)
+        self.assertEqual(self.run_sync(RECORDS, timedelta(0)), [False, False])
+
+    def test_store_is_only_updated_on_save(self):
+        """
+        Verify that fingerprints of a run that never saved are not used.
+        """
+        store = FingerprintStore(self.path)
+        store.is_unchanged("resolutions", RECORDS[0], ["id"])
+        self.assertEqual(self.run_sync(RECORDS), [False, False])
+
+    def test_other_version_is_discarded(self):
+        """
+        Verify that a store written with another version is ignored.
+        """
+        self.run_sync(RECORDS)
+        with open(self.path) as store_file:
+            store = json.load(store_file)
+        store["version"] = FINGERPRINT_STORE_VERSION + 1
+        with open(self.path, "w") as store_file:
+            json.dump(store, store_file)
+        self.assertEqual(self.run_sync(RECORDS), [False, False])
+
+
+class TestWritePageFingerprints(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+
+    @mock.patch("tap_jira.streams.singer.write_record")
+    @mock.patch("tap_jira.streams.Context")
+    @mock.patch("tap_jira.streams.metadata")
+    def test_only_full_table_streams_use_the_store(self, mock_metadata, mock_Context, mock_write_record):
+        """
+        Verify that unchanged records are skipped for FULL_TABLE streams but not for INCREMENTAL ones.
+        """
+        mock_Context.config = {}
+        mock_Context.fingerprints.is_unchanged.return_value = True
+        mock_Context.get_catalog_entry.return_value.schema.to_dict.return_value = {
+            "type": "object", "properties": {"id": {"type": "string"}, "name": {"type": "string"}}}
+
+        Stream("resolutions", ["id"], forced_replication_method="FULL_TABLE").write_page(list(RECORDS))
+        self.assertEqual(mock_write_record.call_count, 0)
+
+        Stream("issue_comments", ["id"], forced_replication_method="INCREMENTAL").write_page(list(RECORDS))
+        self.assertEqual(mock_write_record.call_count, 2)
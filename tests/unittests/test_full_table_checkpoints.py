@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+from tap_jira import streams
+from tap_jira.context import Context, SyncContext, use_context
+
+
+@mock.patch("tap_jira.streams.singer.write_state")
+@mock.patch("tap_jira.streams.Stream.write_page")
+class TestProjectsCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+        Context.config = {}
+        Context.client = mock.Mock(concurrency=None)
+        Context.client.is_on_prem_instance = True
+
+    @mock.patch("tap_jira.context.Context.is_selected", return_value=True)
+    def test_projects_resume_after_last_project(self, mock_is_selected, mock_write_page, mock_write_state):
+        '''Verify that a restarted sync skips the projects already synced and clears the checkpoint at the end'''
+        Context.state = {"bookmarks": {"projects": {"offset": {"last_project_id": "2"}}}}
+        Context.client.request.side_effect = lambda stream, method, path, params=None: (
+            [{"id": str(i)} for i in range(5)] if path == "/rest/api/2/project"
+            else {"values": [], "maxResults": 50})
+
+        streams.Projects("projects", ["id"], "FULL_TABLE").sync()
+
+        mock_write_page.assert_called_once_with([{"id": "3"}, {"id": "4"}])
+        child_paths = [c.args[2] for c in Context.client.request.mock_calls[1:]]
+        self.assertEqual(sorted(child_paths), ["/rest/api/2/project/{}/{}".format(i, child)
+                                               for i in ("3", "4") for child in ("component", "version")])
+        self.assertEqual(Context.state["bookmarks"]["projects"]["offset"],
+                         {"last_project_id": None, "start_at": None})
+
+    @mock.patch("tap_jira.context.Context.is_selected", return_value=True)
+    def test_projects_checkpoint_after_each_project(self, mock_is_selected, mock_write_page, mock_write_state):
+        '''Verify that the last completed project is written to state before moving on'''
+        Context.state = {}
+        Context.client.request.side_effect = lambda stream, method, path, params=None: (
+            [{"id": "1"}, {"id": "2"}] if path == "/rest/api/2/project"
+            else {"values": [], "maxResults": 50})
+        checkpoints = []
+        mock_write_state.side_effect = lambda state: checkpoints.append(
+            state["bookmarks"]["projects"]["offset"].get("last_project_id"))
+
+        streams.Projects("projects", ["id"], "FULL_TABLE").sync()
+
+        self.assertEqual(checkpoints, ["1", "2", None])
+
+
+@mock.patch("tap_jira.streams.singer.write_state")
+@mock.patch("tap_jira.streams.Stream.write_page")
+class TestUsersCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+
+    def test_users_resume_from_group_and_page(self, mock_write_page, mock_write_state):
+        '''Verify that a restarted sync carries on from the checkpointed group and page'''
+        Context.config = {"groups": "group-a, group-b, group-c"}
+        Context.state = {"bookmarks": {"users": {"offset": {"group": "group-b", "page_num": 2}}}}
+        Context.client = mock.Mock(concurrency=None)
+        Context.client.request.return_value = {"values": [{"accountId": "1"}], "maxResults": 2}
+
+        streams.Users("users", ["accountId"], "FULL_TABLE").sync()
+
+        self.assertEqual([c.kwargs["params"]["groupname"] for c in Context.client.request.mock_calls],
+                         ["group-b", "group-c"])
+        self.assertEqual([c.kwargs["params"]["startAt"] for c in Context.client.request.mock_calls],
+                         [2, 0])
+        self.assertEqual(Context.state["bookmarks"]["users"]["offset"], {"group": None, "page_num": None})
+
+    def test_users_page_is_reset_between_groups(self, mock_write_page, mock_write_state):
+        '''Verify that a state written before a group's first page doesn't carry the page of the previous group'''
+        Context.config = {"groups": "group-a, group-b"}
+        Context.state = {}
+        Context.client = mock.Mock(concurrency=None)
+        offsets = []
+
+        def request(*args, **kwargs):
+            offsets.append(dict(Context.state["bookmarks"]["users"]["offset"]))
+            # group-a ends on an empty page, which isn't written
+            if kwargs["params"]["groupname"] == "group-a" and kwargs["params"]["startAt"] == 0:
+                return {"values": [{"accountId": "1"}, {"accountId": "2"}], "maxResults": 2}
+            return {"values": [], "maxResults": 2}
+        Context.client.request.side_effect = request
+
+        streams.Users("users", ["accountId"], "FULL_TABLE").sync()
+
+        self.assertEqual(offsets, [{"group": "group-a", "page_num": None},
+                                   {"group": "group-a", "page_num": 2},
+                                   {"group": "group-b", "page_num": None}])
@@ -0,0 +1,169 @@
+import threading
+import time
+import unittest
+from unittest import mock
+import requests
+from tap_jira.endpoints import endpoint_of
+from tap_jira.concurrency import ContextThreadPoolExecutor
+from tap_jira.hedging import Hedger, MIN_LATENCY_SAMPLES, _close_response
+from tap_jira.http import Client
+from tap_jira.scheduler import RequestBudget
+from tap_jira.streams import ISSUES
+
+
+class TestHedger(unittest.TestCase):
+    def warm_up(self, hedger, path="/rest/api/3/search/jql"):
+        for _ in range(MIN_LATENCY_SAMPLES):
+            hedger.send(path, lambda: "warm")
+
+    def test_slow_request_is_hedged(self):
+        """
+        Verify that a request slower than the percentile is sent again and the first response returned.
+        """
+        hedger = Hedger(percentile=95, budget=1)
+        self.warm_up(hedger)
+        release = threading.Event()
+        calls = []
+
+        def send():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(timeout=5)
+                return mock.Mock(name="slow")
+            return "fast"
+
+        self.assertEqual(hedger.send("/rest/api/3/search/jql", send), "fast")
+        self.assertEqual(len(calls), 2)
+        release.set()
+
+    def test_hedges_are_limited_by_the_budget(self):
+        """
+        Verify that without budget left a slow request is waited for and not sent again.
+        """
+        hedger = Hedger(percentile=95, budget=0.01)
+        self.warm_up(hedger)
+        hedger.tokens = 0
+        calls = []
+
+        def send():
+            calls.append(1)
+            threading.Event().wait(timeout=0.05)
+            return "slow"
+
+        self.assertEqual(hedger.send("/rest/api/3/search/jql", send), "slow")
+        self.assertEqual(len(calls), 1)
+
+    def test_time_queued_for_a_thread_is_not_slowness(self):
+        """
+        Verify that a request waiting for one of the hedger's threads isn't hedged for that wait.
+        """
+        hedger = Hedger(percentile=95, budget=1)
+        hedger.executor = ContextThreadPoolExecutor(max_workers=1)
+        for _ in range(MIN_LATENCY_SAMPLES):
+            hedger.send("/rest/api/3/search/jql", lambda: threading.Event().wait(timeout=0.02))
+        tokens = hedger.tokens
+
+        busy = hedger.executor.submit(threading.Event().wait, timeout=0.3)
+        self.assertEqual(hedger.send("/rest/api/3/search/jql", lambda: "fast"), "fast")
+        busy.result()
+        self.assertEqual(hedger.tokens, tokens)
+
+    def test_responses_without_a_connection_are_not_closed(self):
+        """
+        Verify that the slower response is only closed when it holds a connection, which those of
+        Http2Session and aiohttp don't.
+        """
+        for raw, closed in ((mock.Mock(), True), (None, False)):
+            response = requests.Response()
+            response.raw = raw
+            future = mock.Mock(**{"exception.return_value": None, "result.return_value": response})
+            _close_response(future)
+            self.assertEqual(raw is not None and raw.close.called, closed)
+
+    def test_no_hedging_until_enough_latencies(self):
+        hedger = Hedger()
+        self.assertIsNone(hedger.threshold("/rest/api/3/search/jql"))
+        self.warm_up(hedger, "/rest/api/2/issue/10001/comment")
+        self.assertIsNotNone(hedger.threshold(endpoint_of("/rest/api/2/issue/10002/comment")))
+
+
+class TestClientHedging(unittest.TestCase):
+    @mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+    @mock.patch("tap_jira.http.Client.send")
+    def test_only_gets_are_hedged(self, mock_send, _mock_auth):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{}'
+        response.url = ""
+        response.request = requests.Request(method="GET")
+        mock_send.return_value = response
+        client = Client({"username": "user", "password": "password", "base_url": "https://jira",
+                         "hedge_requests": True})
+        with mock.patch.object(client.hedger, "send", wraps=client.hedger.send) as mock_hedger_send:
+            client.request("issues", "GET", "/rest/api/3/search/jql")
+            client.request("worklogs", "POST", "/rest/api/2/worklog/list", json={"ids": [1]})
+        mock_hedger_send.assert_called_once()
+        self.assertEqual(mock_send.call_count, 2)
+
+    @mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+    @mock.patch("tap_jira.http.Client.send")
+    def test_hedge_waits_for_the_rate_limiter(self, mock_send, _mock_auth):
+        """
+        Verify that the copy of a slow request takes a token of the shared rate limiter like the original.
+        """
+        client = Client({"username": "user", "password": "password", "base_url": "https://jira",
+                         "hedge_requests": True, "hedge_budget": 1})
+        client.rate_limiter = mock.Mock()
+        client.hedger.latencies["/rest/api/3/search/jql"] = [0.01] * MIN_LATENCY_SAMPLES
+        client.hedger.tokens = 5
+        release = threading.Event()
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{}'
+        response.url = ""
+        response.request = requests.Request(method="GET")
+
+        def send(*args, **kwargs):
+            if mock_send.call_count == 1:
+                release.wait(timeout=5)
+                return mock.Mock()
+            return response
+        mock_send.side_effect = send
+
+        client.request("issues", "GET", "/rest/api/3/search/jql")
+        release.set()
+
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertEqual(client.rate_limiter.acquire.call_count, 2)
+
+    @mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+    @mock.patch("tap_jira.http.Client.send")
+    def test_hedge_skips_the_request_budget(self, mock_send, _mock_auth):
+        """
+        Verify that the copy of a slow request doesn't wait for the stream's budget slot held by the original.
+        """
+        client = Client({"username": "user", "password": "password", "base_url": "https://jira",
+                         "hedge_requests": True, "hedge_budget": 1})
+        client.request_budget = RequestBudget([ISSUES], max_concurrent_requests=1)
+        client.hedger.latencies["/rest/api/3/search/jql"] = [0.01] * MIN_LATENCY_SAMPLES
+        client.hedger.tokens = 5
+        release = threading.Event()
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{}'
+        response.url = ""
+        response.request = requests.Request(method="GET")
+
+        def send(*args, **kwargs):
+            if mock_send.call_count == 1:
+                release.wait(timeout=5)
+            return response
+        mock_send.side_effect = send
+
+        started = time.monotonic()
+        client.request("issues", "GET", "/rest/api/3/search/jql")
+        # Answered by the copy rather than after the original
+        self.assertLess(time.monotonic() - started, 2)
+        release.set()
+        self.assertEqual(mock_send.call_count, 2)
+        client.hedger.close()
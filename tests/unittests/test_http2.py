@@ -0,0 +1,152 @@
+import json
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import requests
+from tap_jira import http2
+from tap_jira.http import Client
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    h2 = None
+
+# How long the server takes to answer each request
+RESPONSE_DELAY = 0.2
+
+
+class H2Server(threading.Thread):
+    """A TLS server speaking only HTTP/2 that answers every request with its
+    path after RESPONSE_DELAY, counting the connections it accepts."""
+
+    def __init__(self, certfile, keyfile):
+        super().__init__(daemon=True)
+        self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self.ssl_context.load_cert_chain(certfile, keyfile)
+        self.ssl_context.set_alpn_protocols(["h2"])
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        self.connections = 0
+
+    def run(self):
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.serve, args=(sock,), daemon=True).start()
+
+    def serve(self, sock):
+        tls = self.ssl_context.wrap_socket(sock, server_side=True)
+        tls.settimeout(0.01)
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        tls.sendall(conn.data_to_send())
+        # Responses are sent from this thread once due, so the requests of
+        # the connection are answered concurrently
+        due = []
+        while True:
+            try:
+                data = tls.recv(65535)
+                if not data:
+                    return
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        path = dict(event.headers)[b":path"].decode()
+                        due.append((time.monotonic() + RESPONSE_DELAY, event.stream_id, path))
+            except socket.timeout:
+                pass
+            except (ssl.SSLError, OSError):
+                return
+            now = time.monotonic()
+            for response in [response for response in due if response[0] <= now]:
+                due.remove(response)
+                body = json.dumps({"path": response[2]}).encode()
+                conn.send_headers(response[1], [(":status", "200"),
+                                                ("content-type", "application/json"),
+                                                ("content-length", str(len(body)))])
+                conn.send_data(response[1], body, end_stream=True)
+            tls.sendall(conn.data_to_send())
+
+    def stop(self):
+        self.sock.close()
+
+
+class TestHttp2Session(unittest.TestCase):
+    @mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+    @mock.patch("tap_jira.http2.httpx", None)
+    def test_http2_needs_httpx(self, _mock_auth):
+        with self.assertRaises(Exception) as e:
+            Client({"username": "user", "password": "password", "base_url": "https://jira", "http2": "true"})
+        self.assertIn("tap-jira[http2]", str(e.exception))
+
+    @mock.patch("tap_jira.http2.httpx")
+    def test_redirects_are_followed_and_shared_sessions_keep_no_cookies(self, mock_httpx):
+        """
+        Verify that redirects are followed like with requests and a session shared by sites accepts no cookies.
+        """
+        mock_httpx.Client.return_value.request.return_value = mock.Mock(
+            status_code=200, reason_phrase="OK", headers={}, content=b"{}", url="https://jira/")
+        session = http2.Http2Session(keep_cookies=False)
+        session.send(requests.Request("GET", "https://jira/").prepare())
+
+        self.assertTrue(mock_httpx.Client.return_value.request.call_args.kwargs["follow_redirects"])
+        jar = mock_httpx.Client.call_args.kwargs["cookies"]
+        self.assertEqual(jar._policy.allowed_domains(), ())
+
+
+@unittest.skipUnless(http2.httpx and h2 and shutil.which("openssl"), "needs httpx[http2] and openssl")
+class TestHttp2Multiplexing(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.certfile = os.path.join(cls.tmp_dir.name, "cert.pem")
+        keyfile = os.path.join(cls.tmp_dir.name, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-addext", "subjectAltName=IP:127.0.0.1",
+                        "-keyout", keyfile, "-out", cls.certfile],
+                       check=True, capture_output=True)
+        cls.server = H2Server(cls.certfile, keyfile)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.tmp_dir.cleanup()
+
+    @mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+    def test_concurrent_requests_share_one_connection(self, _mock_auth):
+        """
+        Verify that concurrent requests of the client are multiplexed over a single connection
+        and so take about as long as one of them.
+        """
+        client = Client({"username": "user", "password": "password",
+                         "base_url": "https://127.0.0.1:{}".format(self.server.port)},
+                        session=http2.Http2Session(verify=ssl.create_default_context(cafile=self.certfile)))
+        # Open the connection before the concurrent requests
+        client.request("projects", "GET", "/rest/api/2/project")
+
+        started = time.monotonic()
+        paths = ["/rest/api/2/project/{}/version".format(i) for i in range(10)]
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            bodies = list(executor.map(lambda path: client.request("versions", "GET", path), paths))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([body["path"] for body in bodies], paths)
+        self.assertEqual(self.server.connections, 1)
+        # Sent one after another the requests would take 10 * RESPONSE_DELAY
+        self.assertLess(elapsed, 5 * RESPONSE_DELAY)
+        client.session.close()
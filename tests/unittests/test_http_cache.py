@@ -0,0 +1,79 @@
+import tempfile
+import unittest
+from unittest import mock
+import requests
+from tap_jira.http import Client
+
+
+def get_response(status_code, body=b'[{"id": "1", "name": "Done"}]', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    response.headers.update(headers or {})
+    response.url = ""
+    response.request = requests.Request()
+    response.request.method = "GET"
+    return response
+
+
+class TestHttpCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        patcher = mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_client(self, ttls=None):
+        return Client({"username": "user", "password": "password", "base_url": "https://jira",
+                       "http_cache_path": self.tmp_dir.name, "http_cache_ttls": ttls or {}})
+
+    @mock.patch("tap_jira.http.Client.send")
+    def test_fresh_response_is_reused(self, mock_send):
+        """
+        Verify that a cached response younger than its TTL is returned without any call.
+        """
+        mock_send.return_value = get_response(200)
+        first = self.get_client().request("resolutions", "GET", "/rest/api/2/resolution")
+        second = self.get_client().request("resolutions", "GET", "/rest/api/2/resolution")
+        self.assertEqual(first, second)
+        self.assertEqual(mock_send.call_count, 1)
+
+    @mock.patch("tap_jira.http.Client.send")
+    def test_stale_response_is_revalidated(self, mock_send):
+        """
+        Verify that a stale response is revalidated with its validators and reused on a 304.
+        """
+        client = self.get_client({"/rest/api/2/resolution": 0})
+        mock_send.return_value = get_response(200, headers={"ETag": '"abc"', "Last-Modified": "Mon, 19 Oct 2026 10:00:00 GMT"})
+        first = client.request("resolutions", "GET", "/rest/api/2/resolution")
+
+        mock_send.return_value = get_response(304, body=b"")
+        second = client.request("resolutions", "GET", "/rest/api/2/resolution")
+
+        self.assertEqual(first, second)
+        headers = mock_send.call_args[1]["headers"]
+        self.assertEqual(headers["If-None-Match"], '"abc"')
+        self.assertEqual(headers["If-Modified-Since"], "Mon, 19 Oct 2026 10:00:00 GMT")
+
+    @mock.patch("tap_jira.http.Client.send")
+    def test_other_endpoints_are_not_cached(self, mock_send):
+        """
+        Verify that endpoints without a TTL are always requested.
+        """
+        mock_send.return_value = get_response(200)
+        client = self.get_client()
+        client.request("issues", "GET", "/rest/api/3/search/jql")
+        client.request("issues", "GET", "/rest/api/3/search/jql")
+        self.assertEqual(mock_send.call_count, 2)
+
+    @mock.patch("tap_jira.http.Client.send")
+    def test_credential_check_is_not_cached(self, mock_send):
+        """
+        Verify that serverInfo, which checks the credentials, always reaches the server.
+        """
+        mock_send.return_value = get_response(200, body=b'{"deploymentType": "Server"}')
+        client = self.get_client({"/rest/api/2/serverInfo": 3600})
+        client.request("users", "GET", "/rest/api/2/serverInfo")
+        client.request("users", "GET", "/rest/api/2/serverInfo")
+        self.assertEqual(mock_send.call_count, 2)
@@ -0,0 +1,54 @@
+import copy
+import unittest
+from tap_jira.interning import Interner, intern_issues
+
+USER = {"accountId": "1", "displayName": "User 1",
+        "avatarUrls": {"48x48": "https://avatar/48", "16x16": "https://avatar/16"}}
+STATUS = {"id": "3", "name": "In Progress", "statusCategory": {"id": 4, "key": "indeterminate"}}
+
+
+def make_issue(issue_id):
+    return {
+        "id": issue_id,
+        "fields": {
+            "assignee": copy.deepcopy(USER),
+            "reporter": copy.deepcopy(USER),
+            "status": copy.deepcopy(STATUS),
+            "labels": ["a", "b"],
+            "comment": {"comments": [{"id": "c" + issue_id, "author": copy.deepcopy(USER)}]},
+        },
+        "changelog": {"histories": [{"id": "h" + issue_id, "author": copy.deepcopy(USER), "items": []}]},
+        "transitions": [{"id": "11", "name": "Done", "to": copy.deepcopy(STATUS)}],
+    }
+
+
+class TestInterning(unittest.TestCase):
+    def test_interner_shares_equal_objects(self):
+        """
+        Verify that equal objects and strings are replaced by a single shared instance.
+        """
+        interner = Interner()
+        first = interner.intern(copy.deepcopy(USER))
+        second = interner.intern(copy.deepcopy(USER))
+        self.assertIs(first, second)
+        self.assertEqual(first, USER)
+
+        self.assertIsNot(interner.intern({"id": 1}), interner.intern({"id": True}))
+        self.assertIs(interner.intern("".join(["a", "b"])), interner.intern("".join(["a", "b"])))
+
+    def test_intern_issues(self):
+        """
+        Verify that embedded objects are shared across issues but the objects that later get an issueId are not.
+        """
+        page = [make_issue("1"), make_issue("2")]
+        expected = copy.deepcopy(page)
+        intern_issues(page)
+
+        self.assertEqual(page, expected)
+        first, second = page
+        self.assertIs(first["fields"]["assignee"], second["fields"]["reporter"])
+        self.assertIs(first["fields"]["status"], second["fields"]["status"])
+        self.assertIs(first["fields"]["comment"]["comments"][0]["author"], second["fields"]["assignee"])
+        self.assertIs(first["changelog"]["histories"][0]["author"], second["fields"]["assignee"])
+        self.assertIs(first["transitions"][0]["to"], second["fields"]["status"])
+        self.assertIsNot(first["transitions"][0], second["transitions"][0])
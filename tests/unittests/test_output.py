@@ -0,0 +1,73 @@
+import contextvars
+import threading
+import unittest
+from unittest import mock
+from tap_jira import output
+from tap_jira.context import Context, SyncContext, use_context
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+        Context.state = {}
+
+    @mock.patch("tap_jira.output.singer.write_state")
+    @mock.patch("tap_jira.output.singer.write_record")
+    def test_messages_keep_their_order_per_stream(self, mock_write_record, mock_write_state):
+        """
+        Verify that records of every producer keep their order and a state written after
+        records comes after them.
+        """
+        def produce(tap_stream_id):
+            for i in range(200):
+                output.write_record(tap_stream_id, {"id": i})
+            Context.set_bookmark([tap_stream_id, "offset"], 200)
+            output.write_state(Context.state)
+
+        with output.writer(max_queued=10):
+            threads = [threading.Thread(target=contextvars.copy_context().run, args=(produce, tap_stream_id))
+                       for tap_stream_id in ("issues", "users")]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        for tap_stream_id in ("issues", "users"):
+            ids = [c.args[1]["id"] for c in mock_write_record.mock_calls if c.args[0] == tap_stream_id]
+            self.assertEqual(ids, list(range(200)))
+        self.assertEqual(mock_write_state.call_args.args[0]["bookmarks"],
+                         {"issues": {"offset": 200}, "users": {"offset": 200}})
+
+    @mock.patch("tap_jira.output.singer.write_record")
+    def test_producers_block_while_the_queue_is_full(self, mock_write_record):
+        """
+        Verify that producers wait for a slow writer once max_queued messages are queued.
+        """
+        release = threading.Event()
+        mock_write_record.side_effect = lambda *args, **kwargs: release.wait(timeout=5)
+        written = []
+
+        def produce():
+            for i in range(5):
+                output.write_record("issues", {"id": i})
+                written.append(i)
+
+        with output.writer(max_queued=2):
+            producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,))
+            producer.start()
+            producer.join(timeout=0.2)
+            # One message is being written and two are queued
+            self.assertEqual(written, [0, 1, 2])
+            release.set()
+            producer.join()
+        self.assertEqual(mock_write_record.call_count, 5)
+
+    @mock.patch("tap_jira.output.singer.write_record", side_effect=BrokenPipeError)
+    def test_writer_errors_are_raised(self, mock_write_record):
+        """
+        Verify that an error of the writer is raised to the producers.
+        """
+        with self.assertRaises(BrokenPipeError):
+            with output.writer(max_queued=1):
+                for i in range(10):
+                    output.write_record("issues", {"id": i})
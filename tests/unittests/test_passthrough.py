@@ -0,0 +1,91 @@
+import copy
+import json
+import unittest
+from unittest import mock
+from singer import Transformer
+from tap_jira import load_schema
+from tap_jira.passthrough import is_passthrough_schema, is_passthrough_metadata, is_identity
+from tap_jira.streams import Stream
+from tap_jira.context import SyncContext, use_context
+
+RECORDS = {
+    "project_categories": [
+        {"self": "https://jira/rest/api/2/projectCategory/1", "id": "1", "name": "Category", "description": "desc"},
+        {"id": "2", "name": None, "description": ""},
+        {"id": 3, "name": "int id"},
+        {"id": "4", "unknown": "removed by the Transformer"},
+    ],
+    "resolutions": [
+        {"self": "https://jira/rest/api/2/resolution/1", "id": "1", "name": "Done", "iconUrl": None},
+        {"id": 1.5, "name": True},
+    ],
+    "roles": [
+        {"id": 10002, "name": "Administrators", "actors": [{"id": 1, "displayName": "Admin", "type": "atlassian-user-role-actor"}]},
+        {"id": 10003, "name": "Developers", "actors": []},
+        {"id": "10004", "name": "string id"},
+        {"id": 10005, "actors": [{"id": "1,000"}]},
+        {"id": 10006, "actors": [{"id": True}]},
+        {"id": None, "actors": None},
+    ],
+    "project_types": [
+        {"key": "software", "formattedKey": "Software", "color": "#FFFFFF"},
+        {"key": 1},
+    ],
+}
+
+
+class TestPassthrough(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+
+    def test_reference_schemas_are_passthrough(self):
+        """
+        Verify that the schemas of the reference streams need no transformation.
+        """
+        for stream in RECORDS:
+            self.assertTrue(is_passthrough_schema(load_schema(stream)), stream)
+        self.assertFalse(is_passthrough_schema(load_schema("issues")))
+        self.assertFalse(is_passthrough_schema(load_schema("worklogs")))
+
+    def test_deselected_fields_are_not_passthrough(self):
+        self.assertTrue(is_passthrough_metadata({(): {"selected": True}, ("properties", "id"): {"inclusion": "automatic"}}))
+        self.assertFalse(is_passthrough_metadata({(): {"selected": True}, ("properties", "name"): {"selected": False}}))
+
+    def test_is_identity_matches_transformer(self):
+        """
+        Differential test: a record is only reported as identity if the Transformer gives back the exact same JSON.
+        """
+        identities = 0
+        for stream, records in RECORDS.items():
+            schema = load_schema(stream)
+            for record in records:
+                with Transformer() as transformer:
+                    transformed = transformer.transform(copy.deepcopy(record), copy.deepcopy(schema), {})
+                if is_identity(record, schema):
+                    identities += 1
+                    self.assertEqual(json.dumps(transformed), json.dumps(record), record)
+                else:
+                    self.assertNotEqual(json.dumps(transformed), json.dumps(record), record)
+        self.assertEqual(identities, 7)
+
+    @mock.patch("tap_jira.streams.singer.utils.now", return_value="2022-05-23T09:16:11.356670Z")
+    @mock.patch("tap_jira.streams.singer.write_record")
+    @mock.patch("tap_jira.streams.Context")
+    def test_write_page_matches_transformer(self, mock_Context, mock_write_record, mock_now):
+        """
+        Differential test: write_page writes the same records with and without the passthrough.
+        """
+        mock_Context.config = {}
+        for stream, records in RECORDS.items():
+            mock_Context.get_catalog_entry.return_value.schema.to_dict.return_value = load_schema(stream)
+            mock_Context.get_catalog_entry.return_value.metadata = []
+
+            mock_write_record.reset_mock()
+            Stream(stream, ["id"], "FULL_TABLE").write_page(copy.deepcopy(records))
+            passthrough_calls = mock_write_record.mock_calls
+
+            mock_write_record.reset_mock()
+            with mock.patch("tap_jira.streams.is_passthrough_schema", return_value=False):
+                Stream(stream, ["id"], "FULL_TABLE").write_page(copy.deepcopy(records))
+            self.assertEqual([json.dumps(c.args) for c in passthrough_calls],
+                             [json.dumps(c.args) for c in mock_write_record.mock_calls])
@@ -1,8 +1,9 @@
 from unittest import mock
 from unittest.mock import Mock
+from singer import metadata
 from tap_jira.http import Client
 from tap_jira.streams import ALL_STREAMS
-from tap_jira.context import Context
+from tap_jira.context import Context, SyncContext, use_context
 import tap_jira
 import unittest
 import requests
@@ -30,6 +31,9 @@ def get_mock_http_response(status_code, content={}):
 
 @mock.patch('tap_jira.http.Client.send')
 class TestPkSwitchingForUserStream(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+
 
     def test_pk_for_cloud_jira(self, mocked_send):
         '''
@@ -71,10 +75,13 @@ class TestPkSwitchingForUserStream(unittest.TestCase):
         schema = Mock()
         schema.properties = {}
 
-        tap_jira.generate_metadata(users_stream, schema)
+        mdata = tap_jira.generate_metadata(users_stream, schema)
 
         # Verify primary key of stream
-        self.assertEqual(users_stream.pk_fields, ["key"])
+        self.assertEqual(users_stream.key_properties(), ["key"])
+        self.assertEqual(metadata.to_map(mdata)[()]["table-key-properties"], ["key"])
+        # Verify the shared stream object is left unchanged
+        self.assertEqual(users_stream.pk_fields, ["accountId"])
 
     @mock.patch('singer.metadata')
     def test_pk_update_for_cloud_jira(self, mocked_metadata, mocked_send):
@@ -95,10 +102,11 @@ class TestPkSwitchingForUserStream(unittest.TestCase):
         schema = Mock()
         schema.properties = {}
 
-        tap_jira.generate_metadata(users_stream, schema)
+        mdata = tap_jira.generate_metadata(users_stream, schema)
 
         # Verify primary key of stream
-        self.assertEqual(users_stream.pk_fields, ["accountId"])
+        self.assertEqual(users_stream.key_properties(), ["accountId"])
+        self.assertEqual(metadata.to_map(mdata)[()]["table-key-properties"], ["accountId"])
 
     @mock.patch('singer.metadata')
     def test_pk_update_for_non_users_stream(self, mocked_metadata, mocked_send):
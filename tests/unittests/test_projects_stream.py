@@ -4,7 +4,7 @@ import json
 from unittest import mock
 from tap_jira import http
 from tap_jira import streams
-from tap_jira.context import Context
+from tap_jira.context import Context, SyncContext, use_context
 
 def get_projects_response(is_last=False, on_prem=False):
     '''Get th projects response for the projects stream.'''
@@ -39,6 +39,10 @@ cloud_resp = {"deploymentType": "Cloud"}
 on_prem_resp = {"deploymentType": "Server"}
 
 class TestProjectsPagination(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext(config={})))
+        Context.state = {}
+
 
     @mock.patch("tap_jira.http.Client.request", side_effect = [cloud_resp,first_page, last_page])
     @mock.patch('tap_jira.context.Context.get_catalog_entry')
@@ -59,6 +63,10 @@ class TestProjectsPagination(unittest.TestCase):
             ], mock_request.mock_calls)
 
 class TestProjectsEndpointForSync(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext(config={})))
+        Context.state = {}
+
     @mock.patch("tap_jira.http.Client.request", side_effect = [cloud_resp, last_page])
     @mock.patch('tap_jira.context.Context.get_catalog_entry')
     def test_projects_sync_cloud(self, mock_catalog_entry, mock_request):
@@ -93,3 +101,29 @@ class TestProjectsEndpointForSync(unittest.TestCase):
         self.assertEqual(
             mock.call('projects', 'GET', '/rest/api/2/project', params={'expand': 'description,lead,url,projectKeys'}), # verify it calls the project endpoint
             mock_request.mock_calls[1])
+
+class TestProjectsFanOut(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext(config={})))
+        Context.state = {}
+
+    @mock.patch("tap_jira.streams.Stream.write_page")
+    @mock.patch("tap_jira.context.Context.is_selected", return_value=True)
+    def test_versions_and_components_are_grouped_per_project(self, mock_is_selected, mock_write_page):
+        '''Verify that versions and components are fetched for every project and written in project order'''
+        def request(tap_stream_id, method, path, params=None):
+            project_id = path.split("/")[-2]
+            return {"values": [{"id": "{}-{}".format(tap_stream_id, project_id)}], "maxResults": 50}
+
+        Context.config = {"project_concurrency": 3}
+        Context.client = mock.Mock(concurrency=None)
+        Context.client.request.side_effect = request
+        projects = streams.Projects('projects', ['id'], "FULL_TABLE")
+        project_page = [{"id": str(i), "versions": []} for i in range(10)]
+        projects.sync_projects(project_page)
+
+        expected_calls = [mock.call([{"id": str(i)} for i in range(10)])]
+        for i in range(10):
+            expected_calls.append(mock.call([{"id": "versions-{}".format(i)}]))
+            expected_calls.append(mock.call([{"id": "components-{}".format(i)}]))
+        self.assertEqual(mock_write_page.mock_calls, expected_calls)
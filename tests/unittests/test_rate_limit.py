@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import requests
+from tap_jira.http import Client, JiraRateLimitError
+from tap_jira.rate_limit import SharedRateLimiter
+
+
+def get_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{}'
+    response.headers.update(headers or {})
+    response.url = ""
+    response.request = requests.Request()
+    response.request.method = "GET"
+    return response
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "jira.bucket")
+        self.clock = FakeClock()
+        patcher = mock.patch("tap_jira.rate_limit.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_limiters_share_one_bucket(self):
+        """
+        Verify that limiters of the same file, as in separate processes, draw from the same tokens.
+        """
+        first = SharedRateLimiter(self.path, requests_per_second=2, burst=2)
+        second = SharedRateLimiter(self.path, requests_per_second=2, burst=2)
+
+        first.acquire()
+        second.acquire()
+        self.assertEqual(self.clock.now, 1000.0)
+        first.acquire()
+        self.assertEqual(self.clock.now, 1000.5)
+
+    def test_cool_down_pauses_every_limiter(self):
+        """
+        Verify that a cool down of one limiter makes the others wait until it is over.
+        """
+        first = SharedRateLimiter(self.path, requests_per_second=10, burst=10)
+        second = SharedRateLimiter(self.path, requests_per_second=10, burst=10)
+
+        first.cool_down(30)
+        second.acquire()
+        self.assertEqual(round(self.clock.now, 6), 1030.1)
+
+
+class TestClientRateLimit(unittest.TestCase):
+    @mock.patch("tap_jira.http.Client.test_basic_credentials_are_authorized")
+    @mock.patch("tap_jira.http.Client.send")
+    @mock.patch("tap_jira.rate_limit.SharedRateLimiter.acquire")
+    @mock.patch("tap_jira.rate_limit.SharedRateLimiter.cool_down")
+    def test_429_cools_down_shared_limiter(self, mock_cool_down, mock_acquire, mock_send, _mock_auth):
+        """
+        Verify that the client draws from the shared limiter and cools it down for the Retry-After of a 429.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client = Client({"username": "user", "password": "password", "base_url": "https://jira",
+                             "rate_limit_path": os.path.join(tmp_dir, "jira.bucket")})
+            mock_send.return_value = get_response(429, {"Retry-After": "5"})
+            with self.assertRaises(JiraRateLimitError):
+                client.request.__wrapped__(client, "issues", "GET", "/rest/api/3/search/jql")
+
+        self.assertEqual(mock_acquire.call_count, 1)
+        mock_cool_down.assert_called_once_with(5.0)
@@ -0,0 +1,77 @@
+import threading
+import unittest
+from tap_jira.scheduler import StreamScheduler, RequestBudget, build_stream_graph
+from tap_jira.streams import Stream
+
+
+class RecordingStream(Stream):
+    def __init__(self, tap_stream_id, events, parent_tap_stream_id=None, indirect_stream=False,
+                 request_weight=1, barrier=None, error=None):
+        super().__init__(tap_stream_id, ["id"], "FULL_TABLE",
+                         parent_tap_stream_id=parent_tap_stream_id, indirect_stream=indirect_stream)
+        self.events = events
+        self.request_weight = request_weight
+        self.barrier = barrier
+        self.error = error
+
+    def sync(self):
+        self.events.append(("start", self.tap_stream_id))
+        if self.barrier:
+            self.barrier.wait(timeout=5)
+        if self.error:
+            raise self.error
+        self.events.append(("end", self.tap_stream_id))
+
+
+class TestStreamScheduler(unittest.TestCase):
+    def test_graph_skips_indirect_streams(self):
+        """
+        Verify that indirect streams are left out and direct children wait for their parent.
+        """
+        streams = [RecordingStream("issues", []),
+                   RecordingStream("issue_comments", [], parent_tap_stream_id="issues", indirect_stream=True),
+                   RecordingStream("issue_links", [], parent_tap_stream_id="issues"),
+                   RecordingStream("orphan", [], parent_tap_stream_id="unselected")]
+        self.assertEqual(build_stream_graph(streams),
+                         {"issues": set(), "issue_links": {"issues"}, "orphan": set()})
+
+    def test_independent_streams_run_concurrently(self):
+        """
+        Verify that independent streams run at the same time and dependent ones only after their parent.
+        """
+        events = []
+        barrier = threading.Barrier(2)
+        running = []
+        streams = [RecordingStream("issues", events, barrier=barrier),
+                   RecordingStream("users", events, barrier=barrier),
+                   RecordingStream("issue_links", events, parent_tap_stream_id="issues")]
+        StreamScheduler(streams, 3, running.append).run()
+
+        self.assertLess(events.index(("end", "issues")), events.index(("start", "issue_links")))
+        self.assertEqual(running[0], ["issues", "users"])
+        self.assertEqual(running[-1], [])
+
+    def test_failure_stops_scheduling(self):
+        """
+        Verify that the first error is raised and dependent streams are not started.
+        """
+        events = []
+        streams = [RecordingStream("issues", events, error=RuntimeError("boom")),
+                   RecordingStream("issue_links", events, parent_tap_stream_id="issues")]
+        with self.assertRaises(RuntimeError):
+            StreamScheduler(streams, 2).run()
+        self.assertNotIn(("start", "issue_links"), events)
+
+    def test_request_budget_is_weighted(self):
+        """
+        Verify that request slots are shared by weight, with indirect streams using their parent's slots.
+        """
+        streams = [RecordingStream("issues", [], request_weight=3),
+                   RecordingStream("issue_comments", [], parent_tap_stream_id="issues", indirect_stream=True),
+                   RecordingStream("roles", [])]
+        budget = RequestBudget(streams, max_concurrent_requests=8)
+        self.assertEqual(budget.slots["issues"]._initial_value, 6)
+        self.assertEqual(budget.slots["roles"]._initial_value, 2)
+        self.assertEqual(budget.roots["issue_comments"], "issues")
+        with budget.slot("issue_comments"), budget.slot("unknown"):
+            self.assertEqual(budget.slots["issues"]._value, 5)
@@ -0,0 +1,144 @@
+import unittest
+from datetime import datetime
+from unittest.mock import Mock, patch
+import pytz
+from tap_jira import sharding
+from tap_jira.context import Context, SyncContext, use_context
+from tap_jira.http import IssuesPaginator
+from tap_jira.sharding import Shard, ShardCoverageError
+from tap_jira.streams import Issues, ALL_STREAMS
+
+PROJECT_KEYS = ["ABC", "DEF", "GHI", "JKL", "MNO"]
+
+
+def shard_states(shard_count, project_keys=PROJECT_KEYS):
+    return {index: {"shard": Shard(index, shard_count).describe(project_keys)}
+            for index in range(shard_count)}
+
+
+class TestShards(unittest.TestCase):
+    def test_every_project_is_owned_by_one_shard(self):
+        """
+        Verify that the projects are split between the shards without overlap.
+        """
+        owned = [Shard(index, 3).owned_projects(PROJECT_KEYS) for index in range(3)]
+        self.assertEqual(sorted(key for keys in owned for key in keys), PROJECT_KEYS)
+        self.assertEqual(owned, [Shard(index, 3).owned_projects(reversed(PROJECT_KEYS)) for index in range(3)])
+
+    def test_jql(self):
+        shard = Shard(0, 2, "id_range", id_start=100, id_end=200)
+        self.assertEqual(shard.jql(), "id >= 100 AND id < 200")
+        owned = Shard(1, 2).owned_projects(PROJECT_KEYS)
+        self.assertEqual(Shard(1, 2).jql(PROJECT_KEYS),
+                         "project in ({})".format(", ".join('"{}"'.format(key) for key in owned)))
+
+    def test_only_the_first_shard_syncs_other_streams(self):
+        synced = [[stream.tap_stream_id for stream in ALL_STREAMS if Shard(index, 2).syncs(stream)]
+                  for index in range(2)]
+        self.assertEqual(len(synced[0]), len(ALL_STREAMS))
+        self.assertEqual(synced[1], ["issues"])
+
+
+class TestCoordinator(unittest.TestCase):
+    def test_merge_validates_project_coverage(self):
+        """
+        Verify that states covering every project merge and missing or inconsistent shards don't.
+        """
+        merged = sharding.merge_states(shard_states(3))
+        self.assertEqual(sorted(merged["shards"]), ["0", "1", "2"])
+
+        states = shard_states(3)
+        del states[2]
+        with self.assertRaises(ShardCoverageError):
+            sharding.merge_states(states)
+
+        states = shard_states(3)
+        states[1] = {"shard": Shard(1, 3).describe(PROJECT_KEYS + ["NEW"])}
+        with self.assertRaises(ShardCoverageError):
+            sharding.merge_states(states)
+
+    def test_split_and_merge_id_ranges(self):
+        """
+        Verify that id ranges are split at the boundaries, resume from the merged state and
+        must meet to be merged.
+        """
+        shards = sharding.split({"start_date": "2022-01-01"}, {}, 3, "id_range", [1000, 2000])
+        ranges = [(config["shard_id_start"], config["shard_id_end"]) for config, state in shards]
+        self.assertEqual(ranges, [(None, 1000), (1000, 2000), (2000, None)])
+
+        states = {index: {"shard": sharding.get_shard(config).describe(), "bookmarks": {"issues": {"updated": index}}}
+                  for index, (config, state) in enumerate(shards)}
+        merged = sharding.merge_states(states)
+        resumed = sharding.split({}, merged, 3, "id_range", [1000, 2000])
+        self.assertEqual([state["bookmarks"]["issues"]["updated"] for config, state in resumed], [0, 1, 2])
+
+        with self.assertRaises(Exception):
+            sharding.split({}, merged, 2, "id_range", [1000])
+
+        states[1]["shard"]["id_range"] = [1000, 1500]
+        with self.assertRaises(ShardCoverageError):
+            sharding.merge_states(states)
+
+
+class TestPostedSearch(unittest.TestCase):
+    def test_page_params_go_in_the_body(self):
+        """
+        Verify that a search sent with a JSON body is paged through with the body.
+        """
+        responses = [{"issues": [{"id": 1}], "nextPageToken": "next", "isLast": False},
+                     {"issues": [{"id": 2}], "isLast": True}]
+        bodies = []
+
+        def request(tap_stream_id, method, path, json):
+            bodies.append(dict(json))
+            return responses[len(bodies) - 1]
+
+        pager = IssuesPaginator(Mock(request=request), items_key="issues")
+        pages = list(pager.pages("issues", "POST", "/rest/api/2/search/jql", json={"jql": "id > 0"}))
+
+        self.assertEqual(pages, [[{"id": 1}], [{"id": 2}]])
+        self.assertEqual(bodies, [{"jql": "id > 0"}, {"jql": "id > 0", "nextPageToken": "next"}])
+
+
+class TestShardedIssues(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+        for target, name, value in [
+                (Context, "update_start_date_bookmark", Mock(return_value=datetime(2018, 12, 12, tzinfo=pytz.UTC))),
+                (Context, "retrieve_timezone", Mock(return_value="UTC")),
+                (Context, "set_bookmark", Mock()),
+                (Context, "shard", Shard(0, 1000, "id_range", id_start=10, id_end=20)),
+                (IssuesPaginator, "pages", Mock(return_value=[]))]:
+            patcher = patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        Context.client = Mock()
+        Context.config = {}
+        Context.state = {}
+
+    def test_issues_are_limited_to_the_shard(self):
+        Issues("issues", ["id"], "INCREMENTAL").sync()
+
+        jql = IssuesPaginator.pages.call_args.kwargs["params"]["jql"]
+        self.assertEqual(jql, "(id >= 10 AND id < 20) AND updated >= '2018-12-12 00:00' order by updated asc")
+        self.assertEqual(Context.state["shard"], {"index": 0, "count": 1000, "by": "id_range", "id_range": [10, 20]})
+
+    @patch("tap_jira.streams.fetch_project_keys")
+    def test_long_jql_is_posted(self, mock_fetch_project_keys):
+        """
+        Verify that a search listing too many projects for a URL is sent in the body of a POST.
+        """
+        project_keys = ["PROJECT{}".format(i) for i in range(1000)]
+        mock_fetch_project_keys.return_value = project_keys
+        Context.shard = Shard(0, 2)
+        Issues("issues", ["id"], "INCREMENTAL").sync()
+
+        validation = Context.client.request.call_args
+        self.assertEqual(validation.kwargs["method"], "POST")
+        self.assertNotIn("params", validation.kwargs)
+        self.assertEqual(validation.kwargs["json"]["maxResults"], 1)
+        self.assertEqual(IssuesPaginator.pages.call_args.args[1:], ("POST", "/rest/api/2/search/jql"))
+        body = IssuesPaginator.pages.call_args.kwargs["json"]
+        self.assertIn(Shard(0, 2).jql(project_keys), body["jql"])
+        self.assertEqual(body["fields"], ["*all"])
+        self.assertNotIn("validateQuery", body)
@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+import tap_jira
+from tap_jira import sites, output
+from tap_jira.context import Context
+
+SHARED_CONFIG = {"start_date": "2022-01-01T00:00:00Z", "user_agent": "tap-jira",
+                 "fingerprint_store_path": "/tmp/fingerprints.json"}
+CLOUD_SITE = {"cloud_id": "abc-123", "access_token": "a", "refresh_token": "r",
+              "oauth_client_id": "c", "oauth_client_secret": "s"}
+HOSTED_SITE = {"base_url": "https://jira.example.com/", "username": "u", "password": "p"}
+
+
+class Args():
+    def __init__(self, config, state=None):
+        self.config = config
+        self.state = state or {}
+        self.properties = {"streams": []}
+        self.discover = False
+
+
+class TestSites(unittest.TestCase):
+    def test_site_configs(self):
+        """
+        Verify that each site gets the shared keys, an id, a stream prefix and its own fingerprint store.
+        """
+        cloud, hosted = sites.get_sites({**SHARED_CONFIG, "sites": [CLOUD_SITE, HOSTED_SITE]})
+
+        self.assertEqual(cloud.site_id, "abc-123")
+        self.assertEqual(cloud.stream_prefix, "abc_123_")
+        self.assertEqual(cloud.config["start_date"], "2022-01-01T00:00:00Z")
+        self.assertEqual(hosted.site_id, "jira.example.com")
+        self.assertEqual(hosted.config["fingerprint_store_path"], "/tmp/fingerprints.json.jira_example_com")
+
+    def test_duplicate_sites_are_rejected(self):
+        with self.assertRaises(Exception):
+            sites.get_sites({**SHARED_CONFIG, "sites": [HOSTED_SITE, HOSTED_SITE]})
+
+    @mock.patch("tap_jira.output.singer.write_state")
+    @mock.patch("tap_jira.output.singer.write_record")
+    @mock.patch("tap_jira.streams.validate_dependencies")
+    @mock.patch("tap_jira.Client")
+    def test_sites_are_synced_with_their_own_state_and_streams(
+            self, mock_client, mock_validate_dependencies, mock_write_record, mock_write_state):
+        """
+        Verify that every site writes prefixed records and its bookmarks under its own part of the state.
+        """
+        mock_client.return_value.login_timer = None
+
+        def sync_streams():
+            Context.set_bookmark(["issues", "updated"], Context.config["site_id"])
+            output.write_record("issues", {"id": Context.config["site_id"]})
+            output.write_state(Context.state)
+
+        config = {**SHARED_CONFIG, "site_concurrency": 2,
+                  "sites": [dict(HOSTED_SITE, site_id="one"), dict(HOSTED_SITE, site_id="two")]}
+        with mock.patch("tap_jira.sync_streams", side_effect=sync_streams):
+            tap_jira.main_sites(Args(config, state={"sites": {"one": {"bookmarks": {"users": {}}}}}))
+
+        self.assertEqual(sorted(c.args[0] for c in mock_write_record.mock_calls), ["one_issues", "two_issues"])
+        final_state = mock_write_state.mock_calls[-1].args[0]
+        self.assertEqual(final_state["sites"]["one"]["bookmarks"], {"users": {}, "issues": {"updated": "one"}})
+        self.assertEqual(final_state["sites"]["two"]["bookmarks"], {"issues": {"updated": "two"}})
+        self.assertIs(mock_client.call_args_list[0].kwargs["session"], mock_client.call_args_list[1].kwargs["session"])
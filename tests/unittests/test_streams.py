@@ -1,20 +1,26 @@
 import unittest
 import pytz
-from tap_jira.context import Context
-from unittest.mock import Mock, MagicMock
+from tap_jira.context import Context, SyncContext, use_context
+from unittest.mock import Mock, MagicMock, patch
 from tap_jira.streams import Issues
 from tap_jira.http import Paginator, IssuesPaginator
 from datetime import datetime
 
 class TestLocalizedRequests(unittest.TestCase):
     def setUp(self):
+        self.enterContext(use_context(SyncContext()))
         self.tzname = 'Europe/Volgograd'
-        Context.update_start_date_bookmark = Mock(return_value=datetime(2018,12,12,1,2,3, tzinfo=pytz.UTC))
-        Context.retrieve_timezone = Mock(return_value=self.tzname)
-        Context.bookmark = Mock()
-        Context.set_bookmark = Mock()
-        IssuesPaginator.pages = Mock(return_value=[])
+        for target, name, value in [
+                (Context, "update_start_date_bookmark", Mock(return_value=datetime(2018,12,12,1,2,3, tzinfo=pytz.UTC))),
+                (Context, "retrieve_timezone", Mock(return_value=self.tzname)),
+                (Context, "bookmark", Mock()),
+                (Context, "set_bookmark", Mock()),
+                (IssuesPaginator, "pages", Mock(return_value=[]))]:
+            patcher = patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
         Context.client = Mock()
+        Context.config = {}
 
     def test_issues_local_timezone_in_request(self):
         issues = Issues('issues', ['pk_fields'], "INCREMENTAL")
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+from tap_jira.streams import sync_cached_transitions
+from tap_jira.transitions import TransitionCache
+from tap_jira.context import Context, SyncContext, use_context
+
+DONE = {"id": "31", "name": "Done", "isConditional": False}
+RESOLVE = {"id": "41", "name": "Resolve", "isConditional": True}
+
+
+def issue(issue_id, status_id, project_id="1"):
+    return {"id": issue_id, "fields": {"project": {"id": project_id},
+                                       "issuetype": {"id": "10001"},
+                                       "status": {"id": status_id}}}
+
+
+def mock_request(tap_stream_id, method, path):
+    issue_id = path.split("/")[-2]
+    return {"transitions": [RESOLVE] if issue_id.startswith("c") else [DONE]}
+
+
+def requested_issue_ids():
+    return [c.args[2].split("/")[-2] for c in Context.client.request.mock_calls]
+
+
+@mock.patch("tap_jira.streams.Stream.write_page")
+class TestCachedTransitions(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+        Context.config = {}
+        Context.client = mock.Mock(concurrency=None)
+        Context.client.request.side_effect = mock_request
+
+    def test_one_issue_per_state_is_fetched(self, mock_write_page):
+        """
+        Verify that transitions are fetched once per (project, issue type, status) and
+        synthesized for the other issues, also on later pages.
+        """
+        cache = TransitionCache()
+        sync_cached_transitions([issue("1", "3"), issue("2", "3"), issue("3", "4")], cache)
+        sync_cached_transitions([issue("4", "3"), issue("5", "3", project_id="2")], cache)
+
+        self.assertEqual(requested_issue_ids(), ["1", "3", "5"])
+        written = [record for c in mock_write_page.mock_calls for record in c.args[0]]
+        self.assertEqual([(r["issueId"], r["id"]) for r in written],
+                         [("1", "31"), ("2", "31"), ("3", "31"), ("4", "31"), ("5", "31")])
+
+    def test_expired_states_are_fetched_again(self, mock_write_page):
+        """
+        Verify that cached transitions are not reused after the TTL.
+        """
+        cache = TransitionCache(ttl=0)
+        sync_cached_transitions([issue("1", "3"), issue("2", "3")], cache)
+        sync_cached_transitions([issue("3", "3")], cache)
+        self.assertEqual(requested_issue_ids(), ["1", "3"])
+
+    def test_strict_mode_fetches_issues_with_conditional_transitions(self, mock_write_page):
+        """
+        Verify that in strict mode issues sharing a state with conditional transitions
+        have their own transitions fetched.
+        """
+        cache = TransitionCache(strict=True)
+        sync_cached_transitions([issue("c1", "3"), issue("c2", "3"), issue("4", "4"), issue("5", "4")], cache)
+        self.assertEqual(requested_issue_ids(), ["c1", "4", "c2"])
+        self.assertEqual(len(mock_write_page.call_args.args[0]), 4)
@@ -1,9 +1,25 @@
 import unittest
+from unittest import mock
+import dateparser
 from tap_jira.streams import transform_user_date
 
 TEST_SET = {
     "12/okt/2022": "2022-10-12",
-    "02/abr/2021": "2021-04-02"
+    "02/abr/2021": "2021-04-02",
+    "12/ott/22": "2022-10-12",
+    "12/out/22": "2022-10-12",
+    "12/paź/22": "2022-10-12",
+    "12/janv./22": "2022-01-12",
+    "05/мая/22": "2022-05-05",
+    "12/10月/22": "2022-10-12",
+    "12/10월/22": "2022-10-12",
+    "12/十月/22": "2022-10-12",
+    "12/Dec/70": "1970-12-12",
+    "12/märz/22": "2022-03-12",
+    "12/февр./22": "2022-02-12",
+    "12/сент./22": "2022-09-12",
+    "12/нояб./22": "2022-11-12",
+    "12/des./22": "2022-12-12"
 }
 class TestUserDateTransform(unittest.TestCase):
     """
@@ -14,3 +30,14 @@ class TestUserDateTransform(unittest.TestCase):
         for actual_test_date, expected_test_date in TEST_SET.items():
             self.assertEqual(transform_user_date(actual_test_date), expected_test_date)
 
+    @mock.patch("tap_jira.streams.dateparser.parse", wraps=dateparser.parse)
+    def test_user_date_falls_back_to_dateparser(self, mock_parse):
+        """
+        Verify that dateparser is only used for dates the month table doesn't know.
+        """
+        transform_user_date.cache_clear()
+        self.assertEqual(transform_user_date("12/okt/2022"), "2022-10-12")
+        mock_parse.assert_not_called()
+
+        self.assertEqual(transform_user_date("2022-10-12"), "2022-10-12")
+        mock_parse.assert_called_once_with("2022-10-12")
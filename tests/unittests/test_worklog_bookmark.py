@@ -0,0 +1,56 @@
+import unittest
+from singer import utils
+from tap_jira.dates import parse_timestamp, timestamp_range
+from tap_jira.streams import raise_if_bookmark_cannot_advance
+
+TIMESTAMPS = [
+    "2022-05-23T09:16:11.356+0000",
+    "2022-05-23T09:16:11.356-0530",
+    "2022-05-23T09:16:11Z",
+    "2022-05-23T09:16:11.356",
+    "2022-05-23",
+]
+
+class TestTimestampParsing(unittest.TestCase):
+    def test_parse_timestamp_matches_singer(self):
+        """
+        Verify that the fast parser gives the same UTC datetime as singer's strptime_to_utc.
+        """
+        for timestamp in TIMESTAMPS:
+            self.assertEqual(parse_timestamp(timestamp), utils.strptime_to_utc(timestamp))
+            self.assertEqual(parse_timestamp(timestamp).tzinfo, utils.strptime_to_utc(timestamp).tzinfo)
+
+    def test_timestamp_range(self):
+        """
+        Verify that min, max and the number of values equal to max are found in one pass.
+        """
+        min_value, max_value, max_count = timestamp_range([
+            "2022-05-23T09:16:11.356+0000",
+            "2022-05-23T10:16:11.356+0000",
+            "2022-05-23T05:16:11.356-0500",
+            "2022-05-23T08:16:11.356+0000",
+        ])
+        self.assertEqual(min_value, utils.strptime_to_utc("2022-05-23T08:16:11.356+0000"))
+        self.assertEqual(max_value, utils.strptime_to_utc("2022-05-23T10:16:11.356+0000"))
+        self.assertEqual(max_count, 2)
+
+
+def validate(worklogs):
+    _, max_updated, max_count = timestamp_range(w["updated"] for w in worklogs)
+    raise_if_bookmark_cannot_advance(worklogs, max_updated, max_count)
+
+
+class TestRaiseIfBookmarkCannotAdvance(unittest.TestCase):
+    def test_999_equal_timestamps_are_allowed(self):
+        validate([{"updated": "2022-05-23T09:16:11.356+0000"}] * 999)
+
+    def test_1000_different_timestamps_are_allowed(self):
+        validate([{"updated": "2022-05-23T09:16:11.356+0000"}] * 999
+                 + [{"updated": "2022-05-24T09:16:11.356+0000"}])
+
+    def test_1000_equal_timestamps_raise(self):
+        worklogs = [{"updated": "2022-05-23T09:16:11.356+0000"}] * 1000
+        with self.assertRaises(Exception) as e:
+            validate(worklogs)
+        self.assertIn("Worklogs bookmark can't safely advance", str(e.exception))
+        self.assertEqual(e.exception.updated, utils.strptime_to_utc("2022-05-23T09:16:11.356+0000"))
@@ -0,0 +1,200 @@
+import json
+import unittest
+from unittest import mock
+from singer import utils
+from tap_jira.streams import Worklogs, DeletedWorklogs, sync_embedded_worklogs
+from tap_jira.context import Context, SyncContext, use_context
+
+def worklog(worklog_id, updated):
+    return {"id": str(worklog_id), "updated": updated}
+
+ID_PAGES = {
+    0: {"values": [{"worklogId": 1}, {"worklogId": 2}, {"worklogId": 3}], "until": 1000, "lastPage": False},
+    1000: {"values": [{"worklogId": 4}, {"worklogId": 5}], "until": 2000, "lastPage": True},
+}
+WORKLOGS = {
+    1: worklog(1, "1970-01-01T00:00:00.500+0000"),
+    2: worklog(2, "1970-01-01T00:00:00.700+0000"),
+    3: worklog(3, "1970-01-01T00:00:01.000+0000"),
+    4: worklog(4, "1970-01-01T00:00:01.000+0000"),
+    5: worklog(5, "1970-01-01T00:00:02.000+0000"),
+}
+
+def mock_request(tap_stream_id, method, path, params=None, headers=None, data=None):
+    if path == "/rest/api/2/worklog/updated":
+        return ID_PAGES[params["since"]]
+    return [WORKLOGS[i] for i in json.loads(data)["ids"]]
+
+
+@mock.patch("tap_jira.streams.singer.write_state")
+@mock.patch("tap_jira.streams.Stream.write_page")
+@mock.patch("tap_jira.context.Context.set_bookmark")
+@mock.patch("tap_jira.context.Context.update_start_date_bookmark",
+            return_value=utils.strptime_to_utc("1970-01-01T00:00:00Z"))
+class TestWorklogsSync(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+        Context.config = {"start_date": "1970-01-01T00:00:00Z", "worklog_batch_size": 2}
+        Context.client = mock.Mock(concurrency=None)
+        Context.client.request.side_effect = mock_request
+
+    def test_worklogs_are_fetched_in_batches_and_pages_are_chained_by_until(
+            self, mock_update_start_date_bookmark, mock_set_bookmark, mock_write_page, mock_write_state):
+        """
+        Verify that ids are split into batches, the next page uses the previous page's `until`
+        and worklogs are written in order.
+        """
+        Worklogs("worklogs", ["id"], "INCREMENTAL").sync()
+
+        list_calls = [json.loads(c.kwargs["data"])["ids"] for c in Context.client.request.mock_calls
+                      if c.args[2] == "/rest/api/2/worklog/list"]
+        self.assertEqual(sorted(list_calls), [[1, 2], [3], [4, 5]])
+        updated_calls = [c.kwargs["params"] for c in Context.client.request.mock_calls
+                         if c.args[2] == "/rest/api/2/worklog/updated"]
+        self.assertEqual(updated_calls, [{"since": 0}, {"since": 1000}])
+
+        self.assertEqual(mock_write_page.mock_calls, [
+            mock.call([WORKLOGS[1], WORKLOGS[2], WORKLOGS[3]]),
+            mock.call([WORKLOGS[4], WORKLOGS[5]]),
+        ])
+        self.assertEqual(mock_set_bookmark.mock_calls, [
+            mock.call(["worklogs", "updated"], utils.strptime_to_utc("1970-01-01T00:00:01Z")),
+            mock.call(["worklogs", "updated"], utils.strptime_to_utc("1970-01-01T00:00:02Z")),
+        ])
+
+    def test_worklog_batch_size_is_capped_at_1000(
+            self, mock_update_start_date_bookmark, mock_set_bookmark, mock_write_page, mock_write_state):
+        """
+        Verify that a worklog_batch_size over 1000 still fetches at most 1000 worklogs per request.
+        """
+        Context.config = {"start_date": "1970-01-01T00:00:00Z", "worklog_batch_size": 5000}
+        Context.client.request.side_effect = [
+            {"values": [{"worklogId": i} for i in range(1500)], "until": 1000, "lastPage": True},
+            [worklog(1, "1970-01-01T00:00:01.000+0000")],
+            [worklog(2, "1970-01-01T00:00:02.000+0000")],
+        ]
+        Worklogs("worklogs", ["id"], "INCREMENTAL").sync()
+
+        list_calls = [json.loads(c.kwargs["data"])["ids"] for c in Context.client.request.mock_calls
+                      if c.args[2] == "/rest/api/2/worklog/list"]
+        self.assertEqual(sorted(len(ids) for ids in list_calls), [500, 1000])
+
+    def test_pages_of_deleted_worklogs_are_skipped(
+            self, mock_update_start_date_bookmark, mock_set_bookmark, mock_write_page, mock_write_state):
+        """
+        Verify that a page whose worklogs were all deleted before they were fetched moves on to the
+        next page without writing or bookmarking anything.
+        """
+        def request(tap_stream_id, method, path, params=None, headers=None, data=None):
+            if path == "/rest/api/2/worklog/list":
+                return [WORKLOGS[i] for i in json.loads(data)["ids"] if i > 3]
+            return mock_request(tap_stream_id, method, path, params, headers, data)
+
+        Context.client.request.side_effect = request
+        Worklogs("worklogs", ["id"], "INCREMENTAL").sync()
+
+        mock_write_page.assert_called_once_with([WORKLOGS[4], WORKLOGS[5]])
+        mock_set_bookmark.assert_called_once_with(["worklogs", "updated"],
+                                                  utils.strptime_to_utc("1970-01-01T00:00:02Z"))
+
+    def test_deleted_worklogs_are_written_as_tombstones(
+            self, mock_update_start_date_bookmark, mock_set_bookmark, mock_write_page, mock_write_state):
+        """
+        Verify that deleted worklogs are read from /worklog/deleted and written without fetching them.
+        """
+        Context.client.request.side_effect = [
+            {"values": [{"worklogId": 1, "updatedTime": 1000, "properties": []},
+                        {"worklogId": 2, "updatedTime": 2500}],
+             "until": 2500, "lastPage": True},
+        ]
+        DeletedWorklogs("deleted_worklogs", ["id"], "INCREMENTAL").sync()
+
+        Context.client.request.assert_called_once_with(
+            "deleted_worklogs", "GET", "/rest/api/2/worklog/deleted", params={"since": 0})
+        mock_write_page.assert_called_once_with([
+            {"id": "1", "updated": "1970-01-01T00:00:01.000000Z", "properties": []},
+            {"id": "2", "updated": "1970-01-01T00:00:02.500000Z", "properties": []},
+        ])
+        mock_set_bookmark.assert_called_once_with(
+            ["deleted_worklogs", "updated"], utils.strptime_to_utc("1970-01-01T00:00:02.5Z"))
+
+    @mock.patch("tap_jira.context.Context.retrieve_timezone", return_value="UTC")
+    def test_worklogs_fall_back_to_issues_when_bookmark_cannot_advance(
+            self, mock_retrieve_timezone, mock_update_start_date_bookmark, mock_set_bookmark,
+            mock_write_page, mock_write_state):
+        """
+        Verify that a page of 1000 worklogs sharing one timestamp is synced through the issues' worklogs
+        and the sync carries on just past that timestamp.
+        """
+        Context.config = {"start_date": "1970-01-01T00:00:00Z", "worklog_batch_size": 1000}
+        stuck = "1970-01-01T00:00:01.000+0000"
+        stuck_ids_page = {"values": [{"worklogId": i, "updatedTime": 1000} for i in range(1000)],
+                          "until": 1000, "lastPage": False}
+        issue_worklogs = {
+            "10": [worklog(1, stuck), worklog(2, "1970-01-01T00:00:00.500+0000")],
+            "11": [worklog(3, stuck)],
+        }
+
+        def request(tap_stream_id, method, path, params=None, headers=None, data=None):
+            if path == "/rest/api/2/worklog/updated":
+                return {0: stuck_ids_page,
+                        1001: {"values": [{"worklogId": 1001, "updatedTime": 2000}], "until": 2000, "lastPage": True}
+                        }[params["since"]]
+            if path == "/rest/api/2/worklog/list":
+                return [worklog(i, stuck) if i < 1000 else worklog(i, "1970-01-01T00:00:02.000+0000")
+                        for i in json.loads(data)["ids"]]
+            if path == "/rest/api/2/search/jql":
+                self.assertEqual(params["jql"], "updated >= '1970-01-01 00:00' order by updated asc")
+                return {"issues": [{"id": "10"}, {"id": "11"}], "isLast": True}
+            issue_id = path.split("/")[-2]
+            return {"worklogs": issue_worklogs[issue_id], "maxResults": 1000}
+
+        Context.client.request.side_effect = request
+        Worklogs("worklogs", ["id"], "INCREMENTAL").sync()
+
+        self.assertEqual(mock_write_page.mock_calls, [
+            mock.call([worklog(1, stuck)]),
+            mock.call([worklog(3, stuck)]),
+            mock.call([worklog(1001, "1970-01-01T00:00:02.000+0000")]),
+        ])
+        self.assertEqual(mock_set_bookmark.mock_calls, [
+            mock.call(["worklogs", "updated"], utils.strptime_to_utc("1970-01-01T00:00:01Z")),
+            mock.call(["worklogs", "updated"], utils.strptime_to_utc("1970-01-01T00:00:02Z")),
+        ])
+
+
+class TestEmbeddedWorklogs(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(use_context(SyncContext()))
+
+    @mock.patch("tap_jira.streams.Stream.write_page")
+    def test_embedded_worklogs_are_written_and_truncated_ones_fetched(self, mock_write_page):
+        """
+        Verify that complete embedded worklogs are written as is and only truncated issues are fetched.
+        """
+        Context.config = {}
+        Context.client = mock.Mock(concurrency=None)
+        Context.client.request.return_value = {"worklogs": [worklog(3, "1970-01-01T00:00:01.000+0000"),
+                                                            worklog(4, "1970-01-01T00:00:01.000+0000")],
+                                               "maxResults": 1000}
+        page = [
+            {"id": "10", "fields": {"worklog": {"total": 2, "maxResults": 20,
+                                                "worklogs": [WORKLOGS[1], WORKLOGS[2]]}}},
+            {"id": "11", "fields": {"worklog": {"total": 2, "maxResults": 1,
+                                                "worklogs": [worklog(3, "1970-01-01T00:00:01.000+0000")]}}},
+            {"id": "12", "fields": {"worklog": {"total": 0, "maxResults": 20, "worklogs": []}}},
+        ]
+        sync_embedded_worklogs(page)
+
+        Context.client.request.assert_called_once_with(
+            "worklogs", "GET", "/rest/api/2/issue/11/worklog", params={"maxResults": 1000, "startAt": 0})
+        mock_write_page.assert_called_once_with([WORKLOGS[1], WORKLOGS[2],
+                                                 worklog(3, "1970-01-01T00:00:01.000+0000"),
+                                                 worklog(4, "1970-01-01T00:00:01.000+0000")])
+        self.assertTrue(all("worklog" not in issue["fields"] for issue in page))
+
+    @mock.patch("tap_jira.streams.worklogs_from_issues", return_value=True)
+    def test_worklogs_stream_is_skipped(self, mock_worklogs_from_issues):
+        Context.client = mock.Mock(concurrency=None)
+        Worklogs("worklogs", ["id"], "INCREMENTAL").sync()
+        Context.client.request.assert_not_called()